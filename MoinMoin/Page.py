@@ -34,16 +34,22 @@
 """
 
 import codecs
+import collections
+import io
 import importlib.util
 import marshal
 import os
 import re
 import sys
+import threading
 from logging import NOTSET
 
-from MoinMoin import config, caching, user, util, wikiutil
+from MoinMoin import config, caching, subscriptions, user, util, wikiutil
 from MoinMoin import log
 from MoinMoin.logfile import eventlog
+from MoinMoin.pageindex import PageIndex
+from MoinMoin.util import cachestore
+from MoinMoin.web import sendfile
 from MoinMoin.decorator import context_timer
 
 logging = log.getLogger(__name__)
@@ -81,23 +87,52 @@ def is_cache_exception(e):
 class ItemCache:
     """ Cache some page item related data, as meta data or pagelist
 
-        We only cache this to RAM in request.cfg (this is the only kind of
-        server object we have), because it might be too big for pickling it
-        in and out.
+        We only cache this to RAM (this is the only kind of server object we
+        have), because it might be too big for pickling it in and out. By
+        default, the data is kept in request.cfg of the current process,
+        cfg.cache_store can select a store shared by all processes.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, log_filename=None, store=None):
         """ Initialize ItemCache object.
             @param name: name of the object, used for display in logging and
                          influences behaviour of refresh().
+            @param log_filename: path of the global edit-log, used to start
+                                 at its current end (we have nothing cached yet,
+                                 so there is no need to read in the whole log
+                                 on first request).
+            @param store: where to keep the cached data, see
+                          MoinMoin.util.cachestore (default: MemoryStore)
         """
         self.name = name
-        self.cache = {}
-        self.log_pos = None  # TODO: initialize this to EOF pos of log
-        # to avoid reading in the whole log on first request
+        if store is None:
+            store = cachestore.MemoryStore()
+        self.store = store
+        if log_filename is not None and self.log_pos is None:
+            # if the store is shared, some other process may have set it already
+            try:
+                self.log_pos = os.path.getsize(log_filename)
+            except OSError:
+                self.log_pos = 0
         self.contexts = 0
         self.hits = 0
         self.loglevel = NOTSET
+        # refresh() is serialized by this lock. _checks counts the edit-log
+        # checks done so far, _checked_writes is the local edit-log write
+        # count (see EditLog.local_writes) seen by the latest check.
+        self._lock = threading.Lock()
+        self._checks = 0
+        self._checked_writes = -1
+
+    # the edit-log position is kept in the store (under a name that can't be
+    # a page name), so processes sharing a store also share the position.
+    def _get_log_pos(self):
+        return self.store.get(None, 'log_pos')
+
+    def _set_log_pos(self, log_pos):
+        self.store.put(None, 'log_pos', log_pos)
+
+    log_pos = property(_get_log_pos, _set_log_pos)
 
     def putItem(self, request, name, key, data):
         """ Remembers some data for item name under a key.
@@ -106,8 +141,7 @@ class ItemCache:
             @param key: used as secondary access key after name
             @param data: the data item that should be remembered
         """
-        d = self.cache.setdefault(name, {})
-        d[key] = data
+        self.store.put(name, key, data)
 
     def getItem(self, request, name, key):
         """ Returns some item stored for item name under key.
@@ -117,12 +151,11 @@ class ItemCache:
             @return: the data or None, if there is no such name or key.
         """
         self.refresh(request)
-        try:
-            data = self.cache[name][key]
+        data = self.store.get(name, key)
+        if data is not None:
             self.hits += 1
             hit_str = 'hit'
-        except KeyError:
-            data = None
+        else:
             hit_str = 'miss'
         self.contexts += 1
         logging.log(self.loglevel, "%s cache %s (h/r %2.1f%%) for %r %r" % (
@@ -137,10 +170,34 @@ class ItemCache:
     def refresh(self, request):
         """ Refresh the cache - if anything has changed in the wiki, we see it
             in the edit-log and either delete cached data for the changed items
-            (for 'meta') or the complete cache ('pagelists').
+            (for 'meta') or update the cached page indexes for them ('pagelists').
+
+            The edit-log is checked only once per request (unless this process
+            wrote to an edit-log since then), and threads arriving while
+            another thread is checking share the result of the next check
+            instead of all reading the edit-log themselves.
             @param request: the request object
         """
         from MoinMoin.logfile import editlog
+        writes = editlog.EditLog.local_writes
+        checked = getattr(request, '_item_cache_checks', None)
+        if checked is not None and checked.get(self.name) == writes:
+            return  # already checked in this request, nothing written since
+        checks = self._checks
+        with self._lock:
+            if self._checks > checks and self._checked_writes >= writes:
+                # some other thread checked after we got here, share its result
+                pass
+            else:
+                self._checks += 1
+                self._checked_writes = writes
+                self._refresh(request)
+        if checked is not None:
+            checked[self.name] = writes
+
+    def _refresh(self, request):
+        """ Do the edit-log check for refresh(), must be called with the lock held """
+        from MoinMoin.logfile import editlog
         elog = editlog.EditLog(request)
         old_pos = self.log_pos
         new_pos, items = elog.news(old_pos)
@@ -148,17 +205,150 @@ class ItemCache:
             if self.name == 'meta':
                 for item in items:
                     logging.log(self.loglevel, "cache: removing %r" % item)
-                    try:
-                        del self.cache[item]
-                    except:
-                        pass
+                    self.store.delete(item)
             elif self.name == 'pagelists':
-                logging.log(self.loglevel, "cache: clearing pagelist cache")
-                self.cache = {}
+                logging.log(self.loglevel, "cache: updating pagelist cache for %r" % items)
+                updates = []
+                for name in self.store.names():
+                    if name is None:
+                        continue
+                    d = self.store.get_all(name) or {}
+                    for key, index in d.items():
+                        index.apply_news(request, new_pos, items)
+                        updates.append((name, key, index))
+                updates.append((None, 'log_pos', new_pos))
+                # with a shared store, another process may have updated the
+                # page indexes meanwhile - then its result is at least as new
+                if not self.store.compare_and_put(None, 'log_pos', old_pos, updates):
+                    logging.log(self.loglevel, "cache: pagelist cache was updated by another process")
+                return
+            elif self.name == 'acl':
+                # ACL decisions (see MoinMoin.security) depend on the groups
+                # and (with acl_hierarchic) on the ACLs of the parent pages
+                if [item for item in items if wikiutil.isGroupPage(item, request.cfg)]:
+                    logging.log(self.loglevel, "cache: group page changed, removing all ACL decisions")
+                    self.store.clear()
+                else:
+                    logging.log(self.loglevel, "cache: removing ACL decisions for %r" % items)
+                    subpages = tuple([item + '/' for item in items])
+                    for name in self.store.names():
+                        if name is not None and (name in items or name.startswith(subpages)):
+                            self.store.delete(name)
+            elif self.name in ('html', 'etags'):
+                # the HTML and validators of page views, see MoinMoin.responsecache
+                from MoinMoin import responsecache
+                responsecache.invalidate(request, self.store, items)
         self.log_pos = new_pos  # important to do this at the end -
         # avoids threading race conditions
 
 
+class PageCodeCache:
+    """ Keep the code objects of the recently used cached pages in memory
+
+        Loading the page code from the cache file (see Page.loadCache) means
+        some stat calls, reading the file and unmarshalling the code - for
+        the popular pages, we rather keep the code objects of the last
+        used pages in a LRU cache (the most recently used entries are at
+        the end of the OrderedDict) until their marshalled size exceeds
+        the byte budget.
+
+        The entries are kept by (page name, formatter name) together with
+        the page revision and the uid of the cache file they were made for,
+        a get with another revision or cache file (e.g. after the refresh
+        action removed it) is a miss. As the code also depends on the
+        attachments of the page, we follow the edit-log and remove the
+        entries of the changed pages (like ItemCache does, but only in this
+        process - code objects can't be pickled for a shared store).
+    """
+
+    def __init__(self, max_size, log_filename=None):
+        """ Initialize PageCodeCache object.
+            @param max_size: byte budget (sum of the marshalled code sizes)
+            @param log_filename: path of the global edit-log
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.log_pos = None
+        if log_filename is not None:
+            try:
+                self.log_pos = os.path.getsize(log_filename)
+            except OSError:
+                self.log_pos = 0
+        self._entries = collections.OrderedDict()  # key -> (version, code, size)
+        self._lock = threading.Lock()
+
+    def refresh(self, request):
+        """ Remove the entries of the pages changed since the last check
+            (once per request, unless this process wrote to the edit-log
+            since then)
+        """
+        from MoinMoin.logfile import editlog
+        writes = editlog.EditLog.local_writes
+        if getattr(request, '_page_code_checked', None) == (self, writes):
+            return
+        elog = editlog.EditLog(request)
+        size = elog.size()
+        with self._lock:
+            if self.log_pos is None or size < self.log_pos:
+                self._clear()
+                self.log_pos = size
+            elif size > self.log_pos:
+                new_pos, items = elog.news(self.log_pos)
+                items = set(items)
+                for key in [key for key in self._entries if key[0] in items]:
+                    self._remove(key)
+                self.log_pos = new_pos
+        request._page_code_checked = (self, writes)
+
+    def get(self, request, key, version):
+        """ Return the code object cached for key and version or None
+
+        @param request: the request object
+        @param key: (page name, formatter name)
+        @param version: (current revision of the page, uid of the cache file)
+        """
+        self.refresh(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, code, size):
+        """ Remember code object code (of marshalled size size) for key and
+            version, removing the least recently used entries if the byte
+            budget is exceeded
+        """
+        if size > self.max_size or version[1] is None:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (version, code, size)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def _clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        """ Return a dict with the counters and the memory use """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'size': self.size, 'max_size': self.max_size}
+
+
 class Page:
     """ Page - Manage an (immutable) page associated with a WikiName.
         To change a page's content, use the PageEditor class.
@@ -879,11 +1069,14 @@ class Page:
         # get email addresses of the all wiki user which have a profile stored;
         # add the address only if the user has subscribed to the page and
         # the user is not the current editor
-        userlist = user.getUserList(context)
+        profiles = context.cfg.cache.user_store.values(['email', 'subscribed_pages'])
         subscriber_list = {}
-        for uid in userlist:
+        for uid, values in list(profiles.items()):
             if uid == context.user.id and not include_self:
                 continue  # no self notification
+            # only load the profiles of users who could be subscribers
+            if not values.get('email') or not values.get('subscribed_pages'):
+                continue
             subscriber = user.User(context, uid)
 
             # The following tests should be ordered in order of
@@ -919,7 +1112,7 @@ class Page:
     @context_timer("getSubscribers")
     def getSubscribers(self, request, **kw):
         """ Get all subscribers of this page.
-            (new method, uses caching)
+            (new method, uses the subscription index, see MoinMoin.subscriptions)
 
         @param request: the request object
         @keyword include_self: if 1, include current user (default: 0)
@@ -936,89 +1129,46 @@ class Page:
         # add current page name for list matching
         pageList.append(self.page_name)
 
-        scope, arena, key = 'userdir', 'users', 'pagesubscriptions'
-
-        # get or create cache file
-        cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True)
-        if cache.exists():
-            page_sub = cache.content()
-        else:
-            # build a cache if it doesn't exist
-            cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True, do_locking=False)
-            # lock to stop anybody else interfering with the data while we're working
-            cache.lock('w')
-            userlist = user.getUserList(request)
-            page_sub = {}
-            for uid in userlist:
-                subscriber = user.User(request, uid)
-                # we don't care about storing entries for users without any page subscriptions
-                if subscriber.subscribed_pages:
-                    page_sub[subscriber.id] = {
-                        'name': subscriber.name,
-                        'email': subscriber.email,
-                        'subscribed_pages': subscriber.subscribed_pages,
-                    }
-            cache.update(page_sub)
-            cache.unlock()
-
         if self.cfg.SecurityPolicy:
             UserPerms = self.cfg.SecurityPolicy
         else:
             from MoinMoin.security import Default as UserPerms
 
-        # get email addresses of all wiki users which have a profile stored;
-        # add the address only if the user has subscribed to the page and
-        # the user is not the current editor
-        userlist = page_sub
-        subscriber_list = {}
-
         pages = pageList[:]
         if request.cfg.interwikiname:
             pages += ["%s:%s" % (request.cfg.interwikiname, pagename) for pagename in pageList]
-        # Create text for regular expression search
-        text = '\n'.join(pages)
 
-        for uid in userlist:
+        # get email addresses of all wiki users which have subscribed to the
+        # page (or one of its categories); skip the current editor
+        index = subscriptions.get_index(request)
+        subscriber_list = {}
+
+        for uid in sorted(index.subscribers(pages)):
             if uid == request.user.id and not include_self:
                 continue  # no self notification
 
             # This is a bit wrong if return_users=1 (which implies that the caller will process
             # user attributes and may, for example choose to send an SMS)
             # So it _should_ be "not (subscriber.email and return_users)" but that breaks at the moment.
-            if not userlist[uid]['email']:
+            if not index.email(uid):
                 continue  # skip empty email addresses
 
-            # now check patterns for actual match
-            isSubscribed = False
-            for pattern in userlist[uid]['subscribed_pages']:
-                if pattern in pages:
-                    isSubscribed = True
-                    break
-                try:
-                    pattern = re.compile(r'^%s$' % pattern, re.M)
-                except re.error:
-                    continue
-                if pattern.search(text):
-                    isSubscribed = True
-                    break
-
             # only if subscribed, create a User object from the profile
-            if isSubscribed:
-                subscriber = user.User(request, uid)
+            subscriber = user.User(request, uid)
 
-                if not subscriber.valid:
-                    continue
+            if not subscriber.valid:
+                continue
 
-                if not UserPerms(subscriber).read(self.page_name):
-                    continue
+            if not UserPerms(subscriber).read(self.page_name):
+                continue
 
-                lang = subscriber.language or request.cfg.language_default
-                if lang not in subscriber_list:
-                    subscriber_list[lang] = []
-                if return_users:
-                    subscriber_list[lang].append(subscriber)
-                else:
-                    subscriber_list[lang].append(subscriber.email)
+            lang = subscriber.language or request.cfg.language_default
+            if lang not in subscriber_list:
+                subscriber_list[lang] = []
+            if return_users:
+                subscriber_list[lang].append(subscriber)
+            else:
+                subscriber_list[lang].append(subscriber.email)
 
         return subscriber_list
 
@@ -1125,15 +1275,18 @@ class Page:
             # to ensure cacheability where supported. Because we are sending
             # RAW (file) content, the file mtime is correct as Last-Modified header.
             context.status_code = 200
-            context.last_modified = os.path.getmtime(self._text_filename())
-            text = self.encodeTextMimeType(self.body)
-            # request.headers['Content-Length'] = len(text)  # XXX WRONG! text is unicode obj, but we send utf-8!
+            st = os.stat(self._text_filename())
+            data = self.encodeTextMimeType(self.body).encode(config.charset)
             if content_disposition:
                 # TODO: fix the encoding here, plain 8 bit is not allowed according to the RFCs
                 # There is no solution that is compatible to IE except stripping non-ascii chars
                 filename_enc = "%s.txt" % self.page_name.encode(config.charset)
                 dispo_string = '%s; filename="%s"' % (content_disposition, filename_enc)
                 context.response.headers['Content-Disposition'] = dispo_string
+            # the data only depends on the revision file, so its validators
+            # can be used for conditional and range requests
+            context.send_file(io.BytesIO(data), size=len(data),
+                              etag=sendfile.file_etag(st), last_modified=st.st_mtime)
         else:
             context.response.status_code = 404
             text = u"Page %s not found." % self.page_name
@@ -1497,6 +1650,14 @@ class Page:
     def loadCache(self, request):
         """ Return page content cache or raises 'CacheNeedsUpdate' """
         cache = caching.CacheEntry(request, self, self.getFormatterName(), scope='item')
+        code_cache = request.cfg.cache.page_code
+        if code_cache is not None:
+            key = (self.page_name, self.getFormatterName())
+            version = (self.current_rev(), cache.uid())
+            code = code_cache.get(request, key, version)
+            if code is not None:
+                return code
+
         attachmentsPath = self.getPagePath('attachments', check_create=0)
         if cache.needsUpdate(self._text_filename(), attachmentsPath):
             raise Exception('CacheNeedsUpdate')
@@ -1507,7 +1668,7 @@ class Page:
             # created them.
             if not content.startswith(_PAGE_CODE_CACHE_HEADER):
                 raise ValueError('incompatible page code cache')
-            return marshal.loads(content[len(_PAGE_CODE_CACHE_HEADER):])
+            code = marshal.loads(content[len(_PAGE_CODE_CACHE_HEADER):])
         except (EOFError, ValueError, TypeError):
             # Bad marshal data, must update the cache.
             # See http://docs.python.org/lib/module-marshal.html
@@ -1516,6 +1677,9 @@ class Page:
             logging.info('failed to load "%s" cache: %s' %
                          (self.page_name, str(err)))
             raise Exception('CacheNeedsUpdate')
+        if code_cache is not None:
+            code_cache.put(key, version, code, len(content))
+        return code
 
     def makeCache(self, request, parser):
         """ Format content into code, update cache and return code """
@@ -1533,7 +1697,12 @@ class Page:
         code = compile(src.encode(config.charset),
                        self.page_name.encode(config.charset), 'exec')
         cache = caching.CacheEntry(request, self, self.getFormatterName(), scope='item')
-        cache.update(_PAGE_CODE_CACHE_HEADER + marshal.dumps(code))
+        content = _PAGE_CODE_CACHE_HEADER + marshal.dumps(code)
+        cache.update(content)
+        code_cache = request.cfg.cache.page_code
+        if code_cache is not None:
+            code_cache.put((self.page_name, self.getFormatterName()), (self.current_rev(), cache.uid()),
+                           code, len(content))
         return code
 
     def _specialPageText(self, request, special_type):
@@ -1652,6 +1821,23 @@ class Page:
             links = []
         return links
 
+    def getBacklinks(self, request):
+        """ Get a list of the pages linking to this page.
+
+        The result is not filtered by read rights.
+
+        @param request: the request object
+        @rtype: list
+        @return: sorted names of the existing pages linking to this page
+        """
+        from MoinMoin import linkgraph
+        graph = linkgraph.get_graph(request)
+        if graph is not None:
+            return sorted(graph.backlinks(self.page_name))
+        # the graph is being updated by this thread, do it the slow way
+        return [pagename for pagename in request.rootpage.getPageList(user='')
+                if self.page_name in Page(request, pagename).getPageLinks(request)]
+
     @context_timer("parsePageLinks")
     def parsePageLinks(self, request):
         """ Parse page links by formatting with a pagelinks formatter
@@ -1899,50 +2085,38 @@ class RootPage(Page):
         if user is None:
             user = request.user
 
-        # Get pages cache or create it
-        cachedlist = request.cfg.cache.pagelists.getItem(request, 'all', None)
-        if cachedlist is None:
-            cachedlist = {}
-            for name in self._listPages():
-                # Unquote file system names
-                pagename = wikiutil.unquoteWikiname(name)
-
-                # Filter those annoying editor backups - current moin does not create
-                # those pages any more, but users have them already in data/pages
-                # until we remove them by a mig script...
-                if pagename.endswith(u'/MoinEditorBackup'):
-                    continue
-
-                cachedlist[pagename] = None
-            request.cfg.cache.pagelists.putItem(request, 'all', None, cachedlist)
+        # Get pages cache or load it from the page index
+        index = request.cfg.cache.pagelists.getItem(request, 'all', None)
+        if index is None:
+            index = PageIndex()
+            index.load(request)
+            request.cfg.cache.pagelists.putItem(request, 'all', None, index)
+        cachedlist = index.pages
 
         if user or exists or filter or not include_underlay or return_objects:
             # Filter names
             pages = []
-            for name in cachedlist:
-                # First, custom filter - exists and acl check are very
-                # expensive!
+            for name, (underlay, page_exists, rev, mtime) in list(cachedlist.items()):
+                # First, custom filter - acl check is very expensive!
                 if filter and not filter(name):
                     continue
 
-                page = Page(request, name)
-
                 # Filter underlay pages
-                if not include_underlay and page.getPageStatus()[0]:  # is an underlay page
+                if not include_underlay and underlay:
                     continue
 
                 # Filter deleted pages
-                if exists and not page.exists():
+                if exists and not page_exists:
                     continue
 
-                # Filter out page user may not read.
-                if user and not user.may.read(name):
-                    continue
+                pages.append(name)
 
-                if return_objects:
-                    pages.append(page)
-                else:
-                    pages.append(name)
+            # Filter out page user may not read.
+            if user:
+                pages = user.may.may_read_many(pages)
+
+            if return_objects:
+                pages = [Page(request, name) for name in pages]
         else:
             pages = list(cachedlist.keys())
 
@@ -2025,17 +2199,13 @@ class RootPage(Page):
         all pages, including deleted pages, ignoring acl rights.
 
         If you want to get a more accurate number, call with
-        exists=1. This will be about 100 times slower though.
+        exists=1. Both are answered from the page index.
 
         @param exists: filter existing pages
         @rtype: int
         @return: number of pages
         """
-        if exists:
-            # WARNING: SLOW
-            pages = self.getPageList(user='')
-        else:
-            pages = self._listPages()
+        pages = self.getPageList(user='', exists=exists)
         count = len(pages)
 
         return count
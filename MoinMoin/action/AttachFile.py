@@ -1042,36 +1042,30 @@ def _do_get(pagename, context):
         context.status_code = 404
         return  # error msg already sent in _access_file
 
-    timestamp = datetime.datetime.utcfromtimestamp(os.path.getmtime(fpath)).replace(tzinfo=datetime.UTC)
-    if_modified = context.request.if_modified_since
-    if if_modified and if_modified >= timestamp:
-        context.response.status_code = 304
-    else:
-        mt = wikiutil.MimeType(filename=filename)
-        content_type = mt.content_type()
-        mime_type = mt.mime_type()
-
-        # TODO: fix the encoding here, plain 8 bit is not allowed according to the RFCs
-        # There is no solution that is compatible to IE except stripping non-ascii chars
-        filename_enc = filename.encode(config.charset)
-
-        # for dangerous files (like .html), when we are in danger of cross-site-scripting attacks,
-        # we just let the user store them to disk ('attachment').
-        # For safe files, we directly show them inline (this also works better for IE).
-        dangerous = mime_type in context.cfg.mimetypes_xss_protect
-        content_dispo = dangerous and 'attachment' or 'inline'
-
-        now = time.time()
-        context.response.headers['Date'] = http_date(now)
-        context.response.headers['Content-Type'] = content_type
-        context.response.headers['Last-Modified'] = http_date(timestamp)
-        context.response.headers['Expires'] = http_date(now - 365 * 24 * 3600)
-        context.response.headers['Content-Length'] = os.path.getsize(fpath)
-        content_dispo_string = '%s; filename="%s"' % (content_dispo, filename)
-        context.response.headers['Content-Disposition'] = content_dispo_string
-
-        # send data
-        context.send_file(open(fpath, 'rb'))
+    mt = wikiutil.MimeType(filename=filename)
+    content_type = mt.content_type()
+    mime_type = mt.mime_type()
+
+    # TODO: fix the encoding here, plain 8 bit is not allowed according to the RFCs
+    # There is no solution that is compatible to IE except stripping non-ascii chars
+    filename_enc = filename.encode(config.charset)
+
+    # for dangerous files (like .html), when we are in danger of cross-site-scripting attacks,
+    # we just let the user store them to disk ('attachment').
+    # For safe files, we directly show them inline (this also works better for IE).
+    dangerous = mime_type in context.cfg.mimetypes_xss_protect
+    content_dispo = dangerous and 'attachment' or 'inline'
+
+    now = time.time()
+    context.response.headers['Date'] = http_date(now)
+    context.response.headers['Content-Type'] = content_type
+    context.response.headers['Expires'] = http_date(now - 365 * 24 * 3600)
+    content_dispo_string = '%s; filename="%s"' % (content_dispo, filename)
+    context.response.headers['Content-Disposition'] = content_dispo_string
+
+    # send data - send_file takes Content-Length, Last-Modified and ETag
+    # from the file and answers conditional and range requests
+    context.send_file(open(fpath, 'rb'))
 
 
 def _do_install(pagename, request):
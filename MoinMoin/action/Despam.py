@@ -42,10 +42,7 @@ def show_editors(request, pagename, timestamp):
     log = editlog.EditLog(request)
     editors = {}
     pages = {}
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
-
+    for line in log.since(timestamp, newest_first=True):
         if not request.user.may.read(line.pagename):
             continue
 
@@ -93,10 +90,7 @@ def show_pages(request, pagename, editor, timestamp):
     macro.formatter = request.html_formatter
 
     request.write("<table>")
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
-
+    for line in log.since(timestamp, newest_first=True):
         if not request.user.may.read(line.pagename):
             continue
 
@@ -167,10 +161,7 @@ def revert_pages(request, editor, timestamp):
     log = editlog.EditLog(request)
     pages = {}
     revertpages = []
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
-
+    for line in log.since(timestamp, newest_first=True):
         if not request.user.may.read(line.pagename):
             continue
 
@@ -22,6 +22,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+from MoinMoin import linkgraph
 from MoinMoin.Page import Page
 
 
@@ -85,6 +86,7 @@ class LocalSiteMap:
 class PageTreeBuilder:
     def __init__(self, request):
         self.request = request
+        self.graph = linkgraph.get_graph(request)
         self.children = {}
         self.numnodes = 0
         self.maxnodes = 35
@@ -99,7 +101,11 @@ class PageTreeBuilder:
         if not self.child_marked(child):
             if not self.request.user.may.read(child):
                 return 0
-            if Page(self.request, child).exists():
+            if self.graph is not None:
+                exists = self.graph.exists(child)
+            else:
+                exists = Page(self.request, child).exists()
+            if exists:
                 self.mark_child(child)
                 return 1
         return 0
@@ -107,7 +113,11 @@ class PageTreeBuilder:
     def new_kids(self, name):
         # does not recurse
         kids = []
-        for child in Page(self.request, name).getPageLinks(self.request):
+        if self.graph is not None:
+            links = self.graph.links(name)
+        else:
+            links = Page(self.request, name).getPageLinks(self.request)
+        for child in links:
             if self.is_ok(child):
                 kids.append(child)
         return kids
@@ -84,9 +84,12 @@ def subscribe_users(context, subscribe, unsubscribe, pagename, formatter):
     did_match = {}
 
     # get user object - only with IDs!
-    for userid in user.getUserList(context):
+    profiles = context.cfg.cache.user_store.values(['name'])
+    for userid, values in list(profiles.items()):
+        name = values.get('name', u'')
+        if not [name_re for name_re in unsubscribe + subscribe if re.match(name_re, name, re.U)]:
+            continue  # no need to load this profile
         userobj = user.User(context, userid)
-        name = userobj.name
 
         matched = subscribed = False
 
@@ -266,11 +266,16 @@ def do_show(pagename, context, content_only=0, count_hit=1, cacheable=1, print_m
         rev = context.rev or 0
         if rev == 0:
             context.cacheable = cacheable
-        Page(context, pagename, rev=rev, formatter=mimetype).send_page(
-            count_hit=count_hit,
-            print_mode=print_mode,
-            content_only=content_only,
-        )
+        page = Page(context, pagename, rev=rev, formatter=mimetype)
+        if cacheable and not (content_only or print_mode) and mimetype == u'text/html':
+            from MoinMoin import responsecache
+            responsecache.send_page(context, page, count_hit=count_hit)
+        else:
+            page.send_page(
+                count_hit=count_hit,
+                print_mode=print_mode,
+                content_only=content_only,
+            )
 
 
 def do_format(pagename, request):
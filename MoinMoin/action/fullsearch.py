@@ -198,7 +198,9 @@ def execute(pagename, context, fieldname='value', titlesearch=0, statistic=0):
         Page(context, pagename).send_page()
         return
 
-    results = searchPages(context, query, sort, mtime, historysearch)
+    # we only show one page of the results, the search can stop after it
+    limit = hitsFrom + context.cfg.search_results_per_page
+    results = searchPages(context, query, sort, mtime, historysearch, limit=limit)
 
     # directly show a single hit for title searches
     # this is the "quick jump" functionality if you don't remember
@@ -6,7 +6,7 @@
     @copyright: 2001 Juergen Hermann <jh@web.de>
     @license: GNU GPL, see COPYING for details.
 """
-from MoinMoin import wikiutil
+from MoinMoin import linkgraph, wikiutil
 
 
 def execute(pagename, request):
@@ -24,12 +24,17 @@ def execute(pagename, request):
     pagelist = list(pages.keys())
     pagelist.sort()
 
+    graph = linkgraph.get_graph(request)
     for name in pagelist:
         if mimetype == "text/html":
             request.write(pages[name].link_to(request))
         else:
             _emit(request, name)
-        for link in pages[name].getPageLinks(request):
+        if graph is not None:
+            links = graph.links(name)
+        else:
+            links = pages[name].getPageLinks(request)
+        for link in links:
             request.write(" ")
             if mimetype == "text/html":
                 if link in pages:
@@ -58,7 +58,14 @@ class SSLClientCertAuth(BaseAuth):
                 commonname = _decode(env.get('SSL_CLIENT_S_DN_CN', ''))
                 commonname_lower = commonname.lower()
             if email_lower or commonname_lower:
-                for uid in user.getUserList(request):
+                # only check the users with this email address or name
+                store = request.cfg.cache.user_store
+                uids = []
+                if self.email_key and email_lower:
+                    uids += store.find('email', email_lower, case=False)
+                if self.name_key and commonname_lower:
+                    uids += [uid for uid in store.find('name', commonname_lower, case=False) if uid not in uids]
+                for uid in uids:
                     u = user.User(request, uid,
                                   auth_method=self.name, auth_attribs=())
                     if self.email_key and email_lower and u.email.lower() == email_lower:
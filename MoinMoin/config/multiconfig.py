@@ -29,6 +29,8 @@ from MoinMoin.events import PageRevertedEvent, FileAttachedEvent
 import MoinMoin.web.session
 from MoinMoin.packages import packLine
 from MoinMoin.security import AccessControlList
+from MoinMoin.util import cachestore
+from MoinMoin import userstore
 
 logging = log.getLogger(__name__)
 _url_re_cache = None
@@ -238,10 +240,6 @@ class ConfigFunctionality:
         self.siteid = siteid
         self.cache = CacheClass()
 
-        from MoinMoin.Page import ItemCache
-        self.cache.meta = ItemCache('meta')
-        self.cache.pagelists = ItemCache('pagelists')
-
         if self.config_check_enabled:
             self._config_check()
 
@@ -249,10 +247,21 @@ class ConfigFunctionality:
         self.moinmoin_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
         data_dir = os.path.normpath(self.data_dir)
         self.data_dir = data_dir
+
+        from MoinMoin.Page import ItemCache, PageCodeCache
+        edit_log = os.path.join(data_dir, 'edit-log')
+        self.cache.meta = ItemCache('meta', edit_log, self.cache_store('meta'))
+        self.cache.pagelists = ItemCache('pagelists', edit_log, self.cache_store('pagelists'))
+        self.cache.acl = self.acl_cache and ItemCache('acl', edit_log, self.cache_store('acl')) or None
+        self.cache.html = self.page_html_cache and ItemCache('html', edit_log, self.cache_store('html')) or None
+        self.cache.etags = self.page_etags and ItemCache('etags', edit_log, self.cache_store('etags')) or None
+        self.cache.users = self.cache_store('users')
+        self.cache.page_code = self.page_code_cache_size and PageCodeCache(self.page_code_cache_size, edit_log) or None
         for dirname in ('user', 'cache', 'plugin'):
             name = dirname + '_dir'
             if not getattr(self, name, None):
                 setattr(self, name, os.path.abspath(os.path.join(data_dir, dirname)))
+        self.cache.user_store = self.user_storage()
         # directories below cache_dir (using __dirname__ to avoid conflicts)
         for dirname in ('session',):
             name = dirname + '_dir'
@@ -1162,11 +1171,25 @@ options_no_group_name = {
         ('bang_meta', True, 'if True, enable {{{!NoWikiName}}} markup'),
         ('caching_formats', ['text_html'],
          "output formats that are cached; set to [] to turn off caching (useful for development)"),
+        ('cache_store', cachestore.memory_store,
+         "function f(cfg, name) that returns the store used for the in-memory page meta data, page list and user lookup caches. The default keeps them per process, use {{{cachestore.socket_store(path)}}} to share them between all processes (see MoinMoin.util.cachestore, the processes authenticate to the cache server with the secret it writes to path.key)."),
+
+        ('compress_responses', False,
+         "if True, responses of the mimetypes in compress_mimetypes are sent gzip compressed to browsers accepting that (see MoinMoin.web.compress)."),
+        ('compress_min_size', 1024,
+         "responses smaller than this are not compressed [bytes]."),
+        ('compress_mimetypes', ['text/html', 'text/plain', 'text/css', 'text/xml', 'text/javascript',
+                                'application/javascript', 'application/json', 'application/xml',
+                                'application/rss+xml', 'image/svg+xml', ],
+         "mimetypes of the responses compress_responses compresses."),
 
         ('config_check_enabled', False, "if True, check configuration for unknown settings."),
 
         ('default_markup', 'wiki', 'Default page parser / format (name of module in `MoinMoin.parser`)'),
 
+        ('edit_log_index', True,
+         "if True, keep an index of the global edit-log (in the cache directory) for fast lookups of changes by time, page or user."),
+
         ('html_head', '', "Additional <HEAD> tags, see HelpOnThemes."),
         ('html_head_queries', '<meta name="robots" content="noindex,nofollow">\n',
          "Additional <HEAD> tags for requests with query strings, like actions."),
@@ -1188,6 +1211,10 @@ options_no_group_name = {
          "if True, add timing infos to the log output to analyse load conditions"),
         ('log_events_format', 1,
          "0 = no events logging, 1 = standard format (like <= 1.9.7) [default], 2 = extended format"),
+        ('log_events_buffer', 0,
+         "if > 0, do not write every event to the event-log in the request, but queue them and let a background thread write them in batches of up to this many events (also see log_events_flush_interval). 0 = write every event immediately [default]."),
+        ('log_events_flush_interval', 1.0,
+         "max. seconds a queued event waits before it is written to the event-log (see log_events_buffer). Events are dropped (and counted) if more than 10 * log_events_buffer events are waiting."),
 
         # some dangerous mimetypes (we don't use "content-disposition: inline" for them when a user
         # downloads such attachments, because the browser might execute e.g. Javascript contained
@@ -1224,11 +1251,29 @@ options_no_group_name = {
          ],
          'mimetypes that can be embedded by the [[HelpOnMacros/EmbedObject|EmbedObject macro]]'),
 
+        ('page_code_cache_size', 32 * 1024 * 1024,
+         "size [bytes] of the marshalled code of the recently used cached pages each process keeps in memory (see Page.PageCodeCache), 0 disables it."),
+
+        ('page_html_cache', False,
+         "if True, remember the complete HTML of page views by anonymous visitors without a session (plain action=show requests) until the page, a page it includes or a page it links to is changed. The HTML is kept in the cache_store (see MoinMoin.responsecache)."),
+        ('page_html_cache_pages', 1000,
+         "maximum number of pages page_html_cache remembers the HTML of."),
+        ('page_etags', False,
+         "if True, page views (plain action=show requests) get an ETag and a Last-Modified header and conditional requests (If-None-Match, If-Modified-Since) of unchanged views are answered with 304 Not Modified without rendering the page. The validators are kept in the cache_store (see MoinMoin.responsecache)."),
+        ('page_etags_pages', 10000,
+         "maximum number of pages page_etags remembers the validators of."),
+
         ('refresh', None,
          "refresh = (minimum_delay_s, targets_allowed) enables use of `#refresh 5 PageName` processing instruction, targets_allowed must be either `'internal'` or `'external'`"),
         ('rss_cache', 60, "suggested caching time for Recent''''''Changes RSS, in second"),
 
         ('search_results_per_page', 25, "Number of hits shown per page in the search results"),
+        ('search_trigram_index', False,
+         "True to keep a trigram index of the page texts (in the wiki cache), the built-in search (without Xapian) uses it to skip the pages that can't match."),
+        ('search_workers', 1,
+         "Number of worker processes the built-in search (without Xapian) searches the pages with (1 = no worker processes). The workers are only used in single-threaded server processes, forking a multi-threaded process is not safe."),
+        ('search_chunk_size', 200,
+         "Number of pages a worker process of the built-in search searches at once."),
 
         ('siteid', 'default', None),
         ('xmlrpc_overwrite_user', True, "Overwrite authenticated user at start of xmlrpc code"),
@@ -1263,6 +1308,8 @@ options = {
             'ACLs control who may do what, see HelpOnAccessControlLists.',
             (
                 ('hierarchic', False, 'True to use hierarchical ACLs'),
+                ('cache', True,
+                 "True to remember ACL decisions until the page, one of its parent pages or a group page is changed. Set it to False if you use a group backend whose groups change without page changes (e.g. LDAP groups)."),
                 ('rights_default', u"Trusted:read,write,delete,revert Known:read All:read",
                  "ACL used if no ACL is specified on the page"),
                 ('rights_before', u"",
@@ -1282,6 +1329,10 @@ options = {
          "True to enable Xapian word stemmer usage for indexing / searching."),
         ('index_history', False,
          "True to enable indexing of non-current page revisions."),
+        ('index_workers', 1,
+         "Number of worker processes preparing the documents for `moin index build` (1 = no worker processes, the documents are prepared by the indexing process)."),
+        ('index_batch_size', 1000,
+         "When indexing with worker processes, commit the index after this many document changes."),
     )),
 
     'user': ('Users / User settings', None, (
@@ -1290,6 +1341,14 @@ options = {
         ('jid_unique', True,
          "if True, check Jabber IDs for uniqueness and don't accept duplicates."),
 
+        ('storage', userstore.file_store,
+         "function f(cfg) that returns the store for the user profiles, {{{userstore.file_store}}} (one file per user in `user_dir`) or {{{userstore.sqlite_store}}} (an SQLite database in `user_dir` with an index for fast user searches), see MoinMoin.userstore."),
+
+        ('lookup_negative_ttl', 60,
+         "seconds we remember that a user name / email / jid / openid was not found in the user lookup caches."),
+        ('lookup_rebuild_interval', 300,
+         "min. seconds between rebuilds of the user lookup caches (a rebuild reads all user profiles and is done when a lookup fails)."),
+
         ('homewiki', u'Self',
          "interwiki name of the wiki where the user home pages are located [Unicode] - useful if you have ''many'' users. You could even link to nonwiki \"user pages\" if the wiki username is in the target URL."),
 
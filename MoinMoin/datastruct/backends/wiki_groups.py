@@ -12,64 +12,311 @@ HelpOnConfiguration.
 MoinMoin.formatter.groups is used to extract group members from a
 page.
 
+Membership tests and groups_with_member use an index of the members of
+all group pages (including the members of nested groups), which is
+updated from the edit-log, see WikiGroupsIndex.
+
 
 @copyright: 2008 MoinMoin:ThomasWaldmann,
             2009 MoinMoin:DmitrijsMilajevs
 @license: GPL, see COPYING for details
 """
 
+import threading
+
 from MoinMoin import caching, wikiutil
+from MoinMoin import log
 from MoinMoin.Page import Page
 from MoinMoin.datastruct.backends import GreedyGroup, BaseGroupsBackend, GroupDoesNotExistError
 from MoinMoin.formatter.groups import Formatter
 
+logging = log.getLogger(__name__)
 
-class WikiGroup(GreedyGroup):
+# increment this if the format of the index changes
+INDEX_VERSION = 1
 
-    def _load_group(self):
-        request = self.request
-        group_name = self.name
+# save the index to the cache if it is this many bytes of edit-log behind
+# (when loading an older index, we just read a bit more of the edit-log)
+SAVE_LAG = 64 * 1024
 
-        page = Page(request, group_name)
-        if page.exists():
-            arena = 'pagegroups'
-            key = wikiutil.quoteWikinameFS(group_name)
-            cache = caching.CacheEntry(request, arena, key, scope='wiki', use_pickle=True)
+_index_lock = threading.Lock()
+
+
+class WikiGroupsIndex:
+    """ Members of all group pages and the groups every member is in
+
+        groups - {group name: (members, member groups)} as read from the
+                 group pages
+        closure - {member: set of group names}, a member is in a group if
+                  it is listed on the group page or is in a group listed
+                  there (group names count as members, too)
+        external - {group name: set of group names}, the group names that
+                   are in the group (directly or through other groups), but
+                   are no group pages - they may be defined by other
+                   backends, then we have to check them the slow way.
+
+        The index is kept in request.cfg.cache.wiki_groups and pickled to
+        the wiki cache arena 'wikigroups'. It is updated from the edit-log:
+        only the changed group pages are read again.
+    """
+
+    def __init__(self):
+        self.log_pos = None
+        self.saved_pos = None
+        self.regex = None
+        self.groups = {}
+        self.closure = {}
+        self.external = {}
+        self._lock = threading.RLock()
+        self._updating = False
+
+    def _cache_entry(self, request):
+        return caching.CacheEntry(request, 'wikigroups', 'index', scope='wiki', use_pickle=True)
+
+    def _load(self, request):
+        try:
+            data = self._cache_entry(request).content()
+        except caching.CacheError:
+            data = None
+        if (isinstance(data, dict) and data.get('version') == INDEX_VERSION and
+                data.get('regex') == self.regex):
+            self.log_pos = self.saved_pos = data['log_pos']
+            self.groups = data['groups']
+            self._compute_closure()
+
+    def _save(self, request):
+        data = {
+            'version': INDEX_VERSION,
+            'regex': self.regex,
+            'log_pos': self.log_pos,
+            'groups': self.groups,
+        }
+        try:
+            self._cache_entry(request).update(data)
+            self.saved_pos = self.log_pos
+        except caching.CacheError as err:
+            logging.warning("could not save wiki groups index: %s" % str(err))
+
+    def refresh(self, request, backend):
+        """ Bring the index up to date (once per request, unless this
+            process wrote to the edit-log since then)
+
+        @rtype: bool
+        @return: False if the index can't be used now (it is being
+                 updated by this thread, e.g. a group page is rendered)
+        """
+        from MoinMoin.logfile import editlog
+        writes = editlog.EditLog.local_writes
+        if getattr(request, '_wiki_groups_checked', None) == (self, writes):
+            return True
+        with self._lock:
+            if self._updating:
+                return False
+            self._updating = True
             try:
-                cache_mtime = cache.mtime()
-                page_mtime = wikiutil.version2timestamp(page.mtime_usecs())
-                # TODO: fix up-to-date check mtime granularity problems.
-                #
-                # cache_mtime is float while page_mtime is integer
-                # The comparision needs to be done on the lowest type of both
-                if int(cache_mtime) > int(page_mtime):
-                    # cache is uptodate
-                    return cache.content()
-                else:
-                    raise caching.CacheError
-            except caching.CacheError:
-                # either cache does not exist, is erroneous or not uptodate: recreate it
-                members, member_groups = super(WikiGroup, self)._load_group()
-                cache.update((members, member_groups))
-                return members, member_groups
+                self._update(request, backend)
+            finally:
+                self._updating = False
+        request._wiki_groups_checked = (self, writes)
+        return True
+
+    def _update(self, request, backend):
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        regex = backend.page_group_regex.pattern
+        if self.regex != regex:
+            self.__init__()
+            self.regex = regex
+        if self.log_pos is None:
+            self._load(request)
+        size = elog.size()
+        if self.log_pos is None or self.log_pos > size:
+            self._rebuild(request, backend, size)
+        elif self.log_pos < size:
+            new_pos, items = elog.news(self.log_pos)
+            changed = [name for name in set(items) if backend.is_group_name(name)]
+            for group_name in changed:
+                logging.debug("wiki groups index: reading %r" % group_name)
+                self._read_group(request, backend, group_name)
+            self.log_pos = new_pos
+            if changed:
+                self._compute_closure()
+            if changed or self.log_pos - self.saved_pos > SAVE_LAG:
+                self._save(request)
+
+    def _rebuild(self, request, backend, log_pos):
+        logging.info("building wiki groups index")
+        # changes done while we read the pages will be read next time
+        self.log_pos = log_pos
+        self.groups = {}
+        for group_name in request.rootpage.getPageList(user='', filter=backend.page_group_regex.search):
+            self._read_group(request, backend, group_name)
+        self._compute_closure()
+        self._save(request)
+
+    def _read_group(self, request, backend, group_name):
+        if Page(request, group_name).exists():
+            self.groups[group_name] = backend._load_members(group_name)
         else:
-            raise GroupDoesNotExistError(group_name)
+            self.groups.pop(group_name, None)
+
+    def _compute_closure(self):
+        expanded = {}
+
+        def expand(group_name, processing):
+            """ Return (all members, external group names, cut) of a group,
+                cut are the groups in processing we didn't expand again
+                (to avoid infinite recursion) - the result is incomplete
+                then and can't be reused for other groups.
+            """
+            if group_name in expanded:
+                return expanded[group_name] + (set(), )
+            processing.add(group_name)
+            members, member_groups = self.groups[group_name]
+            all_members = set(members) | set(member_groups)
+            external = set()
+            cut = set()
+            for name in member_groups:
+                if name not in self.groups:
+                    external.add(name)
+                elif name in processing:
+                    cut.add(name)
+                else:
+                    nested_members, nested_external, nested_cut = expand(name, processing)
+                    all_members |= nested_members
+                    external |= nested_external
+                    cut |= nested_cut
+            processing.discard(group_name)
+            cut.discard(group_name)
+            if not cut:
+                expanded[group_name] = all_members, external
+            return all_members, external, cut
+
+        closure = {}
+        external = {}
+        for group_name in self.groups:
+            all_members, group_external, cut = expand(group_name, set())
+            for member in all_members:
+                closure.setdefault(member, set()).add(group_name)
+            if group_external:
+                external[group_name] = group_external
+        self.closure = closure
+        self.external = external
+
+    def groups_with_member(self, member):
+        """ Return the set of group pages <member> is in """
+        return self.closure.get(member, set())
+
+
+class WikiGroup(GreedyGroup):
+
+    def _load_group(self):
+        index = self._backend._index()
+        if index is not None:
+            try:
+                return index.groups[self.name]
+            except KeyError:
+                raise GroupDoesNotExistError(self.name)
+        if Page(self.request, self.name).exists():
+            return self._backend._load_members(self.name)
+        raise GroupDoesNotExistError(self.name)
+
+    def __contains__(self, member, processed_groups=None):
+        index = self._backend._index()
+        if index is None:
+            return super(WikiGroup, self).__contains__(member, processed_groups)
+        if self.name in index.groups_with_member(member):
+            return True
+        if self._backend._has_external(index, self.name):
+            # some groups in this group are defined by other backends
+            return super(WikiGroup, self).__contains__(member, processed_groups)
+        return False
 
 
 class WikiGroups(BaseGroupsBackend):
 
     def __contains__(self, group_name):
+        index = self._index()
+        if index is not None:
+            return group_name in index.groups
         return self.is_group_name(group_name) and Page(self.request, group_name).exists()
 
     def __iter__(self):
         """
         To find group pages, request.cfg.cache.page_group_regexact pattern is used.
         """
+        index = self._index()
+        if index is not None:
+            return iter(list(index.groups.keys()))
         return iter(self.request.rootpage.getPageList(user='', filter=self.page_group_regex.search))
 
     def __getitem__(self, group_name):
         return WikiGroup(request=self.request, name=group_name, backend=self)
 
+    def groups_with_member(self, member):
+        index = self._index()
+        if index is None:
+            for group_name in super(WikiGroups, self).groups_with_member(member):
+                yield group_name
+            return
+        group_names = index.groups_with_member(member)
+        for group_name in group_names:
+            yield group_name
+        for group_name in list(index.external.keys()):
+            if group_name not in group_names and self._has_external(index, group_name):
+                if member in self[group_name]:
+                    yield group_name
+
+    def _index(self):
+        """ Return the up to date WikiGroupsIndex or None if it can't be used """
+        cache = self.request.cfg.cache
+        index = getattr(cache, 'wiki_groups', None)
+        if index is None:
+            with _index_lock:
+                index = getattr(cache, 'wiki_groups', None)
+                if index is None:
+                    index = cache.wiki_groups = WikiGroupsIndex()
+        if index.refresh(self.request, self):
+            return index
+        return None
+
+    def _has_external(self, index, group_name):
+        """ Is some group in group_name defined by another backend? """
+        groups = self.request.groups
+        if groups is self:
+            return False  # all our groups are in the index
+        return [name for name in index.external.get(group_name, ()) if name in groups] != []
+
+    def _load_members(self, group_name):
+        """ Return (members, member groups) of the existing group page group_name
+
+        The result is cached in the wiki cache arena 'pagegroups'.
+        """
+        request = self.request
+        page = Page(request, group_name)
+        arena = 'pagegroups'
+        key = wikiutil.quoteWikinameFS(group_name)
+        cache = caching.CacheEntry(request, arena, key, scope='wiki', use_pickle=True)
+        try:
+            cache_mtime = cache.mtime()
+            page_mtime = wikiutil.version2timestamp(page.mtime_usecs())
+            # TODO: fix up-to-date check mtime granularity problems.
+            #
+            # cache_mtime is float while page_mtime is integer
+            # The comparision needs to be done on the lowest type of both
+            if int(cache_mtime) > int(page_mtime):
+                # cache is uptodate
+                return cache.content()
+            else:
+                raise caching.CacheError
+        except caching.CacheError:
+            # either cache does not exist, is erroneous or not uptodate: recreate it
+            members_retrieved = set(self._retrieve_members(group_name))
+            member_groups = set(member for member in members_retrieved if self.is_group_name(member))
+            members = members_retrieved - member_groups
+            cache.update((members, member_groups))
+            return members, member_groups
+
     def _retrieve_members(self, group_name):
         """
         MoinMoin.formatter.groups is used to extract group members from a page.
@@ -7,6 +7,7 @@
 """
 
 import sys, os
+import threading
 import time
 
 from MoinMoin import log
@@ -20,6 +21,21 @@ standard_codings = ['utf-8', 'iso-8859-15', 'iso-8859-1', ]
 
 from MoinMoin.util.SubProcess import exec_cmd
 
+# execfilter notes here if the command failed (e.g. is not installed, was
+# killed after the timeout or exited with an error) - the text it returned
+# may be empty or truncated then, so it should not be cached.
+_runs = threading.local()
+
+
+def start_run():
+    """ Forget the failed execfilter runs of the current thread """
+    _runs.failed = False
+
+
+def run_failed():
+    """ Did an execfilter run of the current thread fail since start_run()? """
+    return getattr(_runs, 'failed', False)
+
 
 def quote_filename(filename):
     """ quote a filename (could contain blanks or other special chars) in a
@@ -43,6 +59,10 @@ def execfilter(cmd, filename, codings=standard_codings):
     filter_cmd = cmd % quote_filename(filename)
     data, errors, rc = exec_cmd(filter_cmd, timeout=300)
     logging.debug("Command '%s', rc: %d, stdout: %d bytes, stderr: %s" % (filter_cmd, rc, len(data), errors))
+    if rc:
+        # rc 127: command not found, rc < 0: killed (timeout)
+        logging.warning("Command '%s' failed, rc: %d, stderr: %s" % (filter_cmd, rc, errors))
+        _runs.failed = True
     for c in codings:
         try:
             return data.decode(c)
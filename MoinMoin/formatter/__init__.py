@@ -13,7 +13,7 @@ from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin.util import pysupport
-from MoinMoin import wikiutil
+from MoinMoin import responsecache, wikiutil
 
 modules = pysupport.getPackageModules(__file__)
 
@@ -340,6 +340,7 @@ class FormatterBase:
         """
         # attention: this is copied into text_python!
         parser = wikiutil.searchAndImportPlugin(self.request.cfg, "parser", parser_name)
+        responsecache.add_dependencies(self.request, getattr(parser, 'Dependencies', ['time']))
         args = None
         if lines:
             args = self._get_bang_args(lines[0])
@@ -0,0 +1,178 @@
+"""
+    MoinMoin - wiki-wide link graph
+
+    The link graph remembers the links of all pages (forward links, as
+    returned by Page.getPageLinks) and the pages linking to every page
+    (backlinks), so WantedPages, OrphanedPages, the links and LocalSiteMap
+    actions and Page.getBacklinks don't need to load the pagelinks cache of
+    every page in the wiki.
+
+    The graph is kept in request.cfg.cache.link_graph and pickled to the
+    wiki cache arena 'linkgraph'. It remembers the edit-log position it was
+    last updated at and only reads the links of the pages saved, renamed or
+    deleted since then.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import threading
+
+from MoinMoin import caching
+from MoinMoin import log
+from MoinMoin.Page import Page
+
+logging = log.getLogger(__name__)
+
+# increment this if the format of the graph changes
+GRAPH_VERSION = 1
+
+# save the graph to the cache if it is this many bytes of edit-log behind
+# (when loading an older graph, we just read a bit more of the edit-log)
+SAVE_LAG = 64 * 1024
+
+_graph_lock = threading.Lock()
+
+
+class LinkGraph:
+    """ Links between all pages of the wiki
+
+        forward - {page name: tuple of link targets}, for all existing pages
+        backward - {link target: set of page names linking to it}, link
+                   targets need not exist
+    """
+
+    def __init__(self):
+        self.log_pos = None
+        self.saved_pos = None
+        self.forward = {}
+        self.backward = {}
+        self._lock = threading.RLock()
+        self._updating = False
+
+    def _cache_entry(self, request):
+        return caching.CacheEntry(request, 'linkgraph', 'graph', scope='wiki', use_pickle=True)
+
+    def _load(self, request):
+        try:
+            data = self._cache_entry(request).content()
+        except caching.CacheError:
+            data = None
+        if isinstance(data, dict) and data.get('version') == GRAPH_VERSION:
+            self.log_pos = self.saved_pos = data['log_pos']
+            self.forward = data['forward']
+            self.backward = data['backward']
+
+    def _save(self, request):
+        data = {
+            'version': GRAPH_VERSION,
+            'log_pos': self.log_pos,
+            'forward': self.forward,
+            'backward': self.backward,
+        }
+        try:
+            self._cache_entry(request).update(data)
+            self.saved_pos = self.log_pos
+        except caching.CacheError as err:
+            logging.warning("could not save link graph: %s" % str(err))
+
+    def refresh(self, request):
+        """ Bring the graph up to date (once per request, unless this
+            process wrote to the edit-log since then)
+
+        @rtype: bool
+        @return: False if the graph can't be used now (it is being
+                 updated by this thread, e.g. a page is rendered to get
+                 its links)
+        """
+        from MoinMoin.logfile import editlog
+        writes = editlog.EditLog.local_writes
+        if getattr(request, '_link_graph_checked', None) == (self, writes):
+            return True
+        with self._lock:
+            if self._updating:
+                return False
+            self._updating = True
+            try:
+                self._update(request)
+            finally:
+                self._updating = False
+        request._link_graph_checked = (self, writes)
+        return True
+
+    def _update(self, request):
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        if self.log_pos is None:
+            self._load(request)
+        size = elog.size()
+        if self.log_pos is None or self.log_pos > size:
+            self._rebuild(request, size)
+        elif self.log_pos < size:
+            new_pos, items = elog.news(self.log_pos)
+            for pagename in set(items):
+                logging.debug("link graph: reading %r" % pagename)
+                self._read_page(request, pagename)
+            self.log_pos = new_pos
+            if items or self.log_pos - self.saved_pos > SAVE_LAG:
+                self._save(request)
+
+    def _rebuild(self, request, log_pos):
+        logging.info("building link graph")
+        # changes done while we read the pages will be read next time
+        self.log_pos = log_pos
+        self.forward = {}
+        self.backward = {}
+        for pagename in request.rootpage.getPageList(user=''):
+            self._read_page(request, pagename)
+        self._save(request)
+
+    def _read_page(self, request, pagename):
+        page = Page(request, pagename)
+        if page.exists():
+            self._set_links(pagename, page.getPageLinks(request))
+        else:
+            self._set_links(pagename, None)
+
+    def _set_links(self, pagename, links):
+        """ Set the links of pagename, None removes the page """
+        for target in self.forward.pop(pagename, ()):
+            sources = self.backward.get(target)
+            if sources is not None:
+                sources.discard(pagename)
+                if not sources:
+                    del self.backward[target]
+        if links is None:
+            return
+        self.forward[pagename] = tuple(links)
+        for target in links:
+            self.backward.setdefault(target, set()).add(pagename)
+
+    def exists(self, pagename):
+        """ Does page pagename exist? """
+        return pagename in self.forward
+
+    def links(self, pagename):
+        """ Return the link targets of page pagename (empty if it does not exist) """
+        return self.forward.get(pagename, ())
+
+    def backlinks(self, pagename):
+        """ Return the set of the names of the pages linking to pagename """
+        return self.backward.get(pagename, set())
+
+
+def get_graph(request):
+    """ Return the up to date LinkGraph or None if it can't be used now
+
+    Callers getting None fall back to Page.getPageLinks.
+    """
+    cache = request.cfg.cache
+    graph = getattr(cache, 'link_graph', None)
+    if graph is None:
+        with _graph_lock:
+            graph = getattr(cache, 'link_graph', None)
+            if graph is None:
+                graph = cache.link_graph = LinkGraph()
+    if graph.refresh(request):
+        return graph
+    return None
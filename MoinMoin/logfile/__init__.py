@@ -8,11 +8,15 @@
 """
 import codecs
 import errno
+import gzip
 import os
+import shutil
+import time
 from logging import NOTSET
 
 from MoinMoin import config, wikiutil
 from MoinMoin import log
+from MoinMoin.util import lock
 
 logging = log.getLogger(__name__)
 
@@ -466,3 +470,179 @@ class LogFile:
             self._output.write(line)
             self._output.close()  # does this maybe help against the sporadic fedora wikis 160 \0 bytes in the edit-log?
             del self._output  # re-open the output file automagically
+
+
+class LogSegment:
+    """ An archived part of a log file, see LogSegments """
+
+    def __init__(self, directory, name, first_usecs, last_usecs, lines, size):
+        self.path = os.path.join(directory, name)
+        self.name = name
+        self.first_usecs = first_usecs
+        self.last_usecs = last_usecs
+        self.lines = lines
+        self.size = size  # uncompressed
+
+    def open(self):
+        """ Return the segment file, opened for reading in binary mode """
+        if self.name.endswith('.gz'):
+            return gzip.open(self.path, 'rb')
+        return open(self.path, 'rb')
+
+    def readlines(self):
+        """ Yield the lines of the segment (unicode, without line end) """
+        f = self.open()
+        try:
+            for line in f:
+                yield str(line.rstrip(b'\n'), config.charset)
+        finally:
+            f.close()
+
+
+class LogSegments:
+    """
+    Archived segments of a log file
+
+    rotate() moves the current content of a log file to a segment file in
+    the same directory, named after the log file and the UTC dates of its
+    first and last line (e.g. event-log.20260901-20260930 or, if compressed,
+    event-log.20260901-20260930.gz) and starts a new, empty log file.
+
+    The segments are listed in the manifest file <log file>.segments, one
+    line per segment (oldest first) with its name, first and last time
+    stamp (usecs, from the first field of the log lines), line count and
+    uncompressed size, separated by tabs. Thus, log readers can skip whole
+    segments outside the time range they need and we know the total line
+    count and size without reading the segments.
+
+    Only logs that are not accessed by file positions from elsewhere can be
+    rotated, this is the case for the event-log. Its writers append while
+    holding write_lock(), rotate() holds it while renaming the log file, so
+    no writer appends to a log file that is being moved to a segment.
+    """
+
+    def __init__(self, filename):
+        """
+        @param filename: name of the (current) log file
+        """
+        self.filename = filename
+        self.directory, self.basename = os.path.split(filename)
+        self.manifest = filename + '.segments'
+
+    def list(self, since=None, until=None):
+        """ Return the segments (oldest first)
+
+        @param since: only return segments with lines at or after this time (usecs)
+        @param until: only return segments with lines at or before this time (usecs)
+        @rtype: list of LogSegment
+        """
+        try:
+            f = open(self.manifest, 'r', encoding=config.charset)
+        except IOError:
+            return []
+        segments = []
+        try:
+            for line in f:
+                try:
+                    name, first, last, lines, size = line.rstrip('\n').split('\t')
+                    segment = LogSegment(self.directory, name, int(first), int(last), int(lines), int(size))
+                except ValueError:
+                    logging.warning("ignoring bad line in %r: %r" % (self.manifest, line))
+                    continue
+                if since is not None and segment.last_usecs < since:
+                    continue
+                if until is not None and segment.first_usecs > until:
+                    continue
+                segments.append(segment)
+        finally:
+            f.close()
+        return segments
+
+    def write_lock(self):
+        """ Return the lock held while appending to or renaming the log file
+
+        @rtype: MoinMoin.util.lock.ExclusiveLock
+        """
+        lock_dir = os.path.join(self.directory, '%s.write.lock' % self.basename)
+        return lock.ExclusiveLock(lock_dir, 60.0)
+
+    def rotate(self, compress=False):
+        """ Move the content of the log file to a new segment
+
+        @param compress: if True, gzip the new segment
+        @rtype: LogSegment or None
+        @return: the new segment or None if the log file was empty
+        """
+        lock_dir = os.path.join(self.directory, '%s.rotate.lock' % self.basename)
+        rlock = lock.ExclusiveLock(lock_dir, 3600.0)
+        if not rlock.acquire(60.0):
+            raise LogError("could not lock %r for rotation" % self.filename)
+        try:
+            try:
+                if not os.path.getsize(self.filename):
+                    return None
+            except OSError:
+                return None
+            # writers just create a new log file after this (they append
+            # to the log file by name and do not keep it open)
+            tmpname = self.filename + '.rotating'
+            wlock = self.write_lock()
+            if not wlock.acquire(60.0):
+                raise LogError("could not lock %r for writing" % self.filename)
+            try:
+                os.rename(self.filename, tmpname)
+            finally:
+                wlock.release()
+
+            first = last = None
+            lines = size = 0
+            f = open(tmpname, 'rb')
+            try:
+                for line in f:
+                    try:
+                        usecs = int(line.split(b'\t', 1)[0])
+                    except ValueError:
+                        usecs = None
+                    if usecs is not None:
+                        if first is None:
+                            first = usecs
+                        last = usecs
+                    lines += 1
+                    size += len(line)
+            finally:
+                f.close()
+            first = first or 0
+            last = last or first
+
+            def date(usecs):
+                return time.strftime('%Y%m%d', time.gmtime(wikiutil.version2timestamp(usecs)))
+            name = '%s.%s-%s' % (self.basename, date(first), date(last))
+            suffix = compress and '.gz' or ''
+            counter = 0
+            segname = name + suffix
+            while os.path.exists(os.path.join(self.directory, segname)):
+                counter += 1
+                segname = '%s.%d%s' % (name, counter, suffix)
+            segpath = os.path.join(self.directory, segname)
+            if compress:
+                fin = open(tmpname, 'rb')
+                try:
+                    fout = gzip.open(segpath, 'wb')
+                    try:
+                        shutil.copyfileobj(fin, fout)
+                    finally:
+                        fout.close()
+                finally:
+                    fin.close()
+                os.remove(tmpname)
+            else:
+                os.rename(tmpname, segpath)
+
+            f = open(self.manifest, 'a', encoding=config.charset)
+            try:
+                f.write(u'%s\t%d\t%d\t%d\t%d\n' % (segname, first, last, lines, size))
+            finally:
+                f.close()
+            return LogSegment(self.directory, segname, first, last, lines, size)
+        finally:
+            rlock.release()
@@ -15,6 +15,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import threading
 from logging import NOTSET
 
 from past.builtins import cmp
@@ -23,6 +24,7 @@ from MoinMoin import log
 from MoinMoin import wikiutil, user, config
 from MoinMoin.Page import Page
 from MoinMoin.logfile import LogFile
+from MoinMoin.logfile.editlogindex import EditLogIndex
 
 logging = log.getLogger(__name__)
 
@@ -153,13 +155,24 @@ class EditLog(LogFile):
     """ Used for accessing the global edit-log (e.g. by RecentChanges) as
         well as for the local edit-log (e.g. PageEditor, info action).
     """
+    # number of edit-log lines written by this process - caches that do not
+    # look at the edit-log on every access (see ItemCache.refresh) use this
+    # to notice changes done by the current request / process.
+    local_writes = 0
+    _local_writes_lock = threading.Lock()
+
     def __init__(self, request, filename=None, buffer_size=4096, **kw):
+        # only the global edit-log has an index (see since, page_history and
+        # user_edits), the local edit-logs of the pages are small anyway
+        self.index = None
         if filename is None:
             rootpagename = kw.get('rootpagename', None)
             if rootpagename:
                 filename = Page(request, rootpagename).getPagePath('edit-log', isfile=1)
             else:
                 filename = request.rootpage.getPagePath('edit-log', isfile=1)
+                if request.cfg.edit_log_index:
+                    self.index = EditLogIndex(request, filename)
         LogFile.__init__(self, filename, buffer_size)
         self._NUM_FIELDS = 9
         self._usercache = {}
@@ -213,6 +226,10 @@ class EditLog(LogFile):
                            comment,
                            )) + "\n"
         self._add(line)
+        with EditLog._local_writes_lock:
+            EditLog.local_writes += 1
+        if self.index is not None:
+            self.index.update()
 
     def parser(self, line):
         """ Parse edit-log line into fields """
@@ -233,16 +250,85 @@ class EditLog(LogFile):
 
     def set_filter(self, **kw):
         """ optionally filter for specific pagenames, addrs, hostnames, userids """
-        expr = "1"
-        for field in ['pagename', 'addr', 'hostname', 'userid']:
-            if field in kw:
-                expr = "%s and x.%s == %s" % (expr, field, repr(kw[field]))
-
+        checks = [(field, kw[field]) for field in ['pagename', 'addr', 'hostname', 'userid', ]
+                  if field in kw]
         if 'ed_time_usecs' in kw:
-            expr = "%s and long(x.ed_time_usecs) == %s" % (expr, int(kw['ed_time_usecs'])) # must be long for py 2.2.x
-
-        self.filter = eval("lambda x: " + expr)
-
+            checks.append(('ed_time_usecs', int(kw['ed_time_usecs'])))
+
+        def filter(x):
+            for field, value in checks:
+                if getattr(x, field) != value:
+                    return False
+            return True
+        self.filter = filter
+
+    def _line_at(self, position):
+        """ Return the parsed edit-log line at <position> """
+        self._input.seek(position)
+        return self.parser(str(self._input.readline().rstrip(b'\n'), config.charset))
+
+    def since(self, ed_time_usecs, newest_first=False):
+        """ Yield the edit-log entries at or after <ed_time_usecs>, oldest
+            first (or newest first, if <newest_first> is True).
+
+            Uses the edit-log index (if available) to find the first entry,
+            otherwise reads the edit-log backwards up to <ed_time_usecs>.
+        """
+        position = None
+        if self.index is not None:
+            position = self.index.find_time(ed_time_usecs)
+        if position is None:
+            lines = []
+            for line in self.reverse():
+                if line.ed_time_usecs < ed_time_usecs:
+                    break
+                if newest_first:
+                    yield line
+                else:
+                    lines.append(line)
+        elif position < self.size():
+            self.seek(position)
+            if not newest_first:
+                for line in self:
+                    yield line
+                return
+            lines = list(self)
+        else:
+            return
+        lines.reverse()
+        for line in lines:
+            yield line
+
+    def _indexed_lines(self, offsets, field, value, count):
+        if offsets is None:
+            lines = (line for line in self.reverse() if getattr(line, field) == value)
+        else:
+            lines = (line for line in (self._line_at(offset) for offset in offsets)
+                     if getattr(line, field) == value and (not self.filter or self.filter(line)))
+        for line in lines:
+            if count is not None:
+                if count <= 0:
+                    return
+                count -= 1
+            yield line
+
+    def page_history(self, pagename, count=None):
+        """ Yield the last <count> (default: all) edit-log entries of page
+            <pagename>, newest first.
+        """
+        offsets = None
+        if self.index is not None:
+            offsets = self.index.page_offsets(wikiutil.quoteWikinameFS(pagename))
+        return self._indexed_lines(offsets, 'pagename', pagename, count)
+
+    def user_edits(self, userid, count=None):
+        """ Yield the last <count> (default: all) edit-log entries by user
+            <userid>, newest first.
+        """
+        offsets = None
+        if userid and self.index is not None:
+            offsets = self.index.user_offsets(userid)
+        return self._indexed_lines(offsets, 'userid', userid, count)
 
     def news(self, oldposition):
         """ What has changed in the edit-log since <oldposition>?
@@ -0,0 +1,344 @@
+"""
+    MoinMoin - index of the global edit-log
+
+    The index allows looking up edit-log entries by time, page or user
+    without reading the edit-log backwards from its end.
+
+    It is a file of fixed-width records, one for every edit-log line and in
+    the same order as the edit-log (thus sorted by time):
+
+        (ed_time_usecs, offset, page_hash, user_hash, prev_page, prev_user)
+
+    offset - file offset of the line in the edit-log
+    page_hash - crc32 of the (quoted) page name
+    user_hash - crc32 of the user id (0 for anonymous edits)
+    prev_page - number of the previous record with the same page_hash or -1
+    prev_user - number of the previous record with the same user_hash or -1
+
+    Entries since some time are found by a binary search over ed_time_usecs.
+    The prev_* fields chain the records into a posting list for every page
+    and every user; the heads of these lists (the newest record for every
+    hash) are kept in memory and pickled to the cache from time to time.
+    Different names may have the same hash, so users of the posting lists
+    have to check the edit-log lines they get.
+
+    The index is kept in the wiki cache arena 'editlog' and is brought up to
+    date on EditLog.add and before every lookup, by indexing the edit-log
+    lines after the last indexed one. If the edit-log got shorter or does not
+    match the index any more, the index is rebuilt.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import struct
+import threading
+import zlib
+
+from MoinMoin import caching
+from MoinMoin import log
+from MoinMoin.util import lock
+
+logging = log.getLogger(__name__)
+
+# increment this if the format of the index or the heads changes
+EDIT_LOG_INDEX_VERSION = 1
+
+RECORD = struct.Struct('<qQIIii')
+NO_RECORD = -1
+
+# pickle the heads to the cache if they are more than this many records
+# behind the index (loading outdated heads just reads some more records)
+SAVE_LAG = 1000
+
+# heads of the posting lists, shared by all requests of this process:
+# index filename -> _Heads
+_heads = {}
+_heads_lock = threading.Lock()
+
+
+def name_hash(name):
+    """ Return the hash used for page names (quoted, see wikiutil.quoteWikinameFS)
+        and user ids in the index
+
+    @param name: page name or user id (str or bytes)
+    """
+    if not name:
+        return 0
+    if isinstance(name, str):
+        name = name.encode('utf-8')
+    return zlib.crc32(name) & 0xffffffff
+
+
+def _line_time(line):
+    try:
+        return int(line.split(b'\t', 1)[0])
+    except ValueError:
+        return 0
+
+
+class _Heads:
+    """ Newest record number for every page / user hash """
+
+    def __init__(self):
+        self.count = 0  # number of records covered
+        self.last = None  # last record covered (to detect a rebuilt index)
+        self.pages = {}
+        self.users = {}
+        self.saved_count = None
+
+    def add(self, recno, record):
+        page_hash, user_hash = record[2], record[3]
+        self.pages[page_hash] = recno
+        if user_hash:
+            self.users[user_hash] = recno
+        self.count = recno + 1
+        self.last = record
+
+
+class EditLogIndex:
+    """ Index of the global edit-log, see module docstring """
+
+    def __init__(self, request, log_filename):
+        """
+        @param request: the request object
+        @param log_filename: path of the edit-log
+        """
+        self.request = request
+        self.log_filename = log_filename
+        arena_dir = caching.get_arena_dir(request, 'editlog', 'wiki')
+        if not os.path.exists(arena_dir):
+            os.makedirs(arena_dir)
+        self.filename = os.path.join(arena_dir, 'index')
+        self.lock_dir = os.path.join(arena_dir, 'index.lock')
+
+    def _heads_entry(self):
+        return caching.CacheEntry(self.request, 'editlog', 'heads',
+                                  scope='wiki', use_pickle=True)
+
+    def _count(self):
+        try:
+            return os.path.getsize(self.filename) // RECORD.size
+        except OSError:
+            return 0
+
+    def _read_records(self, f, start, end):
+        """ Return the records start .. end-1 from open index file f """
+        f.seek(start * RECORD.size)
+        data = f.read((end - start) * RECORD.size)
+        return list(RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]))
+
+    def _read_record(self, f, recno):
+        f.seek(recno * RECORD.size)
+        return RECORD.unpack(f.read(RECORD.size))
+
+    def _open(self):
+        try:
+            return open(self.filename, 'rb')
+        except IOError:
+            return None
+
+    def _covered_end(self, f, count):
+        """ Return the edit-log position after the last indexed line or
+            None if the index does not match the edit-log.
+        """
+        if not count:
+            return 0
+        ed_time_usecs, offset = self._read_record(f, count - 1)[:2]
+        try:
+            logf = open(self.log_filename, 'rb')
+        except IOError:
+            return None
+        try:
+            logf.seek(offset)
+            line = logf.readline()
+        finally:
+            logf.close()
+        if not line.endswith(b'\n') or _line_time(line) != ed_time_usecs:
+            return None
+        return offset + len(line)
+
+    def _get_heads(self, f, count):
+        """ Return the heads for the first count records of the index
+
+            Must be called with _heads_lock held.
+        """
+        heads = _heads.get(self.filename)
+        if heads is None:
+            heads = self._load_heads()
+        if heads.count > count or (heads.count and
+                heads.last != self._read_record(f, heads.count - 1)):
+            heads = _Heads()  # index was rebuilt, heads are useless
+        if heads.count < count:
+            for recno, record in enumerate(self._read_records(f, heads.count, count), heads.count):
+                heads.add(recno, record)
+        _heads[self.filename] = heads
+        if heads.saved_count is None or heads.count - heads.saved_count > SAVE_LAG:
+            self._save_heads(heads)
+        return heads
+
+    def _load_heads(self):
+        heads = _Heads()
+        try:
+            data = self._heads_entry().content()
+        except caching.CacheError:
+            data = None
+        if isinstance(data, dict) and data.get('version') == EDIT_LOG_INDEX_VERSION:
+            heads.count = heads.saved_count = data['count']
+            heads.last = data['last']
+            heads.pages = data['pages']
+            heads.users = data['users']
+        return heads
+
+    def _save_heads(self, heads):
+        data = {
+            'version': EDIT_LOG_INDEX_VERSION,
+            'count': heads.count,
+            'last': heads.last,
+            'pages': heads.pages,
+            'users': heads.users,
+        }
+        try:
+            self._heads_entry().update(data)
+            heads.saved_count = heads.count
+        except caching.CacheError as err:
+            logging.warning("could not save edit-log index heads: %s" % str(err))
+
+    def update(self):
+        """ Index the edit-log lines that are not indexed yet
+
+        @rtype: bool
+        @return: True if the index covers the whole edit-log
+        """
+        try:
+            log_size = os.path.getsize(self.log_filename)
+        except OSError:
+            log_size = 0
+        count = self._count()
+        if count:
+            f = self._open()
+            if f is not None:
+                try:
+                    if self._covered_end(f, count) == log_size:
+                        return True  # nothing new
+                finally:
+                    f.close()
+        wlock = lock.ExclusiveLock(self.lock_dir, 30.0)
+        if not wlock.acquire(5.0):
+            logging.warning("could not lock edit-log index %r" % self.filename)
+            return False
+        try:
+            count = self._count()
+            f = self._open()
+            try:
+                end = count and self._covered_end(f, count) or 0
+                if end is None or end > log_size:
+                    logging.info("edit-log index does not match the edit-log, rebuilding it")
+                    count, end = 0, 0
+                if os.path.exists(self.filename) and os.path.getsize(self.filename) != count * RECORD.size:
+                    # cut off a partially written record (or everything)
+                    os.truncate(self.filename, count * RECORD.size)
+                if end == log_size:
+                    return True
+                with _heads_lock:
+                    heads = self._get_heads(f, count) if count else _Heads()
+                    records = []
+                    for ed_time_usecs, offset, page_hash, user_hash in self._parse_log(end):
+                        record = (ed_time_usecs, offset, page_hash, user_hash,
+                                  heads.pages.get(page_hash, NO_RECORD),
+                                  heads.users.get(user_hash, NO_RECORD) if user_hash else NO_RECORD)
+                        heads.add(heads.count, record)
+                        records.append(RECORD.pack(*record))
+                    with open(self.filename, 'ab') as out:
+                        out.write(b''.join(records))
+                    _heads[self.filename] = heads
+                    if heads.saved_count is None or heads.count - heads.saved_count > SAVE_LAG:
+                        self._save_heads(heads)
+            finally:
+                if f is not None:
+                    f.close()
+        finally:
+            wlock.release()
+        return True
+
+    def _parse_log(self, offset):
+        """ Yield (ed_time_usecs, offset, page_hash, user_hash) for the
+            complete edit-log lines after offset
+        """
+        logf = open(self.log_filename, 'rb')
+        try:
+            logf.seek(offset)
+            for line in logf:
+                if not line.endswith(b'\n'):
+                    break  # still being written
+                fields = line.split(b'\t')
+                ed_time_usecs = _line_time(line)
+                page_hash = name_hash(len(fields) > 3 and fields[3] or b'')
+                user_hash = name_hash(len(fields) > 6 and fields[6] or b'')
+                yield ed_time_usecs, offset, page_hash, user_hash
+                offset += len(line)
+        finally:
+            logf.close()
+
+    def find_time(self, ed_time_usecs):
+        """ Return the edit-log position of the first entry at or after
+            ed_time_usecs or None if the index is not usable.
+        """
+        if not self.update():
+            return None
+        f = self._open()
+        if f is None:
+            return None
+        try:
+            count = self._count()
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._read_record(f, mid)[0] < ed_time_usecs:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < count:
+                return self._read_record(f, lo)[1]
+            return self._covered_end(f, count)
+        finally:
+            f.close()
+
+    def _chain(self, name, head_attr, prev_field):
+        if not self.update():
+            return None
+        f = self._open()
+        if f is None:
+            return None
+        try:
+            count = self._count()
+            with _heads_lock:
+                heads = self._get_heads(f, count)
+                recno = getattr(heads, head_attr).get(name_hash(name), NO_RECORD)
+            offsets = []
+            while recno != NO_RECORD:
+                record = self._read_record(f, recno)
+                offsets.append(record[1])
+                recno = record[prev_field]
+            return offsets
+        finally:
+            f.close()
+
+    def page_offsets(self, qpagename):
+        """ Return the edit-log positions of the entries of a page (newest
+            first) or None if the index is not usable. Some of the entries
+            may belong to other pages with the same hash.
+
+        @param qpagename: quoted page name (see wikiutil.quoteWikinameFS)
+        """
+        return self._chain(qpagename, 'pages', 4)
+
+    def user_offsets(self, userid):
+        """ Return the edit-log positions of the entries of a user (newest
+            first) or None if the index is not usable. Some of the entries
+            may belong to other users with the same hash.
+
+        @param userid: user id
+        """
+        return self._chain(userid, 'users', 5)
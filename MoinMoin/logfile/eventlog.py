@@ -7,13 +7,125 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import atexit
+import os
+import threading
 import time
 
-from MoinMoin.logfile import LogFile
+from MoinMoin.logfile import LogFile, LogSegments
 from MoinMoin import wikiutil
+from MoinMoin import log
+
+logging = log.getLogger(__name__)
+
+
+def format_event(mtime_usecs, eventtype, values):
+    """ Return the event-log line for an event """
+    # Encode values in a query string TODO: use more readable format
+    values = wikiutil.makeQueryString(values)
+    return u"%d\t%s\t%s\n" % (mtime_usecs, eventtype, values)
+
+
+class BufferedWriter:
+    """ Writes events to an event-log file in batches from a background thread
+
+        Events are formatted and written by the thread, so EventLog.add only
+        has to queue them. A batch is written when batch_size events are
+        queued or the oldest queued event waited for flush_interval seconds,
+        and at process exit. If max_queued events are waiting, new events are
+        dropped (and counted in .dropped).
+    """
+
+    def __init__(self, filename, batch_size, flush_interval, max_queued):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # keeps batches in order
+        self._thread = threading.Thread(target=self._run, name='event-log writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, event):
+        """ Queue event (a (mtime_usecs, eventtype, values) tuple) """
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                self.dropped += 1
+                return
+            self._queue.append(event)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """ Write all queued events """
+        with self._write_lock:
+            with self._cond:
+                events, self._queue = self._queue, []
+                dropped = self.dropped - self._reported_dropped
+                self._reported_dropped = self.dropped
+            if dropped:
+                logging.warning("event-log queue for %r full, dropped %d events" % (self.filename, dropped))
+            if not events:
+                return
+            data = u''.join([format_event(*event) for event in events])
+            try:
+                # like unbuffered events, with the write lock
+                EventLog(None, filename=self.filename)._add(data)
+            except (IOError, OSError) as err:
+                logging.error("could not write %d events to %r: %s" % (len(events), self.filename, err))
+
+
+# event-log filename -> BufferedWriter of the current process
+_writers = {}
+_writers_lock = threading.Lock()
+_writers_pid = None
+
+
+def get_writer(request, filename):
+    """ Return the BufferedWriter for event-log filename """
+    global _writers_pid
+    with _writers_lock:
+        if _writers_pid != os.getpid():
+            # we are a new (forked) process, the threads of the old writers
+            # are gone (and their queued events belong to the parent)
+            _writers.clear()
+            _writers_pid = os.getpid()
+        writer = _writers.get(filename)
+        if writer is None:
+            cfg = request.cfg
+            writer = _writers[filename] = BufferedWriter(filename, cfg.log_events_buffer,
+                                                         cfg.log_events_flush_interval,
+                                                         10 * cfg.log_events_buffer)
+        return writer
+
+
+def flush_writers():
+    """ Write the queued events of all event-logs """
+    with _writers_lock:
+        writers = list(_writers.values()) if _writers_pid == os.getpid() else []
+    for writer in writers:
+        writer.flush()
+
+atexit.register(flush_writers)
+
 
 class EventLog(LogFile):
-    """ The global event-log is mainly used for statistics (e.g. EventStats) """
+    """ The global event-log is mainly used for statistics (e.g. EventStats)
+
+        Old events may have been moved to archived segments (see
+        LogSegments), reverse() and events() also read those.
+    """
     def __init__(self, request, filename=None, buffer_size=65536, **kw):
         if filename is None:
             rootpagename = kw.get('rootpagename', None)
@@ -23,6 +135,8 @@ class EventLog(LogFile):
             else:
                 filename = request.rootpage.getPagePath('event-log', isfile=1)
         LogFile.__init__(self, filename, buffer_size)
+        self._filename = filename
+        self.segments = LogSegments(filename)
 
     def add(self, request, eventtype, values=None, add_http_info=1,
             mtime_usecs=None):
@@ -53,9 +167,22 @@ class EventLog(LogFile):
             values['wikiname'] = cfg.interwikiname
             values['url'] = request.url
 
-        # Encode values in a query string TODO: use more readable format
-        values = wikiutil.makeQueryString(values)
-        self._add(u"%d\t%s\t%s\n" % (mtime_usecs, eventtype, values))
+        if cfg.log_events_buffer > 0:
+            get_writer(request, self._filename).put((mtime_usecs, eventtype, dict(values)))
+        else:
+            self._add(format_event(mtime_usecs, eventtype, values))
+
+    def _add(self, line):
+        """ Append line, holding the write lock (see LogSegments) """
+        wlock = self.segments.write_lock()
+        locked = wlock.acquire(30.0)
+        if not locked:
+            logging.warning("could not lock %r for writing, writing anyway" % self._filename)
+        try:
+            LogFile._add(self, line)
+        finally:
+            if locked:
+                wlock.release()
 
     def parser(self, line):
         """ parse a event-log line into its components """
@@ -74,3 +201,69 @@ class EventLog(LogFile):
             self.filter = lambda line: (line[1] in event_types)
 
 
+
+    def _accept(self, event):
+        return event is not None and (not self.filter or self.filter(event))
+
+    def _segment_events(self, segment, backward=False):
+        """ Yield the events of an archived segment that pass the filter """
+        if backward and not segment.name.endswith('.gz'):
+            seglog = EventLog(None, filename=segment.path, buffer_size=self.buffer_size)
+            seglog.filter = self.filter
+            for event in LogFile.reverse(seglog):
+                yield event
+            return
+        lines = segment.readlines()
+        if backward:
+            # we can't read compressed files backwards
+            lines = reversed(list(lines))
+        for line in lines:
+            event = self.parser(line)
+            if self._accept(event):
+                yield event
+
+    def reverse(self, since=None):
+        """ yield events in reverse direction starting from the last one,
+            continuing with the archived segments
+
+        @param since: stop at the first event older than this (usecs)
+        @rtype: iterator
+        """
+        for event in LogFile.reverse(self):
+            if since is not None and event[0] < since:
+                return
+            yield event
+        for segment in reversed(self.segments.list(since=since)):
+            for event in self._segment_events(segment, backward=True):
+                if since is not None and event[0] < since:
+                    return
+                yield event
+
+    def events(self, since=None, until=None):
+        """ yield events in forward direction, starting with the oldest
+            archived segment
+
+        @param since: skip events older than this (usecs)
+        @param until: stop at the first event newer than this (usecs)
+        @rtype: iterator
+        """
+        def sources():
+            for segment in self.segments.list(since=since, until=until):
+                yield self._segment_events(segment)
+            self.to_begin()
+            yield self
+        for source in sources():
+            for event in source:
+                if since is not None and event[0] < since:
+                    continue
+                if until is not None and event[0] > until:
+                    return
+                yield event
+
+    def lines(self):
+        """ Return number of lines in the log file and its archived segments """
+        return LogFile.lines(self) + sum([segment.lines for segment in self.segments.list()])
+
+    def total_size(self):
+        """ Return size of the log file and its (uncompressed) archived segments """
+        return self.size() + sum([segment.size for segment in self.segments.list()])
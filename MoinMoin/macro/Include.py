@@ -17,12 +17,15 @@
 
 Dependencies = ["time"]  # works around MoinMoinBugs/TableOfContentsLacksLinks
 
+# the page HTML cache is told about the included pages, see below
+ResponseDependencies = []
+
 generates_headings = True
 
 import io
 import re
 
-from MoinMoin import wikiutil
+from MoinMoin import responsecache, wikiutil
 from MoinMoin.Page import Page
 
 _sysmsg = '<p><strong class="%s">%s</strong></p>'
@@ -87,6 +90,10 @@ def execute(macro, text, args_re=re.compile(_args_re_pattern), title_re=re.compi
         else:
             # Get user filtered readable page list
             pagelist = request.rootpage.getPageList(filter=inc_match.match)
+            responsecache.add_dependencies(request, ['namespace'])
+
+    for inc_name in pagelist:
+        responsecache.add_page(request, inc_name)
 
     # sort and limit page list
     pagelist.sort()
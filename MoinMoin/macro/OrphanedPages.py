@@ -5,6 +5,8 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+from MoinMoin import linkgraph
+
 Dependencies = ["pages"]
 
 
@@ -16,15 +18,16 @@ def macro_OrphanedPages(macro):
     if macro.request.isSpiderAgent:  # reduce bot cpu usage
         return ''
 
-    # delete all linked pages from a dict of all pages
+    graph = linkgraph.get_graph(macro.request)
+    if graph is None:  # prevent recursion, the graph is being updated
+        return ''
+
+    # all pages no (readable) page links to
     pages = macro.request.rootpage.getPageDict()
     orphaned = {}
-    orphaned.update(pages)
-    for page in list(pages.values()):
-        links = page.getPageLinks(macro.request)
-        for link in links:
-            if link in orphaned:
-                del orphaned[link]
+    for name in pages:
+        if not [source for source in graph.backlinks(name) if source in pages]:
+            orphaned[name] = pages[name]
 
     result = []
     f = macro.formatter
@@ -6,9 +6,8 @@
 
 """
 
-from MoinMoin import caching
 from MoinMoin.Page import Page
-from MoinMoin.logfile import eventlog
+from MoinMoin.stats import aggregate
 
 
 class PageHits:
@@ -16,65 +15,25 @@ class PageHits:
     def __init__(self, macro):
         self.macro = macro
         self.request = macro.request
-        self.cache = caching.CacheEntry(self.request, 'charts', 'pagehits', scope='wiki', use_pickle=True)
 
     def execute(self):
         """ Execute the macro and return output """
         if self.request.isSpiderAgent:  # reduce bot cpu usage
             return ''
-        cacheDate, hits = self.cachedHits()
-        self.addHitsFromLog(hits, cacheDate)
+        hits = aggregate.get_stats(self.request, aggregate.EventStats.page_hits)
         self.filterReadableHits(hits)
         hits = [(hits[pagename], pagename) for pagename in hits]
         hits.sort()
         hits.reverse()
         return self.format(hits)
 
-    def cachedHits(self):
-        """ Return tuple (cache date, cached hits) for all pages """
-        date, hits = 0, {}
-        if self.cache.exists():
-            try:
-                date, hits = self.cache.content()
-            except caching.CacheError:
-                self.cache.remove()
-        return date, hits
-
-    def addHitsFromLog(self, hits, cacheDate):
-        """ Parse the log, add hits after cacheDate and update the cache """
-        event_log = eventlog.EventLog(self.request)
-        event_log.set_filter(['VIEWPAGE'])
-
-        changed = False
-        # don't use event_log.date()
-        latest = None
-        for event in event_log.reverse():
-            if latest is None:
-                latest = event[0]
-            if event[0] <= cacheDate:
-                break
-            page = event[2].get('pagename', None)
-            if page:
-                hits[page] = hits.get(page, 0) + 1
-                changed = True
-
-        if changed:
-            self.updateCache(latest, hits)
-
-    def updateCache(self, date, hits):
-        try:
-            self.cache.update((date, hits))
-        except caching.CacheError:
-            pass
-
     def filterReadableHits(self, hits):
         """ Filter out hits the user many not see """
-        userMayRead = self.request.user.may.read
+        existing = [pagename for pagename in hits if Page(self.request, pagename).exists()]
+        readable = set(self.request.user.may.may_read_many(existing))
         for pagename in list(hits.keys()):  # we need .keys() because we modify the dict
-            page = Page(self.request, pagename)
-            if page.exists() and userMayRead(pagename):
-                continue
-            del hits[pagename]
+            if pagename not in readable:
+                del hits[pagename]
 
     def format(self, hits):
         """ Return formated output """
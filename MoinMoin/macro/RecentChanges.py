@@ -291,7 +291,13 @@ def macro_RecentChanges(macro, abandoned=False):
     this_day = today
     day_count = 0
 
-    for line in log.reverse():
+    if bookmark_usecs and not max_days:
+        # we only show the changes since the bookmark, the edit-log index
+        # finds them without reading through the older ones
+        lines = log.since(bookmark_usecs, newest_first=True)
+    else:
+        lines = log.reverse()
+    for line in lines:
 
         if not context.user.may.read(line.pagename):
             continue
@@ -347,7 +353,7 @@ def macro_RecentChanges(macro, abandoned=False):
             # but above does not trigger if we have the first day in wiki history
             for p in pages:
                 ignore_pages[p] = None
-            pages = sorted(pages.values(), lambda i: i[0], reverse=True)
+            pages = sorted(pages.values(), key=lambda i: i[0], reverse=True)
 
             if context.user.valid:
                 bmtime = pages[0][0].ed_time_usecs
@@ -110,7 +110,14 @@ class SystemInfo:
 
             # This puts a heavy load on the server when the log is large
             eventlogger = eventlog.EventLog(request)
-            row('Event log', self.formatInReadableUnits(eventlogger.size()))
+            row('Event log', self.formatInReadableUnits(eventlogger.total_size()))
+
+            code_cache = request.cfg.cache.page_code
+            if code_cache is not None:
+                stats = code_cache.stats()
+                row('Page code cache', "%d hits, %d misses, %d pages (%s of %s)" % (
+                    stats['hits'], stats['misses'], stats['entries'],
+                    self.formatInReadableUnits(stats['size']), self.formatInReadableUnits(stats['max_size'])))
 
         nonestr = _("NONE")
         # a valid user gets info about all installed extensions
@@ -5,7 +5,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import wikiutil
+from MoinMoin import linkgraph, wikiutil
 
 Dependencies = ["pages"]
 
@@ -31,6 +31,10 @@ def macro_WantedPages(macro):
                  page.link_to(context, label, querystr={'allpages': '%s' % (allpages and '0' or '1')}) + \
                  macro.formatter.div(0)
 
+    graph = linkgraph.get_graph(context)
+    if graph is None:  # prevent recursion, the graph is being updated
+        return ''
+
     # Get page dict readable by current user
     pages = context.rootpage.getPageDict()
 
@@ -44,12 +48,14 @@ def macro_WantedPages(macro):
             continue
 
         # Add links to pages which do not exist in pages dict
-        links = page.getPageLinks(context)
+        links = [link for link in graph.links(name) if link not in pages]
+        if not links:
+            continue
         is_deprecated = page.parse_processing_instructions(
         ).get('deprecated', False)
 
         for link in links:
-            if link not in pages and context.user.may.read(link):
+            if context.user.may.read(link):
                 if is_deprecated:
                     deprecated_links.append(link)
                 if link in wanted:
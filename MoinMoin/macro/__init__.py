@@ -23,7 +23,7 @@ logging = log.getLogger(__name__)
 
 import re, time
 from MoinMoin import config
-from MoinMoin import wikiutil, i18n
+from MoinMoin import responsecache, wikiutil, i18n
 from MoinMoin.Page import Page
 from MoinMoin.datastruct.backends.wiki_dicts import WikiDict
 
@@ -107,6 +107,8 @@ class Macro:
             return self.formatter.text(_('<<%(macro_name)s: invalid macro name>>') % {
                 'macro_name': macro_name,
             })
+        if responsecache.recording(self.request):
+            responsecache.add_dependencies(self.request, self.get_response_dependencies(macro_name))
         try:
             call = wikiutil.importPlugin(self.cfg, 'macro', macro_name,
                                          function='macro_%s' % macro_name)
@@ -169,6 +171,17 @@ class Macro:
         except wikiutil.PluginError:
             return self.defaultDependency
 
+    def get_response_dependencies(self, macro_name):
+        """ Dependencies of the macro output for the page HTML cache (see
+            MoinMoin.responsecache), macros declare them as
+            ResponseDependencies if they differ from their Dependencies
+        """
+        try:
+            return wikiutil.importPlugin(self.request.cfg, 'macro',
+                                         macro_name, 'ResponseDependencies')
+        except wikiutil.PluginError:
+            return self.get_dependencies(macro_name)
+
     def macro_TitleSearch(self):
         from MoinMoin.macro.FullSearch import search_box
         return search_box("titlesearch", self)
@@ -0,0 +1,235 @@
+"""
+    MoinMoin - persistent page index
+
+    The page index remembers the names of all pages in the data and underlay
+    directories together with their status, so RootPage.getPageList does not
+    need to list the pages directories and stat every page directory in them.
+
+    For every page name we keep an entry tuple:
+
+        (underlay, exists, rev, mtime)
+
+    underlay - 1 if the current revision comes from the underlay dir, else 0
+    exists - True if the current revision exists (False for deleted pages)
+    rev - current revision number (0 if unknown)
+    mtime - mtime of the current revision file in usecs (0 for deleted pages)
+
+    The index is pickled to the wiki cache arena 'pagelists'. It remembers
+    the edit-log position it was last updated at, so loading it just reads
+    the edit-log tail and only re-checks the pages mentioned there. A full
+    rebuild (listing the pages directories) is only done if there is no usable
+    index on disk, the edit-log got shorter or the underlay directory changed.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+
+from MoinMoin import caching, wikiutil
+from MoinMoin import log
+
+logging = log.getLogger(__name__)
+
+# increment this if the on-disk format of the index changes
+PAGE_INDEX_VERSION = 1
+
+# write the index back to disk if we had to read more than this many bytes
+# of edit-log to bring it up to date (a stale index on disk is fine, it just
+# makes loading it a bit slower)
+SAVE_LAG = 16 * 1024
+
+
+def _page_dirs(request):
+    """ Return the list of pages directories, indexed by the underlay flag """
+    cfg = request.cfg
+    dirs = [os.path.join(cfg.data_dir, 'pages')]
+    if cfg.data_underlay_dir is not None:
+        dirs.append(os.path.join(cfg.data_underlay_dir, 'pages'))
+    return dirs
+
+
+def _dir_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _current_rev(pagedir):
+    """ Return the revision number from the 'current' file or None """
+    try:
+        f = open(os.path.join(pagedir, 'current'))
+        try:
+            return int(f.read().strip())
+        finally:
+            f.close()
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def probe_page(request, pagename):
+    """ Look at the page directories of a single page and return its entry
+
+    This does the same layering as Page.get_rev: the data dir wins if the
+    current revision exists there, otherwise we use the underlay dir.
+
+    @param pagename: name of the page (unicode)
+    @rtype: tuple or None
+    @return: index entry or None if there is no page directory at all
+    """
+    qpagename = wikiutil.quoteWikinameFS(pagename)
+    entry = None
+    for underlay, pages_dir in enumerate(_page_dirs(request)):
+        pagedir = os.path.join(pages_dir, qpagename)
+        rev = _current_rev(pagedir)
+        if rev is None:
+            if entry is None and os.path.isdir(pagedir):
+                entry = (0, False, 0, 0)
+            continue
+        revfile = os.path.join(pagedir, 'revisions', '%08d' % rev)
+        try:
+            mtime = wikiutil.timestamp2version(os.path.getmtime(revfile))
+        except OSError:
+            if entry is None:
+                entry = (0, False, rev, 0)
+            continue
+        return (underlay, True, rev, mtime)
+    return entry
+
+
+def _get_underlay_mtime(request):
+    # the underlay is not written to by the wiki (and thus its changes
+    # are not in the edit-log), but it usually changes only on upgrades.
+    dirs = _page_dirs(request)
+    if len(dirs) > 1:
+        return _dir_mtime(dirs[1])
+    return None
+
+
+def _is_page_dirname(name):
+    # We exclude everything starting with '.' (see RootPage._listPageInPath)
+    # and the deprecated CVS directory.
+    return not name.startswith('.') and name != 'CVS'
+
+
+def _is_indexed(pagename):
+    # Filter those annoying editor backups - current moin does not create
+    # those pages any more, but users have them already in data/pages
+    return pagename and not pagename.endswith(u'/MoinEditorBackup')
+
+
+class PageIndex:
+    """ Persistent index of all pages, see module docstring
+
+        A PageIndex object does not keep a reference to a request, so it can
+        be kept in request.cfg.cache and be shared between requests.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.log_pos = None
+        self.underlay_mtime = None
+        self._saved_pos = None
+
+    def _cache_entry(self, request):
+        return caching.CacheEntry(request, 'pagelists', 'index',
+                                  scope='wiki', use_pickle=True)
+
+    def load(self, request):
+        """ Load the index from disk and bring it up to date
+
+        @param request: the request object
+        @rtype: dict
+        @return: dict {pagename: entry}
+        """
+        from MoinMoin.logfile import editlog
+        try:
+            data = self._cache_entry(request).content()
+        except caching.CacheError:
+            data = None
+        if isinstance(data, dict) and data.get('version') == PAGE_INDEX_VERSION:
+            self.pages = data['pages']
+            self.log_pos = self._saved_pos = data['log_pos']
+            self.underlay_mtime = data['underlay_mtime']
+
+        elog = editlog.EditLog(request)
+        if (self.log_pos is None or self.log_pos > elog.size() or
+            self.underlay_mtime != _get_underlay_mtime(request)):
+            self.rebuild(request)
+        else:
+            new_pos, names = elog.news(self.log_pos)
+            self.apply_news(request, new_pos, names)
+        return self.pages
+
+    def rebuild(self, request):
+        """ Build the index from scratch by listing the pages directories
+
+        @param request: the request object
+        """
+        from MoinMoin.logfile import editlog
+        logging.debug("rebuilding page index")
+        # remember the position first, changes done while we are scanning
+        # will be applied again from the edit-log on next load
+        self.log_pos = editlog.EditLog(request).size()
+        self.underlay_mtime = _get_underlay_mtime(request)
+        names = set()
+        for pages_dir in _page_dirs(request):
+            try:
+                dirnames = os.listdir(pages_dir)
+            except OSError:
+                continue
+            for name in dirnames:
+                if _is_page_dirname(name):
+                    names.add(wikiutil.unquoteWikiname(name))
+        self.pages = {}
+        self.update(request, names)
+        self.save(request)
+
+    def update(self, request, names):
+        """ Re-check the given pages and update their index entries
+
+        Pages without a page directory (e.g. the old name of a renamed
+        page) are dropped from the index.
+
+        @param request: the request object
+        @param names: iterable of page names (unicode)
+        """
+        for pagename in set(names):
+            if not _is_indexed(pagename):
+                continue
+            entry = probe_page(request, pagename)
+            if entry is None:
+                self.pages.pop(pagename, None)
+            else:
+                self.pages[pagename] = entry
+
+    def apply_news(self, request, new_pos, names):
+        """ Apply the changes found in the edit-log up to new_pos
+
+        @param request: the request object
+        @param new_pos: edit-log position after the changes
+        @param names: names of the changed pages (see EditLog.news)
+        """
+        self.update(request, names)
+        if self.log_pos is None or new_pos > self.log_pos:
+            self.log_pos = new_pos
+        if self._saved_pos is None or self.log_pos - self._saved_pos > SAVE_LAG:
+            self.save(request)
+
+    def save(self, request):
+        """ Write the index to disk
+
+        @param request: the request object
+        """
+        data = {
+            'version': PAGE_INDEX_VERSION,
+            'log_pos': self.log_pos,
+            'underlay_mtime': self.underlay_mtime,
+            'pages': self.pages,
+        }
+        try:
+            self._cache_entry(request).update(data)
+            self._saved_pos = self.log_pos
+        except caching.CacheError as err:
+            logging.warning("could not save page index: %s" % str(err))
@@ -0,0 +1,297 @@
+"""
+    MoinMoin - caches for page views (HTML and HTTP validators)
+
+    Most page views come from anonymous visitors, and all of them get the
+    same HTML for a page: besides the page content, the theme output
+    (navibar, trail, actions menu, ...) only depends on the user, the UI
+    language and the configuration. With page_html_cache enabled, the
+    complete HTML of such a view is kept in request.cfg.cache.html (an
+    ItemCache using the cache_store), so the next view of the page is
+    served without parsing, executing the page code or theming.
+
+    Only plain action=show requests (GET without any parameters) of
+    anonymous visitors without a session are served from the cache (and
+    only if anonymous sessions are disabled). The cache keeps the HTML by
+    page name and by a key made of the page revision, theme, UI language,
+    URL root and configuration.
+
+    While the page is rendered, the macros and parsers used note their
+    dependencies (see add_dependencies):
+
+     * pages using macros or parsers depending on the time or on the user
+       are not cached
+     * the HTML of pages using macros depending on all pages ("pages",
+       "namespace") is removed whenever any page changes
+     * the Include macro notes the included pages (see add_page)
+
+    With page_etags enabled, page views of all users get an ETag (the MD5
+    of the HTML) and a Last-Modified header. These validators are kept in
+    request.cfg.cache.etags by page name and by a key made of the HTML
+    cache key, the user (and the version of the user profile) and the
+    trail (at most MAX_VIEWS_PER_PAGE per page). If the validators of a
+    view are known, a conditional request (If-None-Match or
+    If-Modified-Since) the client already has the view for is answered
+    with 304 Not Modified before anything is rendered.
+
+    Both ItemCaches follow the edit-log (see invalidate): for every changed
+    page, the views of the page itself, of the pages linking to it (their
+    links look different if it was created or deleted, see
+    MoinMoin.linkgraph) and of the pages including it are removed. If a
+    group page changed, all views are removed (they depend on the ACLs).
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import calendar
+import hashlib
+import io
+import time
+
+from MoinMoin import log, wikiutil
+from MoinMoin.logfile import editlog, eventlog
+
+logging = log.getLogger(__name__)
+
+# dependencies of macros and parsers (see their Dependencies) that make
+# the HTML differ from view to view (e.g. StatsChart has "time24:00")
+UNCACHEABLE_DEPENDENCIES = ('time', 'user', )
+
+# dependencies that make the HTML depend on all pages
+ANY_PAGE_DEPENDENCIES = ('pages', 'namespace', )
+
+# max. number of views (e.g. of different users and trails) we remember
+# for a page, the oldest ones are forgotten first
+MAX_VIEWS_PER_PAGE = 100
+
+
+class Recorder:
+    """ What the HTML of the page being cached depends on """
+
+    def __init__(self):
+        self.cacheable = True
+        self.any_page = False
+        self.pages = set()  # included pages
+
+
+def recording(request):
+    """ Is the page being rendered for the cache? """
+    return getattr(request, '_html_cache_recorder', None) is not None
+
+
+def add_dependencies(request, dependencies):
+    """ Note the dependencies of a macro or parser used by the page being
+        rendered (if it is rendered for the cache)
+
+    @param request: the request object
+    @param dependencies: list of dependencies, e.g. ['time']
+    """
+    recorder = getattr(request, '_html_cache_recorder', None)
+    if recorder is None:
+        return
+    for dependency in dependencies:
+        if dependency.startswith(UNCACHEABLE_DEPENDENCIES):
+            recorder.cacheable = False
+        elif dependency in ANY_PAGE_DEPENDENCIES:
+            recorder.any_page = True
+
+
+def add_page(request, pagename):
+    """ Note that the page being rendered includes page pagename """
+    recorder = getattr(request, '_html_cache_recorder', None)
+    if recorder is not None:
+        recorder.pages.add(pagename)
+
+
+def _view_key(request, page):
+    """ Return the part of the cache keys common to all views of page or
+        None if this view can't be cached
+    """
+    cfg = request.cfg
+    if (request.request.method != 'GET' or
+            request.request.values or
+            request.rev):
+        return None
+    return (page.current_rev(), request.theme.name, request.lang,
+            request.request.url_root, request.isSpiderAgent, cfg.cfg_mtime)
+
+
+def _html_key(request, view_key):
+    """ Return the HTML cache key for this view or None if the HTML cache
+        can't be used for it
+    """
+    cfg = request.cfg
+    if (cfg.cache.html is None or
+            request.user.valid or
+            not request.session.new or
+            cfg.cookie_lifetime[0]):
+        return None
+    return view_key
+
+
+def _etag_key(request, page, view_key):
+    """ Return the validator key for this view or None if we don't give
+        validators
+    """
+    user = request.user
+    if request.cfg.cache.etags is None:
+        return None
+    # the trail shown in the page includes this page, so we add it now
+    # (send_page does it again, which changes nothing)
+    user.addTrail(page)
+    if user.valid:
+        user_key = (user.id, user.last_saved)
+    else:
+        user_key = None  # anonymous users get a new id for every request
+    return view_key + (user_key, tuple(user.getTrail()))
+
+
+def _make_etag(html):
+    return '"%s"' % hashlib.md5(html.encode('utf-8')).hexdigest()
+
+
+def _not_modified(request, validators):
+    """ Does the client have the view with these validators? """
+    etag, last_modified = validators[:2]
+    if_none_match = request.request.if_none_match
+    if if_none_match:
+        return if_none_match.contains_weak(etag[1:-1])
+    if_modified_since = request.request.if_modified_since
+    if if_modified_since is not None:
+        return last_modified <= calendar.timegm(if_modified_since.utctimetuple())
+    return False
+
+
+def _send_validators(request, validators):
+    etag, last_modified = validators[:2]
+    request.response.headers['ETag'] = etag
+    request.response.last_modified = last_modified
+
+
+def _store(request, cache, limit, pagename, key, entry):
+    """ Remember entry for this view if the cache is not full """
+    store = cache.store
+    entries = store.get_all(pagename)
+    if entries is None:
+        if len(store.names()) > limit:
+            return  # full, we only remember new entries for the pages we already have
+    elif len(entries) >= MAX_VIEWS_PER_PAGE and key not in entries:
+        keep = list(entries.items())[len(entries) - MAX_VIEWS_PER_PAGE + 1:]
+        keep.append((key, entry))
+        store.put_all(pagename, dict(keep))
+        return
+    cache.putItem(request, pagename, key, entry)
+
+
+def send_page(request, page, **keywords):
+    """ Send page like page.send_page(**keywords), answered with 304 Not
+        Modified, served from the HTML cache or added to the caches if this
+        is a view the caches can be used for
+    """
+    html_key = etag_key = None
+    view_key = _view_key(request, page)
+    if view_key is not None:
+        html_key = _html_key(request, view_key)
+        etag_key = _etag_key(request, page, view_key)
+    if html_key is None and etag_key is None:
+        page.send_page(**keywords)
+        return
+
+    cfg = request.cfg
+    pagename = page.page_name
+    validators = None
+    if etag_key is not None:
+        validators = cfg.cache.etags.getItem(request, pagename, etag_key)
+        if validators is not None and _not_modified(request, validators):
+            if keywords.get('count_hit', 0):
+                eventlog.EventLog(request).add(request, 'VIEWPAGE', {'pagename': pagename})
+            if request.user.valid:
+                request.disableHttpCaching(level=1)
+            _send_validators(request, validators)
+            request.response.status_code = 304
+            return
+
+    if html_key is not None:
+        entry = cfg.cache.html.getItem(request, pagename, html_key)
+        if entry is not None:
+            content_type, html, pages, any_page, content_lang = entry
+            if keywords.get('count_hit', 0):
+                eventlog.EventLog(request).add(request, 'VIEWPAGE', {'pagename': pagename})
+            request.setContentLanguage(content_lang)
+            request.response.content_type = content_type
+            request.response.status_code = 200
+            if etag_key is not None:
+                if validators is None:
+                    validators = (_make_etag(html), int(time.time()), pages, any_page)
+                    _store(request, cfg.cache.etags, cfg.page_etags_pages, pagename, etag_key, validators)
+                _send_validators(request, validators)
+            request.write(html)
+            return
+
+    recorder = request._html_cache_recorder = Recorder()
+    buf = io.StringIO()
+    request.redirect(buf)
+    try:
+        page.send_page(**keywords)
+    finally:
+        request.redirect()
+        request._html_cache_recorder = None
+        html = buf.getvalue()
+        request.write(html)
+
+    if not recorder.cacheable or request.response.status_code != 200:
+        return
+    # if the wiki changed since the caches read the edit-log, what we just
+    # rendered might already be outdated
+    log_size = editlog.EditLog(request).size()
+    pages = frozenset(recorder.pages)
+    if html_key is not None and cfg.cache.html.log_pos == log_size:
+        _store(request, cfg.cache.html, cfg.page_html_cache_pages, pagename, html_key,
+               (request.response.content_type, html, pages, recorder.any_page,
+                getattr(request.response, 'content_lang', cfg.language_default)))
+    if etag_key is not None and cfg.cache.etags.log_pos == log_size:
+        validators = (_make_etag(html), int(time.time()), pages, recorder.any_page)
+        _store(request, cfg.cache.etags, cfg.page_etags_pages, pagename, etag_key, validators)
+        _send_validators(request, validators)
+
+
+def invalidate(request, store, pagenames):
+    """ Remove the cached views (HTML or validators) showing the changed
+        pages (called by the ItemCache when it sees changes in the edit-log)
+
+    @param request: the request object
+    @param store: the store of the ItemCache, the third and fourth item
+                  of its entries are the included pages and the any page
+                  flag
+    @param pagenames: names of the changed pages
+    """
+    from MoinMoin import linkgraph
+    graph = linkgraph.get_graph(request)
+    if graph is None:
+        logging.debug("link graph busy, removing all cached views")
+        store.clear()
+        return
+    changed = set(pagenames)
+    if [name for name in changed if wikiutil.isGroupPage(name, request.cfg)]:
+        # whether the page may be read depends on the groups
+        logging.debug("group page changed, removing all cached views")
+        store.clear()
+        return
+    removed = set(changed)
+    for pagename in changed:
+        removed.update(graph.backlinks(pagename))
+    # with acl_hierarchic, the ACLs of the parent pages count, too
+    subpages = request.cfg.acl_hierarchic and tuple([name + '/' for name in changed]) or None
+    for name in store.names():
+        if name is None:
+            continue
+        if name in removed or subpages and name.startswith(subpages):
+            store.delete(name)
+            continue
+        entries = store.get_all(name) or {}
+        keep = dict([(key, entry) for key, entry in entries.items()
+                     if not (entry[3] or entry[2] & changed)])
+        if not keep:
+            store.delete(name)
+        elif len(keep) != len(entries):
+            store.put_all(name, keep)
@@ -207,6 +207,7 @@ class MoinScript(Script):
             fatal("""You must specify a command module and name:
 
 moin ... account check ...
+moin ... account convert ...
 moin ... account create ...
 moin ... account disable ...
 moin ... account resetpw ...
@@ -226,9 +227,11 @@ moin ... maint globaledit ...
 moin ... maint makecache ...
 moin ... maint mkpagepacks ...
 moin ... maint reducewiki ...
+moin ... maint rotatelogs ...
 
 moin ... migration data ...
 
+moin ... server cache ...
 moin ... server standalone ...
 
 moin ... xmlrpc mailimport ...
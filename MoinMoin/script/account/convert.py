@@ -0,0 +1,80 @@
+"""
+MoinMoin - move the user profiles to another profile store
+
+@copyright: 2026 MoinMoin project
+@license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.script import MoinScript
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This tool copies all user profiles from one profile store to another, e.g.
+from the profile files in user_dir to an SQLite database (see
+MoinMoin.userstore).
+
+Detailed Instructions:
+======================
+General syntax: moin [options] account convert [convert-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[convert-options] see below:
+    0. Stop the wiki while converting, profiles saved meanwhile might get lost.
+
+    1. To copy the profile files into the SQLite database:
+       moin ... account convert --to=sqlite
+
+       Then use this in your wiki configuration:
+           from MoinMoin import userstore
+           user_storage = userstore.sqlite_store
+
+    2. To copy the profiles from the SQLite database back to profile files
+       and remove them from the database:
+       moin ... account convert --to=file --remove
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--to", metavar="STORE", dest="to", default="sqlite",
+            help="Copy the profiles to STORE: 'sqlite' (from the profile files, default) or 'file' (from the SQLite database)."
+        )
+        self.parser.add_option(
+            "--remove", action="store_true", dest="remove",
+            help="Remove the profiles from the store they were copied from."
+        )
+
+    def mainloop(self):
+        # we don't expect non-option arguments
+        if len(self.args) != 0:
+            self.parser.error("incorrect number of arguments")
+        if self.options.to not in ('sqlite', 'file'):
+            self.parser.error("--to must be 'sqlite' or 'file'")
+
+        self.init_request()
+        request = self.request
+
+        from MoinMoin import user, userstore
+        stores = [userstore.file_store(request.cfg), userstore.sqlite_store(request.cfg)]
+        if self.options.to == 'file':
+            stores.reverse()
+        source, target = stores
+
+        count = 0
+        for uid in source.uids():
+            data = source.load(uid)
+            if data is None:
+                continue
+            target.save(uid, data)
+            if self.options.remove:
+                source.remove(uid)
+            count += 1
+
+        # the lookup caches are rebuilt from the new store when needed
+        user.clearLookupCaches(request)
+        print("copied %d user profiles." % count)
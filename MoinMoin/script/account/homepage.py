@@ -112,8 +112,8 @@ CategoryHomepage
         elif self.options.name_of_group_page:
             members = request.groups.get(self.options.name_of_group_page, [])
         elif self.options.all_users:
-            uids = user.getUserList(request)
-            members = [user.User(request, uid).name for uid in uids]
+            profiles = request.cfg.cache.user_store.values(['name'])
+            members = [values['name'] for values in list(profiles.values()) if values.get('name')]
 
         if not members:
             print("No user selected!")
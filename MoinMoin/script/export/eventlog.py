@@ -49,7 +49,7 @@ General syntax: moin [options] export eventlog [eventlog-options]
 
         columns = ['time', 'event', 'username', 'ip', 'wikiname', 'pagename', 'url', 'referrer', 'ua', ]
         csv_out = csv.DictWriter(csv_file, columns, restval='', extrasaction='ignore')
-        for time, event, kv in EventLog(request):
+        for time, event, kv in EventLog(request).events():
             kv = kv.to_dict()  # convert from MultiDict to dict
             # convert usecs to secs
             time = time / 1000000.0
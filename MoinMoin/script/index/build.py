@@ -58,6 +58,10 @@ General syntax: moin [options] index build [build-options]
        # quick, replaces the old index with the new one:
        moin ... index build --mode=usenewindex
        start this moin wiki process(es)
+
+    To prepare the documents (reading pages, tokenizing, running the
+    attachment filters) in several worker processes, add e.g. --workers=4.
+    The indexing process commits the index every --batch-size changes.
 """
 
     def __init__(self, argv, def_values):
@@ -76,6 +80,14 @@ General syntax: moin [options] index build [build-options]
             "--count", metavar="COUNT", dest="count",
             help="for queued indexing only: how many queue entries to process in this indexing run"
         )
+        self.parser.add_option(
+            "--workers", metavar="WORKERS", dest="workers", type="int",
+            help="number of worker processes preparing the documents (default: xapian_index_workers)"
+        )
+        self.parser.add_option(
+            "--batch-size", metavar="SIZE", dest="batch_size", type="int",
+            help="with worker processes: commit the index after SIZE document changes (default: xapian_index_batch_size)"
+        )
         self.files = None
 
     def mainloop(self):
@@ -115,10 +127,13 @@ class PluginScript(IndexScript):
 
         if mode in ['rebuild', 'buildnewindex', 'buildnewindexqueued', ]:
             idx = XapianIndex(self.request, name=idx_name)
+            cfg = self.request.cfg
+            workers = self.options.workers or cfg.xapian_index_workers
+            batch_size = self.options.batch_size or cfg.xapian_index_batch_size
             if mode == 'buildnewindexqueued':
-                idx.indexPagesQueued(int(self.options.count))
+                idx.indexPagesQueued(int(self.options.count), workers=workers, batch_size=batch_size)
             else:
-                idx.indexPages(self.files, idx_mode)
+                idx.indexPages(self.files, idx_mode, workers=workers, batch_size=batch_size)
 
         if mode in ['rebuild', 'usenewindex', ]:
             # 'rebuild' is still a bit dirty, because just killing old index will
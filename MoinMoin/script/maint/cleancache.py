@@ -52,9 +52,16 @@ General syntax: moin [options] maint cleancache
 
         # clean wiki scope cache entries
         arena_key_list = [
+            ('charts', 'aggregates'),
             ('charts', 'hitcounts'),
             ('charts', 'pagehits'),
             ('charts', 'useragents'),
+            ('editlog', 'index'),
+            ('editlog', 'heads'),
+            ('linkgraph', 'graph'),
+            ('pagelists', 'index'),
+            ('trigrams', 'index'),
+            ('wikigroups', 'index'),
         ]
         for arena, key in arena_key_list:
             caching.CacheEntry(request, arena, key, scope='wiki').remove()
@@ -62,6 +69,7 @@ General syntax: moin [options] maint cleancache
         # clean dict and groups related cache
         arena_scope_list = [('pagedicts', 'wiki'),
                             ('pagegroups', 'wiki'),
+                            ('filtertext', 'wiki'),
                             ('users', 'userdir'),
                             ]
         for arena, scope in arena_scope_list:
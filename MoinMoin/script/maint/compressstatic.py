@@ -0,0 +1,49 @@
+"""
+MoinMoin - compressstatic script
+
+@copyright: 2026 MoinMoin project
+@license: GNU GPL, see COPYING for details.
+"""
+
+import os
+
+from MoinMoin.script import MoinScript, fatal
+from MoinMoin.web.static import STATIC_FILES_PATH, brotli, compress_static_files
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script writes compressed copies (.gz and, if the brotli module is
+installed, .br) of the css, js and other text files of the static files,
+so moin can send them to browsers accepting compressed files (see
+MoinMoin.web.static).
+
+Run it after installing or upgrading moin and after changing the static
+files. Only missing or outdated copies are written.
+
+Detailed Instructions:
+======================
+General syntax: moin maint compressstatic [compressstatic-options]
+
+[compressstatic-options] see below:
+    --htdocs=DIR  directory of the static files (default: the builtin
+                  MoinMoin/web/static/htdocs)
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--htdocs", metavar="DIR", dest="htdocs",
+            help="directory of the static files (default: builtin MoinMoin/web/static/htdocs)"
+        )
+
+    def mainloop(self):
+        path = self.options.htdocs or STATIC_FILES_PATH
+        if not os.path.isdir(path):
+            fatal("%s is not a directory." % path)
+        if brotli is None:
+            print("brotli module not installed, writing .gz files only.")
+        count = compress_static_files(path)
+        print("%d compressed files written." % count)
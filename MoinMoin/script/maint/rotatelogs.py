@@ -0,0 +1,55 @@
+"""
+MoinMoin - rotatelogs script
+
+@copyright: 2026 MoinMoin project
+@license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.logfile import eventlog
+from MoinMoin.script import MoinScript
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script moves the current content of the event-log (data/event-log) to
+an archived segment file (data/event-log.YYYYMMDD-YYYYMMDD, named after the
+dates of its first and last event) and starts a new, empty event-log.
+
+The wiki still reads the archived segments (e.g. for the statistics), but
+it doesn't need to read through old events when it is only interested in
+recent ones. Run it e.g. once a month from cron.
+
+The edit-log is not rotated, the wiki uses positions in it to keep its
+caches up to date.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] maint rotatelogs [rotatelogs-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[rotatelogs-options] see below:
+    --compress    gzip the new segment file
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+
+        self.parser.add_option(
+            "--compress", action="store_true", dest="compress",
+            help="gzip the new segment file"
+        )
+
+    def mainloop(self):
+        self.init_request()
+        request = self.request
+
+        elog = eventlog.EventLog(request)
+        segment = elog.segments.rotate(compress=self.options.compress)
+        if segment is None:
+            print("event-log is empty, nothing to do.")
+        else:
+            print("moved %d events to %s" % (segment.lines, segment.path))
@@ -0,0 +1,73 @@
+"""
+    MoinMoin - run the cache server used by cachestore.SocketStore
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+import os
+
+from MoinMoin.script import MoinScript, fatal
+from MoinMoin.util.cachestore import CacheServer
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This tool runs a cache server for the in-memory caches of the wiki (page
+meta data, page lists and user lookups), so all worker processes of the
+wiki share one copy of them instead of each process keeping its own.
+
+To use it, put this into your wiki configuration:
+
+    from MoinMoin.util import cachestore
+    cache_store = cachestore.socket_store('/path/to/cache.sock')
+
+The server only keeps the data in memory, there is no need to restart the
+wiki processes when you restart the server (the caches just get warmed up
+again).
+
+Detailed Instructions:
+======================
+General syntax: moin server cache --socket=/path/to/cache.sock
+
+    Please note:
+    * You must run this script as the owner of the wiki files.
+    * The socket is only accessible by that user. The clients authenticate
+      with a shared secret: without --authkey-file, the server writes a
+      new random one to /path/to/cache.sock.key (also only readable by that
+      user) and cachestore.socket_store(path) reads it from there.
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--socket", dest="socket",
+            help="Path of the unix socket to listen on (required)."
+        )
+        self.parser.add_option(
+            "--authkey-file", dest="authkey_file",
+            help="File containing a shared secret. If given, give the same secret to cachestore.socket_store(path, authkey). Default: write a random one to <socket>.key."
+        )
+
+    def mainloop(self):
+        if self.args:
+            self.parser.error("incorrect number of arguments")
+        if not self.options.socket:
+            fatal("You must give the socket path using --socket.")
+
+        authkey = None
+        if self.options.authkey_file:
+            f = open(self.options.authkey_file, 'rb')
+            try:
+                authkey = f.read().strip()
+            finally:
+                f.close()
+
+        if os.path.exists(self.options.socket):
+            os.remove(self.options.socket)  # left over from a previous run
+        server = CacheServer(self.options.socket, authkey)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
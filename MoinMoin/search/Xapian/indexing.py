@@ -8,6 +8,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import multiprocessing
 import os
 import re
 
@@ -25,6 +26,9 @@ from MoinMoin.util import filesys
 from MoinMoin.Page import Page
 from MoinMoin import config, wikiutil
 
+# number of entries to get from the indexer queue at once
+QUEUE_BATCH = 100
+
 
 class Query(xapian.Query):
     pass
@@ -152,13 +156,15 @@ class XapianIndex(BaseIndex):
     def get_indexer_connection(self):
         return MoinIndexerConnection(self.db)
 
-    def _search(self, query, sort='weight', historysearch=0):
+    def _search(self, query, sort='weight', historysearch=0, start=0, count=None):
         """
         Perform the search using xapian
 
         @param query: the search query objects
         @param sort: the sorting of the results (default: 'weight')
         @param historysearch: whether to search in all page revisions (default: 0) TODO: use/implement this
+        @param start: rank of the first hit to return (default: 0)
+        @param count: maximum number of hits to return (default: None == all)
         """
         while True:
             try:
@@ -176,56 +182,49 @@ class XapianIndex(BaseIndex):
         searcher.reopen()
         query = query.xapian_term(self.request, searcher)
 
-        # Get maximum possible amount of hits from xappy, which is number of documents in the index.
-        document_count = searcher.get_doccount()
+        if count is None:
+            # Get maximum possible amount of hits from xappy, which is number of documents in the index.
+            count = searcher.get_doccount()
 
         kw = {}
         if sort == 'page_name':
             kw['sortby'] = 'pagename'
 
-        hits = searcher.search(query, 0, document_count, **kw)
+        hits = searcher.search(query, start, start + count, **kw)
 
         self.request.cfg.xapian_searchers.append((searcher, timestamp))
         return hits
 
-    def do_queued_updates(self, amount=-1):
+    def do_queued_updates(self, amount=-1, workers=1, batch_size=None):
         """ Index <amount> entries from the indexer queue.
 
             @param amount: amount of queue entries to process (default: -1 == all)
+            @param workers: number of worker processes (default: 1 == none)
+            @param batch_size: commit the index after this many changes
+                               (only used with worker processes)
         """
         done_count = 0
+        request = self._indexingRequest(self.request)
+        pool = self._get_pool(request, 'update', workers)
         try:
-            request = self._indexingRequest(self.request)
             connection = self.get_indexer_connection()
             self.touch()
             total = amount
             try:
+                # trick: if amount starts from -1, it will never get 0
                 while amount:
-                    # trick: if amount starts from -1, it will never get 0
-                    amount -= 1
-                    try:
-                        pagename, attachmentname, revno = self.update_queue.get()
-                    except IndexError:
+                    entries = self.update_queue.mget(amount > 0 and min(amount, QUEUE_BATCH) or QUEUE_BATCH)
+                    if not entries:
                         # queue empty
                         break
-                    else:
+                    amount -= len(entries)
+                    if pool is not None:
+                        done_count += self._index_parallel(pool, connection, entries, batch_size)
+                        continue
+                    for entry in entries:
                         logging.info("got from indexer queue: %r %r %r [%d/%d]" % (
-                            pagename, attachmentname, revno,
-                            done_count, total))
-                        if pagename:
-                            if not attachmentname:
-                                if revno is None:
-                                    # generic "index this page completely, with attachments" request
-                                    self._index_page(request, connection, pagename, mode='update')
-                                else:
-                                    # "index this page revision" request
-                                    self._index_page_rev(request, connection, pagename, revno, mode='update')
-                            else:
-                                # "index this attachment" request
-                                self._index_attachment(request, connection, pagename, attachmentname, mode='update')
-                        else: # pagename == None
-                            # index an additional filesystem file (full path given in attachmentname)
-                            self._index_file(request, connection, attachmentname, mode='update')
+                            entry + (done_count, total)))
+                        self._index_entry(request, connection, entry, mode='update')
                         done_count += 1
             finally:
                 logging.debug("updated xapian index with %d queued updates" % done_count)
@@ -233,6 +232,89 @@ class XapianIndex(BaseIndex):
         except XapianDatabaseLockError:
             # another indexer has locked the index, we can retry it later...
             logging.debug("can't lock xapian index, not doing queued updates now")
+        finally:
+            self._close_pool(pool)
+        return done_count
+
+    def _index_entry(self, request, connection, entry, mode='update'):
+        """ Index an entry of the indexer queue
+
+        @param request: request suitable for indexing
+        @param connection: the Indexer connection object
+        @param entry: (pagename, attachmentname, revno), see IndexerQueue
+        @param mode: 'add' = just add, no checks
+                     'update' = check if already in index and update if needed (mtime)
+        """
+        pagename, attachmentname, revno = entry
+        if pagename:
+            if not attachmentname:
+                if revno is None:
+                    # generic "index this page completely, with attachments" request
+                    self._index_page(request, connection, pagename, mode=mode)
+                else:
+                    # "index this page revision" request
+                    self._index_page_rev(request, connection, pagename, revno, mode=mode)
+            else:
+                # "index this attachment" request
+                self._index_attachment(request, connection, pagename, attachmentname, mode=mode)
+        else: # pagename == None
+            # index an additional filesystem file (full path given in attachmentname)
+            self._index_file(request, connection, attachmentname, mode=mode)
+
+    def _get_pool(self, request, mode, workers):
+        """ Start <workers> worker processes preparing the documents
+
+        This must be called before opening the indexer connection, the
+        workers must not inherit it.
+
+        @rtype: multiprocessing.pool.Pool
+        @return: the worker pool or None (index without worker processes)
+        """
+        if not workers or workers <= 1:
+            return None
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning("can't fork worker processes, indexing without them")
+            return None
+        return context.Pool(workers, _init_worker, (self, request, mode))
+
+    def _close_pool(self, pool):
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def _index_parallel(self, pool, connection, entries, batch_size=None):
+        """ Let the worker processes prepare the documents for entries and
+            do the changes they recorded in the index.
+
+        @param pool: the worker pool, see _get_pool
+        @param connection: the Indexer connection object
+        @param entries: list of entries, see _index_entry
+        @param batch_size: commit the index after this many changes
+        @rtype: int
+        @return: number of indexed entries
+        """
+        if batch_size is None:
+            batch_size = self.request.cfg.xapian_index_batch_size
+        done_count = changes = 0
+        for entry, operations in pool.imap_unordered(_index_in_worker, entries):
+            logging.info("indexed by worker: %r %r %r [%d/%d]" % (
+                entry + (done_count, len(entries))))
+            for operation, arg in operations:
+                try:
+                    if operation == 'replace':
+                        connection.replace(arg)
+                    else:
+                        connection.delete(arg)
+                except (xappy.IndexerError, xapian.Error) as err:
+                    logging.warning("could not %s %r in index: %s" % (
+                        operation, getattr(arg, 'id', arg), str(err)))
+                changes += 1
+                if batch_size and changes >= batch_size:
+                    connection.flush()
+                    changes = 0
+            done_count += 1
         return done_count
 
     def _get_document(self, connection, doc_id, mtime, mode):
@@ -571,7 +653,7 @@ class XapianIndex(BaseIndex):
             entries = [(None, fname.strip(), None) for fname in files]
             self.update_queue.mput(entries)
 
-    def _index_pages(self, request, files=None, mode='update', pages=None):
+    def _index_pages(self, request, files=None, mode='update', pages=None, workers=1, batch_size=None):
         """ Index all (given) pages (and all given files)
 
         This should be called from indexPages only!
@@ -581,25 +663,85 @@ class XapianIndex(BaseIndex):
         @param mode: 'add' = just add, no checks
                      'update' = check if already in index and update if needed (mtime)
         @param pages: list of pages to index, if not given, all pages are indexed
+        @param workers: number of worker processes (default: 1 == none)
+        @param batch_size: commit the index after this many changes
+                           (only used with worker processes)
         """
         if pages is None:
             # Index all pages
             pages = request.rootpage.getPageList(user='', exists=1)
 
+        pool = self._get_pool(request, mode, workers)
         try:
             connection = self.get_indexer_connection()
             self.touch()
             try:
                 logging.info("indexing %d pages..." % len(pages))
-                for pagename in pages:
-                    self._index_page(request, connection, pagename, mode=mode)
+                entries = [(pagename, None, None) for pagename in pages]
                 if files:
                     logging.info("indexing all files...")
-                    for fname in files:
-                        fname = fname.strip()
-                        self._index_file(request, connection, fname, mode)
+                    entries += [(None, fname.strip(), None) for fname in files]
+                if pool is not None:
+                    self._index_parallel(pool, connection, entries, batch_size)
+                else:
+                    for entry in entries:
+                        self._index_entry(request, connection, entry, mode)
             finally:
                 connection.close()
         except XapianDatabaseLockError:
             logging.warning("xapian index is locked, can't index.")
+        finally:
+            self._close_pool(pool)
+
+
+class DeferredConnection:
+    """ Stands in for the indexer connection in the worker processes
+
+    Only the process holding the indexer connection may change the index,
+    the workers record the changes (replace and delete calls) for it. They
+    use a search connection to check the mtime of indexed documents.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.operations = []
+        self._search_connection = None
+
+    def get_document(self, doc_id):
+        if self._search_connection is None:
+            self._search_connection = self.index.get_search_connection()
+        try:
+            return self._search_connection.get_document(doc_id)
+        except xapian.DatabaseModifiedError:
+            # the indexer committed several times since we opened the
+            # database, read the current revision
+            self._search_connection.reopen()
+            return self._search_connection.get_document(doc_id)
+
+    def replace(self, document):
+        self.operations.append(('replace', document))
+
+    def delete(self, doc_id):
+        self.operations.append(('delete', doc_id))
+
+
+# state of a worker process: (index, request, mode, connection)
+_worker = None
+
+
+def _init_worker(index, request, mode):
+    """ Initialize a worker process (forked, so nothing gets pickled) """
+    global _worker
+    _worker = (index, request, mode, DeferredConnection(index))
+
+
+def _index_in_worker(entry):
+    """ Prepare the documents for entry in a worker process
 
+    @rtype: tuple
+    @return: entry, list of the recorded changes (operation, argument)
+    """
+    index, request, mode, connection = _worker
+    connection.operations = []
+    index._index_entry(request, connection, entry, mode)
+    return entry, connection.operations
@@ -17,13 +17,17 @@ logging = log.getLogger(__name__)
 from MoinMoin.search.builtin import BaseSearch, MoinSearch, BaseIndex
 from MoinMoin.search.Xapian.indexing import XapianIndex
 
+# with a limit, get at least this many hits from the index at once
+MIN_WINDOW = 20
+
+
 class IndexDoesNotExistError(Exception):
     pass
 
 class XapianSearch(BaseSearch):
 
-    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0):
-        super(XapianSearch, self).__init__(request, query, sort, mtime, historysearch)
+    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0, limit=None):
+        super(XapianSearch, self).__init__(request, query, sort, mtime, historysearch, limit)
 
         self.index = self._xapian_index()
 
@@ -39,12 +43,26 @@ class XapianSearch(BaseSearch):
 
         return index
 
+    def _pages(self, search_results):
+        """ Get the page dicts for _getHits from xapian search results """
+        # Note: .data is (un)pickled inside xappy, so we get back exactly what
+        #       we had put into it at indexing time (including unicode objects).
+        return [{'uid': r.id,
+                 'wikiname': r.data['wikiname'][0],
+                 'pagename': r.data['pagename'][0],
+                 'attachment': r.data['attachment'][0],
+                 'revision': r.data.get('revision', [0])[0]}
+                for r in search_results]
+
     def _search(self):
         """ Search using Xapian
 
         Get a list of pages using fast xapian search and
         return moin search in those pages if needed.
         """
+        if self.limit is not None:
+            return self._search_limited()
+
         clock = self.request.clock
         index = self.index
 
@@ -54,14 +72,7 @@ class XapianSearch(BaseSearch):
         clock.stop('_xapianQuery')
         logging.debug("_xapianSearch: finds: %r" % search_results)
 
-        # Note: .data is (un)pickled inside xappy, so we get back exactly what
-        #       we had put into it at indexing time (including unicode objects).
-        pages = [{'uid': r.id,
-                  'wikiname': r.data['wikiname'][0],
-                  'pagename': r.data['pagename'][0],
-                  'attachment': r.data['attachment'][0],
-                  'revision': r.data.get('revision', [0])[0]}
-                 for r in search_results]
+        pages = self._pages(search_results)
         try:
             if not self.query.xapian_need_postproc():
                 # xapian handled the full query
@@ -77,4 +88,52 @@ class XapianSearch(BaseSearch):
         # some postprocessing by MoinSearch is required
         return MoinSearch(self.request, self.query, self.sort, self.mtime, self.historysearch, pages=pages)._search()
 
+    def _search_limited(self):
+        """ Search using Xapian until self.limit readable hits are found
+
+        Gets the hits from the index in windows and processes and filters
+        one window after the other, so the time spent for the hits (and
+        for their ACL checks) is proportional to the number of hits shown,
+        not to the number of documents matching the query.
+        """
+        clock = self.request.clock
+        _ = self.request.getText
+        need_postproc = self.query.xapian_need_postproc()
+        hits = []
+        start = 0
+        rejected = 0
+        estimate = None
+
+        clock.start('_xapianSearch')
+        try:
+            while len(hits) < self.limit:
+                count = max(self.limit - len(hits), MIN_WINDOW)
+                clock.start('_xapianQuery')
+                search_results = self.index.search(self.query, sort=self.sort, historysearch=self.historysearch,
+                                                   start=start, count=count)
+                clock.stop('_xapianQuery')
+                logging.debug("_xapianSearch: finds: %r" % search_results)
+                if estimate is None:
+                    estimate = search_results.matches_estimated
+
+                pages = self._pages(search_results)
+                start += len(pages)
+                if pages:
+                    if need_postproc:
+                        window = MoinSearch(self.request, self.query, self.sort, self.mtime, self.historysearch,
+                                            pages=pages)._search()[0]
+                    else:
+                        window = self._getHits(pages)
+                    window = self._filter(window)
+                    rejected += len(pages) - len(window)
+                    hits.extend(window)
+                if len(pages) < count:
+                    # we got all hits, no estimate needed
+                    self.filtered = True
+                    return hits, None
+        finally:
+            clock.stop('_xapianSearch')
+
+        self.filtered = self.limited = True
+        return hits, (_('about'), max(len(hits), estimate - rejected))
 
@@ -17,7 +17,7 @@ from MoinMoin.search.queryparser import QueryParser, QueryError
 from MoinMoin.search.builtin import MoinSearch
 
 
-def searchPages(request, query, sort='weight', mtime=None, historysearch=None, **kw):
+def searchPages(request, query, sort='weight', mtime=None, historysearch=None, limit=None, **kw):
     """
     Search the text of all pages for query.
 
@@ -26,16 +26,19 @@ def searchPages(request, query, sort='weight', mtime=None, historysearch=None, *
     @keyword sort: sorting of the search results, either 'weight' or 'page_name'
     @keyword mtime: only items modified since mtime
     @keyword historysearch: include older revisions of items in search
+    @keyword limit: only the first limit hits are shown, the search may stop
+                    after finding them (the results then only contain these
+                    hits and an estimate of the total number of hits)
     @keyword titlesearch: treat all terms as title searches (passed to qp)
     @keyword case: do case sensitive search (passed to qp)
     @keyword regex: treat all terms as regular expression (passed to qp)
     @rtype: SearchResults instance
     @return: search results
     """
-    return _get_searcher(request, query, sort, mtime, historysearch, **kw).run()
+    return _get_searcher(request, query, sort, mtime, historysearch, limit, **kw).run()
 
 
-def _get_searcher(request, query, sort='weight', mtime=None, historysearch=None, **kw):
+def _get_searcher(request, query, sort='weight', mtime=None, historysearch=None, limit=None, **kw):
     """
     Return a searcher object according to the configuration.
     """
@@ -45,14 +48,14 @@ def _get_searcher(request, query, sort='weight', mtime=None, historysearch=None,
     if request.cfg.xapian_search:
         try:
             from MoinMoin.search.Xapian.search import XapianSearch, IndexDoesNotExistError
-            searcher = XapianSearch(request, query, sort, mtime=mtime, historysearch=historysearch)
+            searcher = XapianSearch(request, query, sort, mtime=mtime, historysearch=historysearch, limit=limit)
         except ImportError as error:
             logging.warning("%s. You should either set xapian_search = False in your wiki config or install/upgrade Xapian." % str(error))
         except IndexDoesNotExistError:
             logging.warning("Slow moin search is used because the Xapian index does not exist. You should create it using the moin index build command.")
 
     if searcher is None:
-        searcher = MoinSearch(request, query, sort, mtime=mtime, historysearch=historysearch)
+        searcher = MoinSearch(request, query, sort, mtime=mtime, historysearch=historysearch, limit=limit)
 
     return searcher
 
@@ -8,11 +8,16 @@
                 2006 MoinMoin:FranzPletz
     @license: GNU GPL, see COPYING for details
 """
+import hashlib
+import json
+import multiprocessing
 import os
+import sys
+import threading
 import time
 
 from MoinMoin import log
-from MoinMoin import wikiutil, caching
+from MoinMoin import wikiutil, caching, filter, linkgraph
 from MoinMoin.Page import Page
 from MoinMoin.decorator import context_timer
 from MoinMoin.search.results import getSearchResults
@@ -25,6 +30,15 @@ logging = log.getLogger(__name__)
 ##############################################################################
 
 
+# compact the journal when at least this many bytes of it were consumed
+# (and they are more than half of it)
+COMPACT_SIZE = 1024 * 1024
+
+# max. number of texts extracted by the filters we keep in the cache, the
+# oldest ones are removed first (see BaseIndex.contentfilter)
+MAX_FILTERTEXT_ENTRIES = 10000
+
+
 class IndexerQueue:
     """
     Represents a locked on-disk queue with jobs for the xapian indexer
@@ -34,6 +48,14 @@ class IndexerQueue:
     ATTACHMENTNAME: attachment name (unicode) or None (for pages)
     REVNO: revision number (int) - meaning "look at that revision",
            or None - meaning "look at all revisions"
+
+    Jobs are appended to a journal file (one JSON list per line). Getting
+    jobs just moves the consumer offset, which is kept in a cache entry
+    (its lock also protects the journal), so putting and getting jobs does
+    not depend on the length of the queue. When a big part of the journal
+    is consumed, the rest is copied to a new journal (see _compact).
+    Repeated jobs are only returned once by mget and are removed when
+    compacting.
     """
 
     def __init__(self, request, xapian_dir, queuename, timeout=10.0):
@@ -47,18 +69,71 @@ class IndexerQueue:
         self.xapian_dir = xapian_dir
         self.queuename = queuename
         self.timeout = timeout
+        self.journal = os.path.join(xapian_dir, '%s.journal' % queuename)
 
     def get_cache(self, locking):
         return caching.CacheEntry(self.request, self.xapian_dir, self.queuename,
                                   scope='dir', use_pickle=True, do_locking=locking)
 
-    def _queue(self, cache):
+    def _offset(self, cache):
+        """ Return the consumer offset (call with the cache locked) """
         try:
-            queue = cache.content()
+            data = cache.content()
         except caching.CacheError:
             # likely nothing there yet
-            queue = []
-        return queue
+            return 0
+        if isinstance(data, list):
+            # old format: the whole queue pickled as a list
+            self._append(data)
+            self._set_offset(cache, 0)
+            return 0
+        return data['offset']
+
+    def _set_offset(self, cache, offset):
+        cache.update({'offset': offset})
+
+    def _append(self, entries):
+        records = [json.dumps(list(entry)) + '\n' for entry in entries]
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write(''.join(records))
+
+    def _read(self, offset, count=-1):
+        """ Read up to <count> (-1 == all) distinct entries from the journal
+
+        @rtype: tuple
+        @return: entries, offset after the last read record, journal size
+        """
+        entries = []
+        seen = set()
+        try:
+            f = open(self.journal, 'rb')
+        except IOError:
+            return entries, 0, 0
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if offset > size:
+                offset = 0  # the journal was replaced behind our back
+            f.seek(offset)
+            while count < 0 or len(entries) < count:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # end of journal (or an incomplete record)
+                offset += len(line)
+                entry = tuple(json.loads(line.decode('utf-8')))
+                if entry not in seen:
+                    seen.add(entry)
+                    entries.append(entry)
+        return entries, offset, size
+
+    def _compact(self, cache, offset):
+        """ Replace the journal by its unconsumed entries (without repetitions) """
+        entries, offset, size = self._read(offset)
+        tmpname = '%s.%d.tmp' % (self.journal, os.getpid())
+        with open(tmpname, 'w', encoding='utf-8') as f:
+            f.write(''.join([json.dumps(list(entry)) + '\n' for entry in entries]))
+        # if we crash between these steps, some jobs are done twice
+        self._set_offset(cache, 0)
+        os.replace(tmpname, self.journal)
 
     def mput(self, entries):
         """ Put multiple entries into the queue (append at end)
@@ -71,9 +146,8 @@ class IndexerQueue:
         cache = self.get_cache(locking=False)  # we lock manually
         cache.lock('w', 60.0)
         try:
-            queue = self._queue(cache)
-            queue.extend(entries)
-            cache.update(queue)
+            self._offset(cache)  # converts an old format queue
+            self._append(entries)
         finally:
             cache.unlock()
 
@@ -84,28 +158,27 @@ class IndexerQueue:
         @param attachmentname: attachment name [unicode]
         @param revno: revision number (int) or None (all revs)
         """
-        cache = self.get_cache(locking=False)  # we lock manually
-        cache.lock('w', 60.0)
-        try:
-            queue = self._queue(cache)
-            entry = (pagename, attachmentname, revno)
-            queue.append(entry)
-            cache.update(queue)
-        finally:
-            cache.unlock()
+        self.mput([(pagename, attachmentname, revno)])
 
     def mget(self, count):
         """ Get (and remove) first <count> entries from the queue
 
-        Raises IndexError if queue was empty when calling get().
+        Repeated entries are only returned once, so less than <count>
+        entries may be returned even if the queue has more.
         """
         cache = self.get_cache(locking=False)  # we lock manually
         cache.lock('w', 60.0)
         try:
-            queue = self._queue(cache)
-            entries = queue[:count]
-            queue = queue[count:]
-            cache.update(queue)
+            old_offset = self._offset(cache)
+            entries, offset, size = self._read(old_offset, count)
+            if offset and offset >= size:
+                # all consumed, start a new journal
+                self._set_offset(cache, 0)
+                os.remove(self.journal)
+            elif offset >= COMPACT_SIZE and offset * 2 > size:
+                self._compact(cache, offset)
+            elif offset != old_offset:
+                self._set_offset(cache, offset)
         finally:
             cache.unlock()
         return entries
@@ -115,15 +188,7 @@ class IndexerQueue:
 
         Raises IndexError if queue was empty when calling get().
         """
-        cache = self.get_cache(locking=False)  # we lock manually
-        cache.lock('w', 60.0)
-        try:
-            queue = self._queue(cache)
-            entry = queue.pop(0)
-            cache.update(queue)
-        finally:
-            cache.unlock()
-        return entry
+        return self.mget(1)[0]
 
 
 class BaseIndex:
@@ -193,28 +258,35 @@ class BaseIndex:
         logging.info("queuing completed successfully in %0.2f seconds." %
                      (time.time() - start))
 
-    def indexPagesQueued(self, count=-1):
+    def indexPagesQueued(self, count=-1, workers=1, batch_size=None):
         """ Index <count> queued pages (and/or files)
+
+        @param workers: number of worker processes (default: 1 == none)
+        @param batch_size: commit the index after this many changes
+                           (only used with worker processes)
         """
         start = time.time()
-        done_count = self.do_queued_updates(count)
+        done_count = self.do_queued_updates(count, workers=workers, batch_size=batch_size)
         logging.info("indexing %d items completed successfully in %0.2f seconds." %
                      (done_count, time.time() - start))
 
-    def indexPages(self, files=None, mode='update', pages=None):
+    def indexPages(self, files=None, mode='update', pages=None, workers=1, batch_size=None):
         """ Index pages (and files, if given)
 
         @param files: iterator or list of files to index additionally
         @param mode: set the mode of indexing the pages, either 'update' or 'add'
         @param pages: list of pages to index, if not given, all pages are indexed
+        @param workers: number of worker processes (default: 1 == none)
+        @param batch_size: commit the index after this many changes
+                           (only used with worker processes)
         """
         start = time.time()
         request = self._indexingRequest(self.request)
-        self._index_pages(request, files, mode, pages=pages)
+        self._index_pages(request, files, mode, pages=pages, workers=workers, batch_size=batch_size)
         logging.info("indexing completed successfully in %0.2f seconds." %
                      (time.time() - start))
 
-    def _index_pages(self, request, files=None, mode='update', pages=None):
+    def _index_pages(self, request, files=None, mode='update', pages=None, workers=1, batch_size=None):
         """ Index all pages (and all given files)
 
         This should be called from indexPages only!
@@ -223,15 +295,19 @@ class BaseIndex:
         @param files: iterator or list of files to index additionally
         @param mode: set the mode of indexing the pages, either 'update' or 'add'
         @param pages: list of pages to index, if not given, all pages are indexed
+        @param workers: number of worker processes
+        @param batch_size: commit the index after this many changes
 
         """
         raise NotImplemented('...')
 
-    def do_queued_updates(self, amount=-1):
+    def do_queued_updates(self, amount=-1, workers=1, batch_size=None):
         """ Perform updates in the queues
 
         @param request: the current request
         @keyword amount: how many updates to perform at once (default: -1 == all)
+        @keyword workers: number of worker processes (default: 1 == none)
+        @keyword batch_size: commit the index after this many changes
         """
         raise NotImplemented('...')
 
@@ -254,14 +330,84 @@ class BaseIndex:
                 pass
             else:
                 logging.info("Cannot load filter for mimetype %s" % modulename)
+        cache = self._filtertext_cache(filename, modulename, execute)
+        if cache is not None:
+            try:
+                data = cache.content()
+                logging.debug("Using cached text of filter %s for file %s" % (modulename, filename))
+                return mt.mime_type(), data
+            except caching.CacheError:
+                pass
+        filter.start_run()
         try:
             data = execute(self, filename)
             logging.debug("Filter %s returned %d characters for file %s" % (modulename, len(data), filename))
         except (OSError, IOError) as err:
             data = ''
             logging.exception("Filter %s threw error '%s' for file %s" % (modulename, str(err), filename))
+        else:
+            # if the external program of the filter failed, we try again next time
+            if cache is not None and not filter.run_failed():
+                try:
+                    cache.update(data)
+                except caching.CacheError as err:
+                    logging.warning("Could not cache text of filter %s: %s" % (modulename, str(err)))
+                else:
+                    self._prune_filtertext_cache()
         return mt.mime_type(), data
 
+    def _prune_filtertext_cache(self):
+        """ Remove the oldest filter texts if there are more than
+            MAX_FILTERTEXT_ENTRIES (down to 90% of that)
+        """
+        request = self.request
+        keys = caching.get_cache_list(request, 'filtertext', 'wiki')
+        if len(keys) <= MAX_FILTERTEXT_ENTRIES:
+            return
+        arena_dir = caching.get_arena_dir(request, 'filtertext', 'wiki')
+        entries = []
+        for key in keys:
+            try:
+                entries.append((os.path.getmtime(os.path.join(arena_dir, key)), key))
+            except OSError:
+                pass  # removed meanwhile
+        entries.sort()
+        for mtime, key in entries[:len(entries) - MAX_FILTERTEXT_ENTRIES * 9 // 10]:
+            caching.CacheEntry(request, 'filtertext', key, scope='wiki').remove()
+
+    def _filtertext_cache(self, filename, modulename, execute):
+        """ Get the cache entry for the text the filter extracts from filename
+
+        Running the filters (often external programs) is expensive, so the
+        extracted text is cached in the wiki cache arena 'filtertext'. The
+        key is made of the SHA1 of the file content and the filter name and
+        version (mtime of the filter module), so identical files (e.g. a
+        copied page's attachments) share an entry and changed filters don't
+        use old entries. Texts of failed filter runs are not cached and the
+        oldest entries are removed when there are more than
+        MAX_FILTERTEXT_ENTRIES.
+
+        @param filename: name of the file
+        @param modulename: name of the filter plugin
+        @param execute: the filter plugin function
+        @rtype: MoinMoin.caching.CacheEntry
+        @return: the cache entry or None (file can't be read)
+        """
+        digest = hashlib.sha1()
+        try:
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+        except (OSError, IOError):
+            return None
+        module = sys.modules.get(execute.__module__)
+        try:
+            version = int(os.path.getmtime(module.__file__))
+        except (AttributeError, TypeError, OSError):
+            version = 0
+        key = '%s-%s-%d' % (digest.hexdigest(), modulename, version)
+        return caching.CacheEntry(self.request, 'filtertext', key, scope='wiki', use_encode=True)
+
     def _indexingRequest(self, request):
         """ Return a new request that can be used for index building.
 
@@ -307,20 +453,24 @@ class BaseIndex:
 class BaseSearch:
     """ A search run """
 
-    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0):
+    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0, limit=None):
         """
         @param request: current request
         @param query: search query objects tree
         @keyword sort: the sorting of the results (default: 'weight')
         @keyword mtime: only show items newer than this timestamp (default: None)
         @keyword historysearch: whether to show old revisions of a page (default: 0)
+        @keyword limit: the caller only shows the first limit hits, the
+                        search may stop after finding them (default: None == all)
         """
         self.request = request
         self.query = query
         self.sort = sort
         self.mtime = mtime
         self.historysearch = historysearch
+        self.limit = limit
         self.filtered = False
+        self.limited = False  # set by _search if it stopped after limit hits
         self.fs_rootpage = "FS"  # XXX FS hardcoded
 
     def run(self):
@@ -345,6 +495,10 @@ class BaseSearch:
         there is no estimate, None should be returned).
 
         The list may contain deleted pages or pages the user may not read.
+
+        If self.limit is set, the search may return only the first
+        self.limit readable hits (already filtered, in the order of the
+        index), it sets self.filtered and self.limited then.
         """
         raise NotImplementedError()
 
@@ -354,19 +508,22 @@ class BaseSearch:
 
         @param hits: list of hits
         """
-        userMayRead = self.request.user.may.read
         fs_rootpage = self.fs_rootpage + "/"
         thiswiki = (self.request.cfg.interwikiname, 'Self')
+        existing = [page.page_name for wikiname, page, attachment, match, rev in hits
+                    if wikiname in thiswiki and page.exists()]
+        readable = set(self.request.user.may.may_read_many(existing))
         filtered = [(wikiname, page, attachment, match, rev)
                     for wikiname, page, attachment, match, rev in hits
                     if (not wikiname in thiswiki or
-                        page.exists() and userMayRead(page.page_name) or
+                        page.page_name in readable or
                         page.page_name.startswith(fs_rootpage)) and
                     (not self.mtime or self.mtime <= (page.mtime_usecs() // 1000000))]
         return filtered
 
     def _get_search_results(self, hits, start, estimated_hits):
-        return getSearchResults(self.request, self.query, hits, start, self.sort, estimated_hits)
+        return getSearchResults(self.request, self.query, hits, start, self.sort, estimated_hits,
+                                limited=self.limited)
 
     def _get_match(self, page=None, uid=None):
         """
@@ -432,8 +589,8 @@ class BaseSearch:
 
 class MoinSearch(BaseSearch):
 
-    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0, pages=None):
-        super(MoinSearch, self).__init__(request, query, sort, mtime, historysearch)
+    def __init__(self, request, query, sort='weight', mtime=None, historysearch=0, pages=None, limit=None):
+        super(MoinSearch, self).__init__(request, query, sort, mtime, historysearch, limit)
 
         self.pages = pages
 
@@ -447,14 +604,71 @@ class MoinSearch(BaseSearch):
 
         if self.pages is not None, searches in that pages.
         """
+        if self.pages:
+            return self._getHits(self.pages), None
+
         # if self.pages is none, we make a full pagelist, but don't
         # search attachments (thus attachment name = '')
-        pages = self.pages or [{'pagename': p, 'attachment': '', 'wikiname': 'Self', } for p in self._getPageList()]
-
+        pagenames = self._getCandidates(self._getPageList())
+        cfg = self.request.cfg
+        if cfg.search_workers > 1 and len(pagenames) > cfg.search_chunk_size:
+            hits = self._searchParallel(pagenames, cfg.search_workers, cfg.search_chunk_size)
+            if hits is not None:
+                return hits, None
+
+        pages = [{'pagename': p, 'attachment': '', 'wikiname': 'Self', } for p in pagenames]
         hits = self._getHits(pages)
 
         return hits, None
 
+    def _getCandidates(self, pagenames):
+        """ Skip the pages the query can't match (without reading them)
+
+        @param pagenames: list of page names
+        @rtype: list
+        @return: the page names the query might match (in the same order)
+        """
+        candidates = self.query.candidates(SearchCandidates(self.request, pagenames))
+        if candidates is None:
+            return pagenames
+        logging.debug("searching %d of %d pages" % (len(candidates), len(pagenames)))
+        return [pagename for pagename in pagenames if pagename in candidates]
+
+    def _searchParallel(self, pagenames, workers, chunk_size):
+        """ Search pagenames in <workers> worker processes
+
+        The regular expression searches hold the GIL, so threads would not
+        help. The workers are forked, so they inherit the request and the
+        query and only the page names and the matches are passed around.
+
+        Forking a multi-threaded process is not safe (the child gets the
+        locks other threads held at that moment, e.g. of the logging or
+        of the cache store), so this is only done in single-threaded
+        processes (e.g. multi-process servers or CGI).
+
+        @rtype: list
+        @return: hits (like _getHits) or None if we can't fork
+        """
+        if threading.active_count() > 1:
+            logging.debug("not forking search worker processes in a multi-threaded process")
+            return None
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning("can't fork search worker processes, searching without them")
+            return None
+        chunks = [pagenames[i:i + chunk_size] for i in range(0, len(pagenames), chunk_size)]
+        hits = []
+        pool = context.Pool(workers, _init_worker, (self, ))
+        try:
+            for found in pool.imap(_search_in_worker, chunks):
+                for pagename, matches in found:
+                    hits.append(('Self', Page(self.request, pagename), '', matches, 0))
+        finally:
+            pool.close()
+            pool.join()
+        return hits
+
     def _getPageList(self):
         """ Get list of pages to search in
 
@@ -470,3 +684,72 @@ class MoinSearch(BaseSearch):
             return self.request.rootpage.getPageList(filter=filter_)
         else:
             return self.request.rootpage.getPageList(user='', exists=0)
+
+
+class SearchCandidates:
+    """ Cheap ways to find the pages a query can match
+
+        See the candidates method of the query expressions.
+    """
+
+    def __init__(self, request, pagenames):
+        """
+        @param request: current request
+        @param pagenames: the names of the pages to search
+        """
+        self.request = request
+        self.pagenames = pagenames
+        self._trigrams = None
+
+    def names(self, filter_):
+        """ Return the set of the page names for which filter_(name) is true """
+        return set([pagename for pagename in self.pagenames if filter_(pagename)])
+
+    def text(self, literal):
+        """ Return the set of the names of the pages whose text might contain
+            literal or None if we don't know (no trigram index)
+
+        @param literal: ASCII lower case text or None
+        """
+        if literal is None or not self.request.cfg.search_trigram_index:
+            return None
+        if self._trigrams is None:
+            from MoinMoin.search import trigrams
+            self._trigrams = trigrams.get_index(self.request)
+        return self._trigrams.pages(literal)
+
+    def linking_to(self, link_re):
+        """ Return the set of the names of the pages linking to a page
+            matched by link_re or None if we don't know (link graph busy)
+        """
+        graph = linkgraph.get_graph(self.request)
+        if graph is None:
+            return None
+        result = set()
+        for target, sources in graph.backward.items():
+            if link_re.match(target):
+                result.update(sources)
+        return result
+
+
+_worker = None
+
+
+def _init_worker(search):
+    """ Initialize a search worker process (forked, so nothing gets pickled) """
+    global _worker
+    _worker = search
+
+
+def _search_in_worker(pagenames):
+    """ Search pagenames in a worker process
+
+    @rtype: list
+    @return: [(page name, matches)] for the matching pages
+    """
+    found = []
+    for pagename in pagenames:
+        matches = _worker._get_match(page=Page(_worker.request, pagename))
+        if matches:
+            found.append((pagename, matches))
+    return found
@@ -18,6 +18,7 @@ logging = log.getLogger(__name__)
 
 from MoinMoin import config, wikiutil
 from MoinMoin.search.results import Match, TitleMatch, TextMatch
+from MoinMoin.util.multimatch import required_literal
 
 try:
     from MoinMoin.search import Xapian
@@ -79,6 +80,28 @@ class BaseExpression:
         """
         return None
 
+    def candidates(self, pages):
+        """ Return the pages this term can match
+
+        Used to skip pages before we search them. Terms that can't
+        cheaply tell which pages they might match (or are negated)
+        return None.
+
+        @param pages: builtin.SearchCandidates of the pages to search
+        @rtype: set
+        @return: page names or None (any page might match)
+        """
+        return None
+
+    def _required_literal(self, pattern):
+        """ Return the literal (ASCII, lower case) every match of pattern
+            contains or None
+        """
+        try:
+            return required_literal(pattern, self.search_re.flags)
+        except (re.error, RecursionError):
+            return None
+
     def _get_matches(self, page):
         raise NotImplementedError
 
@@ -213,6 +236,21 @@ class AndExpression(BaseExpression):
         if terms:
             return lambda name: self._filter(terms, name)
 
+    def candidates(self, pages):
+        """ The pages all (not negated) terms that know their candidates can match """
+        if self.negated:
+            return None
+        result = None
+        for term in self._subterms:
+            candidates = term.candidates(pages)
+            if candidates is None:
+                continue
+            if result is None:
+                result = candidates
+            else:
+                result = result & candidates
+        return result
+
     def sortByCost(self):
         self._subterms.sort(key=lambda t: t.costs)
 
@@ -290,6 +328,18 @@ class OrExpression(AndExpression):
         logging.debug("pageFilter OR returns %r" % result)
         return result
 
+    def candidates(self, pages):
+        """ The pages any term can match (None if one term does not know) """
+        if self.negated:
+            return None
+        result = set()
+        for term in self._subterms:
+            candidates = term.candidates(pages)
+            if candidates is None:
+                return None
+            result |= candidates
+        return result
+
     def search(self, page):
         """ Search page with terms
 
@@ -370,6 +420,17 @@ class TextSearch(BaseTextFieldSearch):
 
         return u"(%s)" % self.pattern
 
+    def candidates(self, pages):
+        """ The pages whose text might contain the pattern's literal and the
+            pages whose name matches
+        """
+        if self.negated:
+            return None
+        found = pages.text(self._required_literal(self.pattern))
+        if found is None:
+            return None
+        return found | pages.names(lambda name: self.search_re.search(name))
+
     def _get_matches(self, page):
         matches = []
 
@@ -421,6 +482,9 @@ class TitleSearch(BaseTextFieldSearch):
             return result
         return filter
 
+    def candidates(self, pages):
+        return pages.names(self.pageFilter())
+
     def _get_matches(self, page):
         """ Get matches in page name """
         matches = []
@@ -468,6 +532,11 @@ class LinkSearch(BaseFieldSearch):
 
         return u"(%s)" % self._textpattern
 
+    def candidates(self, pages):
+        if self.negated:
+            return None
+        return pages.linking_to(self.search_re)
+
     def _get_matches(self, page):
         # Get matches in page links
         matches = []
@@ -545,6 +614,11 @@ class CategorySearch(BaseFieldSearch):
 
         return matches
 
+    def candidates(self, pages):
+        if self.negated:
+            return None
+        return pages.text(self._required_literal(self.pattern))
+
     def highlight_re(self):
         if not self.highlight:
             return u''
@@ -37,6 +37,10 @@ class Match:
         else:
             self._start = self._end = 0
 
+    def __getstate__(self):
+        # re match objects can't be pickled (e.g. returned by search workers)
+        return {'re_match': None, '_start': self.start, '_end': self.end}
+
     def __len__(self):
         return self.end - self.start
 
@@ -243,19 +247,29 @@ class SearchResults:
 
     # Public functions --------------------------------------------------
 
-    def __init__(self, query, hits, pages, elapsed, sort, estimated_hits):
+    def __init__(self, query, hits, pages, elapsed, sort, estimated_hits, limited=False):
         self.query = query  # the query
         self.hits = hits  # hits list
         self.pages = pages  # number of pages in the wiki
         self.elapsed = elapsed  # search time
         self.estimated_hits = estimated_hits  # about how much hits?
-
-        if sort == 'weight':
-            self._sortByWeight()
-        elif sort == 'page_name':
-            self._sortByPagename()
+        self.limited = limited  # only the first hits (in index order)?
+
+        # the first hits of a limited search already are in the order of
+        # the index, sorting them again would mix up the result pages
+        if not limited:
+            if sort == 'weight':
+                self._sortByWeight()
+            elif sort == 'page_name':
+                self._sortByPagename()
         self.sort = sort
 
+    def _hitsNum(self):
+        """ Number of hits to page through """
+        if self.limited and self.estimated_hits:
+            return max(len(self.hits), self.estimated_hits[1])
+        return len(self.hits)
+
     def _sortByWeight(self):
         """ Sorts found pages by the weight of the matches """
         tmp = [(hit.weight(), hit.page_name, hit.attachment, hit) for hit in self.hits]
@@ -329,7 +343,7 @@ class SearchResults:
         else:
             lst = f.bullet_list
 
-        if paging and len(self.hits) <= request.cfg.search_results_per_page:
+        if paging and self._hitsNum() <= request.cfg.search_results_per_page:
             paging = False
 
         # Add pages formatted as list
@@ -383,7 +397,7 @@ class SearchResults:
             if paging:
                 write(self.formatPageLinks(hitsFrom=hitsFrom,
                                            hitsPerPage=request.cfg.search_results_per_page,
-                                           hitsNum=len(self.hits)))
+                                           hitsNum=self._hitsNum()))
 
         return self.getvalue()
 
@@ -410,7 +424,7 @@ class SearchResults:
         write = self.buffer.write
         _ = request.getText
 
-        if paging and len(self.hits) <= request.cfg.search_results_per_page:
+        if paging and self._hitsNum() <= request.cfg.search_results_per_page:
             paging = False
 
         # Add pages formatted as definition list
@@ -465,7 +479,7 @@ class SearchResults:
             if paging:
                 write(self.formatPageLinks(hitsFrom=hitsFrom,
                                            hitsPerPage=request.cfg.search_results_per_page,
-                                           hitsNum=len(self.hits)))
+                                           hitsNum=self._hitsNum()))
 
         return self.getvalue()
 
@@ -829,7 +843,7 @@ class SearchResults:
         self.matchLabel = (_('match'), _('matches'))
 
 
-def getSearchResults(request, query, hits, start, sort, estimated_hits):
+def getSearchResults(request, query, hits, start, sort, estimated_hits, limited=False):
     """ Return a SearchResults object with the specified properties
 
     @param request: current request
@@ -838,6 +852,7 @@ def getSearchResults(request, query, hits, start, sort, estimated_hits):
     @param start: position to start showing the hits
     @param sort: sorting of the results, either 'weight' or 'page_name'
     @param estimated_hits: if true, use this estimated hit count
+    @param limited: hits are only the first hits of the search (in index order)
     """
     result_hits = []
     for wikiname, page, attachment, match, rev in hits:
@@ -852,4 +867,4 @@ def getSearchResults(request, query, hits, start, sort, estimated_hits):
     elapsed = time.time() - start
     count = request.rootpage.getPageCount()
     return SearchResults(query, result_hits, count, elapsed, sort,
-                         estimated_hits)
+                         estimated_hits, limited)
@@ -0,0 +1,236 @@
+"""
+    MoinMoin - trigram index of the page texts
+
+    The built-in search (MoinSearch) has to read and search the text of
+    every page. With search_trigram_index enabled, it first asks the
+    TrigramIndex which pages contain all trigrams (strings of three
+    characters) of the literal text every match of a search term
+    contains (see MoinMoin.util.multimatch.required_literal) and only
+    reads and searches these pages.
+
+    The index only knows the trigrams of ASCII letters and digits in the
+    folded (lower case) page texts. For every trigram, it keeps a bit set
+    (a long integer) of the ids of the pages containing it.
+
+    Like the link graph, the index follows the edit-log: it reads the
+    texts of the pages saved, renamed or deleted since it was used last.
+    It is kept in request.cfg.cache.trigram_index and pickled to the wiki
+    cache arena 'trigrams'.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import array
+import re
+import threading
+
+from MoinMoin import caching
+from MoinMoin import log
+from MoinMoin.Page import Page
+from MoinMoin.util.multimatch import fold
+
+logging = log.getLogger(__name__)
+
+# increment this if the format of the index changes
+INDEX_VERSION = 1
+
+# save the index to the cache if it is this many bytes of edit-log behind
+# (when loading an older index, we just read a bit more of the edit-log)
+SAVE_LAG = 64 * 1024
+
+_CHARS = u'abcdefghijklmnopqrstuvwxyz0123456789'
+_CHAR_CODES = dict([(c, i) for i, c in enumerate(_CHARS)])
+_WORD_RE = re.compile(u'[a-z0-9]{3,}')
+
+_index_lock = threading.Lock()
+
+
+def trigram_codes(text):
+    """ Return the set of the codes of the trigrams of folded text
+
+    @param text: text as returned by multimatch.fold
+    @rtype: set
+    @return: trigram codes (ints < 36 ** 3)
+    """
+    trigrams = set()
+    for word in _WORD_RE.findall(text):
+        trigrams.update([word[i:i + 3] for i in range(len(word) - 2)])
+    codes = _CHAR_CODES
+    return set([codes[a] * 1296 + codes[b] * 36 + codes[c] for a, b, c in trigrams])
+
+
+class TrigramIndex:
+    """ The trigrams of the texts of all pages, see module docstring
+
+        names - [page name or None (free id)], indexed by page id
+        ids - {page name: page id}
+        page_codes - {page id: array of the trigram codes of the page}
+        bits - {trigram code: bit set of the ids of the pages containing it}
+    """
+
+    def __init__(self):
+        self.log_pos = None
+        self.saved_pos = None
+        self.names = []
+        self.ids = {}
+        self.page_codes = {}
+        self.bits = {}
+        self._lock = threading.RLock()
+
+    def _cache_entry(self, request):
+        return caching.CacheEntry(request, 'trigrams', 'index', scope='wiki', use_pickle=True)
+
+    def _load(self, request):
+        try:
+            data = self._cache_entry(request).content()
+        except caching.CacheError:
+            data = None
+        if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+            self.log_pos = self.saved_pos = data['log_pos']
+            self.names = data['names']
+            self.page_codes = data['page_codes']
+            self.bits = data['bits']
+            self.ids = dict([(name, pid) for pid, name in enumerate(self.names) if name is not None])
+
+    def _save(self, request):
+        data = {
+            'version': INDEX_VERSION,
+            'log_pos': self.log_pos,
+            'names': self.names,
+            'page_codes': self.page_codes,
+            'bits': self.bits,
+        }
+        # if saving fails, we try again after the next SAVE_LAG changes
+        self.saved_pos = self.log_pos
+        try:
+            self._cache_entry(request).update(data)
+        except caching.CacheError as err:
+            logging.warning("could not save trigram index: %s" % str(err))
+
+    def refresh(self, request):
+        """ Bring the index up to date (once per request, unless this
+            process wrote to the edit-log since then)
+        """
+        from MoinMoin.logfile import editlog
+        writes = editlog.EditLog.local_writes
+        if getattr(request, '_trigram_index_checked', None) == (self, writes):
+            return
+        with self._lock:
+            self._update(request)
+        request._trigram_index_checked = (self, writes)
+
+    def _update(self, request):
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        if self.log_pos is None:
+            self._load(request)
+        size = elog.size()
+        if self.log_pos is None or self.log_pos > size:
+            self._rebuild(request, size)
+        elif self.log_pos < size:
+            new_pos, items = elog.news(self.log_pos)
+            for pagename in set(items):
+                logging.debug("trigram index: reading %r" % pagename)
+                self._set_page(pagename, self._read_page(request, pagename))
+            self.log_pos = new_pos
+            if self.log_pos - self.saved_pos > SAVE_LAG:
+                self._save(request)
+
+    def _rebuild(self, request, log_pos):
+        logging.info("building trigram index")
+        # changes done while we read the pages will be read next time
+        self.log_pos = log_pos
+        self.names = []
+        self.ids = {}
+        self.page_codes = {}
+        for pagename in request.rootpage.getPageList(user=''):
+            codes = self._read_page(request, pagename)
+            if codes is not None:
+                pid = self.ids[pagename] = len(self.names)
+                self.names.append(pagename)
+                self.page_codes[pid] = codes
+        # building the bit sets from byte arrays is much faster than
+        # setting the bits of the (immutable) integers one by one
+        size = len(self.names) // 8 + 1
+        bytesets = {}
+        for pid, codes in self.page_codes.items():
+            byte, mask = pid >> 3, 1 << (pid & 7)
+            for code in codes:
+                byteset = bytesets.get(code)
+                if byteset is None:
+                    byteset = bytesets[code] = bytearray(size)
+                byteset[byte] |= mask
+        self.bits = dict([(code, int.from_bytes(byteset, 'little')) for code, byteset in bytesets.items()])
+        self._save(request)
+
+    def _read_page(self, request, pagename):
+        """ Return the array of trigram codes of page pagename or None if
+            the page does not exist
+        """
+        page = Page(request, pagename)
+        if not page.exists():
+            return None
+        return array.array('H', sorted(trigram_codes(fold(page.get_raw_body()))))
+
+    def _set_page(self, pagename, codes):
+        """ Set the trigram codes of page pagename, None removes the page """
+        pid = self.ids.get(pagename)
+        if pid is not None:
+            mask = ~(1 << pid)
+            for code in self.page_codes.pop(pid):
+                bits = self.bits[code] & mask
+                if bits:
+                    self.bits[code] = bits
+                else:
+                    del self.bits[code]
+            if codes is None:
+                del self.ids[pagename]
+                self.names[pid] = None
+        if codes is None:
+            return
+        if pid is None:
+            try:
+                pid = self.names.index(None)
+                self.names[pid] = pagename
+            except ValueError:
+                pid = len(self.names)
+                self.names.append(pagename)
+            self.ids[pagename] = pid
+        self.page_codes[pid] = codes
+        bit = 1 << pid
+        for code in codes:
+            self.bits[code] = self.bits.get(code, 0) | bit
+
+    def pages(self, literal):
+        """ Return the set of the names of the pages whose text might
+            contain literal or None if the index can't tell (literal has no
+            trigram of ASCII letters and digits)
+
+        @param literal: ASCII lower case text (see multimatch.required_literal)
+        @rtype: set
+        """
+        codes = trigram_codes(literal)
+        if not codes:
+            return None
+        bits = -1
+        for code in codes:
+            bits &= self.bits.get(code, 0)
+            if not bits:
+                return set()
+        # bit i of bits (from the right) is the page with id i
+        names = self.names
+        return set([names[pid] for pid, bit in enumerate(bin(bits)[:1:-1]) if bit == '1'])
+
+
+def get_index(request):
+    """ Return the up to date TrigramIndex """
+    cache = request.cfg.cache
+    index = getattr(cache, 'trigram_index', None)
+    if index is None:
+        with _index_lock:
+            index = getattr(cache, 'trigram_index', None)
+            if index is None:
+                index = cache.trigram_index = TrigramIndex()
+    index.refresh(request)
+    return index
@@ -28,6 +28,119 @@ from MoinMoin.Page import Page
 ### Basic Permissions Interface -- most features enabled by default
 #############################################################################
 
+# max. number of ACL decisions we remember (see _check)
+MAX_ACL_DECISIONS = 100000
+
+# _decide: neither the page nor its parent pages have an ACL
+_NO_ACL = object()
+
+
+def _decision_key(request, username, right):
+    """ Return the key for the decisions about username / right in the ACL
+        decision cache (request.cfg.cache.acl, an ItemCache).
+
+        Besides the user name and the right, a decision depends on the
+        acl_hierarchic setting and on whether the user is Known and
+        Trusted (see the special ACL entries).
+    """
+    known = bool(username) and user.getUserId(request, username) is not None
+    trusted = (request.user.name == username and
+               request.user.auth_method in request.cfg.auth_methods_trusted)
+    return (username, right, request.cfg.acl_hierarchic, known, trusted)
+
+
+def _remember_decisions(request, key, decisions):
+    """ Put decisions {pagename: allowed} into the ACL decision cache """
+    acl_cache = request.cfg.cache.acl
+    store = acl_cache.store
+    count = (store.get(None, 'decisions') or 0) + len(decisions)
+    if count > MAX_ACL_DECISIONS:
+        log_pos = acl_cache.log_pos
+        store.clear()
+        acl_cache.log_pos = log_pos
+        count = len(decisions)
+    items = [(pagename, key, allowed) for pagename, allowed in decisions.items()]
+    items.append((None, 'decisions', count))
+    store.put_many(items)
+
+
+def _decide(request, pagenames, username, right):
+    """ Check <right> access permission for user <username> on pages <pagenames>
+
+    This does the work for _check and _check_many (without the decision
+    cache). The checks that don't depend on the page are only done once
+    and with acl_hierarchic, the ACL of a parent page is only evaluated
+    once for all its subpages.
+
+    @rtype: dict
+    @return: {pagename: bool}
+    """
+    cache = request.cfg.cache
+    allowed = cache.acl_rights_before.may(request, username, right)
+    if allowed is not None:
+        return dict.fromkeys(pagenames, allowed)
+
+    after = []  # evaluated once, when needed
+
+    def rights_after():
+        if not after:
+            allowed = cache.acl_rights_after.may(request, username, right)
+            after.append(allowed is not None and allowed)
+        return after[0]
+
+    default = []
+
+    def rights_default():
+        if not default:
+            default.append(cache.acl_rights_default.may(request, username, right))
+        return default[0]
+
+    decisions = {}
+    if request.cfg.acl_hierarchic:
+        # We check each page in the hierarchy, starting with the deepest
+        # page and going to the top of the tree, until we find a page with
+        # an acl. page_decisions remembers the result for every page name
+        # in the hierarchy.
+        page_decisions = {}
+
+        def hierarchic(name):
+            try:
+                return page_decisions[name]
+            except KeyError:
+                pass
+            acl = Page(request, name).getACL(request)
+            if acl.acl:
+                # If the item has an acl (even one that doesn't match) we *do not*
+                # check the parents. We only check the parents if there's no acl on
+                # the item at all.
+                allowed = acl.may(request, username, right)
+            elif '/' in name:
+                allowed = hierarchic(name.rsplit('/', 1)[0])
+            else:
+                allowed = _NO_ACL
+            page_decisions[name] = allowed
+            return allowed
+
+        for pagename in pagenames:
+            allowed = hierarchic(pagename)
+            if allowed is _NO_ACL:
+                allowed = rights_default()
+            decisions[pagename] = allowed if allowed is not None else rights_after()
+    else:
+        for pagename in pagenames:
+            if request.page is not None and pagename == request.page.page_name:
+                p = request.page # reuse is good
+            else:
+                p = Page(request, pagename)
+            acl = p.getACL(request) # this will be fast in a reused page obj
+            if acl.acl is None:
+                allowed = rights_default() # same as acl.may, but only evaluated once
+            else:
+                allowed = acl.may(request, username, right)
+            decisions[pagename] = allowed if allowed is not None else rights_after()
+    return decisions
+
+
 def _check(request, pagename, username, right):
     """ Check <right> access permission for user <username> on page <pagename>
 
@@ -40,6 +153,10 @@ def _check(request, pagename, username, right):
     For both configurations, we check acl_rights_before before the page/default
     acl and acl_rights_after after the page/default acl, of course.
 
+    The decisions are remembered in request.cfg.cache.acl (if cfg.acl_cache
+    is enabled) until the page, one of its parent pages or a group page
+    changes (see Page.ItemCache).
+
     This method should not be called by users, use __getattr__ instead.
 
     @param request: the current request object
@@ -50,48 +167,44 @@ def _check(request, pagename, username, right):
     @rtype: bool
     @return: True if you have permission or False
     """
-    cache = request.cfg.cache
-    allowed = cache.acl_rights_before.may(request, username, right)
-    if allowed is not None:
-        return allowed
+    acl_cache = request.cfg.cache.acl
+    if acl_cache is None:
+        return _decide(request, [pagename], username, right)[pagename]
+    acl_cache.refresh(request)
+    key = _decision_key(request, username, right)
+    allowed = acl_cache.store.get(pagename, key)
+    if allowed is None:
+        allowed = _decide(request, [pagename], username, right)[pagename]
+        _remember_decisions(request, key, {pagename: allowed})
+    return allowed
 
-    if request.cfg.acl_hierarchic:
-        pages = pagename.split('/') # create page hierarchy list
-        some_acl = False
-        for i in range(len(pages), 0, -1):
-            # Create the next pagename in the hierarchy
-            # starting at the leaf, going to the root
-            name = '/'.join(pages[:i])
-            # Get page acl and ask for permission
-            acl = Page(request, name).getACL(request)
-            if acl.acl:
-                some_acl = True
-                allowed = acl.may(request, username, right)
-                if allowed is not None:
-                    return allowed
-                # If the item has an acl (even one that doesn't match) we *do not*
-                # check the parents. We only check the parents if there's no acl on
-                # the item at all.
-                break
-        if not some_acl:
-            allowed = cache.acl_rights_default.may(request, username, right)
-            if allowed is not None:
-                return allowed
-    else:
-        if request.page is not None and pagename == request.page.page_name:
-            p = request.page # reuse is good
-        else:
-            p = Page(request, pagename)
-        acl = p.getACL(request) # this will be fast in a reused page obj
-        allowed = acl.may(request, username, right)
-        if allowed is not None:
-            return allowed
 
-    allowed = cache.acl_rights_after.may(request, username, right)
-    if allowed is not None:
-        return allowed
+def _check_many(request, pagenames, username, right):
+    """ Check <right> access permission for user <username> on many pages
 
-    return False
+    Like _check, but faster than calling it for every page.
+
+    @rtype: dict
+    @return: {pagename: bool}
+    """
+    acl_cache = request.cfg.cache.acl
+    if acl_cache is None:
+        return _decide(request, pagenames, username, right)
+    acl_cache.refresh(request)
+    key = _decision_key(request, username, right)
+    result = {}
+    todo = []
+    remembered = acl_cache.store.get_many([(pagename, key) for pagename in pagenames])
+    for pagename, allowed in zip(pagenames, remembered):
+        if allowed is None:
+            todo.append(pagename)
+        else:
+            result[pagename] = allowed
+    if todo:
+        decisions = _decide(request, todo, username, right)
+        _remember_decisions(request, key, decisions)
+        result.update(decisions)
+    return result
 
 
 class Permissions:
@@ -149,6 +262,21 @@ class Permissions:
             raise AttributeError(attr)
         return lambda pagename: _check(self.request, pagename, self.name, attr)
 
+    def may_read_many(self, pagenames):
+        """ Return the pages of pagenames the user may read
+
+        This is much faster than calling read() for every page, e.g. for
+        page lists. If a sub class has its own read() method, it is used.
+
+        @param pagenames: list of page names
+        @rtype: list
+        @return: the readable page names (in the same order)
+        """
+        if getattr(self.__class__, 'read', None) is not None:
+            return [pagename for pagename in pagenames if self.read(pagename)]
+        decisions = _check_many(self.request, pagenames, self.name, 'read')
+        return [pagename for pagename in pagenames if decisions[pagename]]
+
 
 # make an alias for the default policy
 Default = Permissions
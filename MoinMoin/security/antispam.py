@@ -6,7 +6,7 @@
 """
 
 import datetime
-import re
+import hashlib
 import time
 
 from MoinMoin import caching, wikiutil
@@ -134,6 +134,34 @@ def getblacklist(request, pagename, do_update):
     return mymtime, makelist(blacklist)
 
 
+def getmatcher(request, blacklist):
+    """ Get a matcher for the blacklisted regular expressions
+
+    Building the matcher for a few thousand expressions takes a while, so it
+    is also kept in a cache file for the other processes of the wiki.
+
+    @param request: current request
+    @param blacklist: list of blacklisted regular expressions
+    @rtype: MoinMoin.util.multimatch.MultiMatcher
+    @return: matcher for blacklist
+    """
+    from MoinMoin.util.multimatch import MultiMatcher
+    digest = hashlib.sha1(u'\n'.join(blacklist).encode('utf-8')).hexdigest()
+    cache = caching.CacheEntry(request, "antispam", "matcher", scope='wiki', use_pickle=True)
+    try:
+        cached_digest, matcher = cache.content()
+        if cached_digest == digest:
+            return matcher
+    except (caching.CacheError, ValueError, TypeError, AttributeError, ImportError):
+        pass
+    matcher = MultiMatcher(blacklist)
+    try:
+        cache.update((digest, matcher))
+    except caching.CacheError:
+        pass
+    return matcher
+
+
 class SecurityPolicy(Permissions):
     """ Extend the default security policy with antispam feature """
 
@@ -157,16 +185,13 @@ class SecurityPolicy(Permissions):
             if blacklist:
                 invalid_cache = not getattr(request.cfg.cache, "antispam_blacklist", None)
                 if invalid_cache or request.cfg.cache.antispam_blacklist[0] < latest_mtime:
-                    mmblcache = []
-                    for blacklist_re in blacklist:
-                        try:
-                            mmblcache.append(re.compile(blacklist_re, re.I))
-                        except re.error as err:
-                            logging.error("Error in regex '%s': %s. Please check the pages %s." % (
-                                blacklist_re,
-                                str(err),
-                                ', '.join(BLACKLISTPAGES)))
-                    request.cfg.cache.antispam_blacklist = (latest_mtime, mmblcache)
+                    matcher = getmatcher(request, blacklist)
+                    for blacklist_re, err in matcher.errors:
+                        logging.error("Error in regex '%s': %s. Please check the pages %s." % (
+                            blacklist_re,
+                            err,
+                            ', '.join(BLACKLISTPAGES)))
+                    request.cfg.cache.antispam_blacklist = (latest_mtime, matcher)
 
                 from MoinMoin.Page import Page
 
@@ -180,16 +205,15 @@ class SecurityPolicy(Permissions):
                 difference = newset - oldset
                 addedtext = kw.get('comment', u'') + u''.join(difference)
 
-                for blacklist_re in request.cfg.cache.antispam_blacklist[1]:
-                    match = blacklist_re.search(addedtext)
-                    if match:
-                        # Log error and raise SaveError, PageEditor should handle this.
-                        _ = editor.request.getText
-                        msg = _('Sorry, can not save page because "%(content)s" is not allowed in this wiki.') % {
-                            'content': wikiutil.escape(match.group())
-                        }
-                        logging.info(msg)
-                        raise editor.SaveError(msg)
+                match = request.cfg.cache.antispam_blacklist[1].search(addedtext)
+                if match:
+                    # Log error and raise SaveError, PageEditor should handle this.
+                    _ = editor.request.getText
+                    msg = _('Sorry, can not save page because "%(content)s" is not allowed in this wiki.') % {
+                        'content': wikiutil.escape(match.group())
+                    }
+                    logging.info(msg)
+                    raise editor.SaveError(msg)
             request.clock.stop('antispam')
 
         # No problem to save if my base class agree
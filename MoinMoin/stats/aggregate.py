@@ -0,0 +1,284 @@
+"""
+    MoinMoin - event-log aggregates
+
+    The statistics (PageHits and Hits macros, hitcounts and useragents
+    charts) all count VIEWPAGE and SAVEPAGE events from the event-log.
+    Instead of each of them reading the event-log backwards on its own,
+    EventStats reads the new event-log lines once (starting at the position
+    it stopped at last time) and adds them to one set of counters, which is
+    pickled to the wiki cache arena 'charts':
+
+    days - {pagename: {day: [views, edits]}}, day is a (y, m, d) tuple (UTC),
+           pagename None has the counts for all pages
+    hits - {pagename: views}
+    agents - {user agent: number of events}
+
+    Archived segments of the event-log (see logfile.LogSegments) are
+    read once, when they show up. If the event-log got shorter or was
+    replaced (and not just rotated), the counters are rebuilt from the
+    whole event-log.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import datetime
+import threading
+import time
+
+from MoinMoin import caching, config, wikiutil
+from MoinMoin import log
+from MoinMoin.logfile import eventlog
+
+logging = log.getLogger(__name__)
+
+# increment this if the format of the aggregates changes
+AGGREGATES_VERSION = 2
+
+# we remember the first bytes of the event-log to notice a new event-log
+HEAD_SIZE = 128
+
+# this is a CONSTANT used for on-disk caching, it must NOT be configurable and
+# not depend on request.user!
+DATE_FMT = '%04d-%02d-%02d'  # % (y, m, d)
+
+COUNTED_EVENTS = ('VIEWPAGE', 'SAVEPAGE', )
+
+# write the aggregates to the cache if we read more than this many bytes
+# of event-log since we last saved them (other processes just read a bit
+# more of the event-log if the cached aggregates are not the newest)
+SAVE_LAG = 16 * 1024
+
+
+def user_agent_name(ua):
+    """ Return the short name of user agent string ua used in the statistics """
+    try:
+        pos = ua.index(" (compatible; ")
+        return ua[pos:].split(';')[1].strip()
+    except ValueError:
+        return ua.split()[0]
+
+
+class EventStats:
+    """ Counters aggregated from the event-log, see module docstring
+
+        The counters are shared by all requests of a process (they are kept
+        in request.cfg.cache), use the methods below to get a copy of them.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._reset()
+        self.saved_pos = None
+        self.uid = None
+
+    def _reset(self):
+        self.pos = 0
+        self.head = b''
+        self.days = {}
+        self.hits = {}
+        self.agents = {}
+        self.done_segments = set()
+
+    def _cache_entry(self):
+        return caching.CacheEntry(self.request, 'charts', 'aggregates', scope='wiki',
+                                  use_pickle=True)
+
+    def _load(self):
+        cache = self._cache_entry()
+        uid = cache.uid()
+        if uid == self.uid:
+            return  # we have the same or newer data in memory
+        try:
+            data = cache.content()
+        except caching.CacheError:
+            data = None
+        self.uid = uid
+        if isinstance(data, dict) and data.get('version') == AGGREGATES_VERSION:
+            self.pos = self.saved_pos = data['pos']
+            self.head = data['head']
+            self.days = data['days']
+            self.hits = data['hits']
+            self.agents = data['agents']
+            self.done_segments = data['done_segments']
+
+    def _save(self):
+        data = {
+            'version': AGGREGATES_VERSION,
+            'pos': self.pos,
+            'head': self.head,
+            'days': self.days,
+            'hits': self.hits,
+            'agents': self.agents,
+            'done_segments': self.done_segments,
+        }
+        cache = self._cache_entry()
+        try:
+            cache.update(data)
+            self.saved_pos = self.pos
+            self.uid = cache.uid()
+        except caching.CacheError as err:
+            logging.warning("could not save event-log aggregates: %s" % str(err))
+
+    def _add_new_events(self):
+        """ Add the events after self.pos to the counters
+
+        @rtype: bool
+        @return: True if the counters changed
+        """
+        elog = eventlog.EventLog(self.request)
+        try:
+            f = open(elog._filename, 'rb')
+        except IOError:
+            f = None
+        try:
+            head = f is not None and f.read(HEAD_SIZE) or b''
+            size = elog.size()
+            changed = False
+            if head[:len(self.head)] != self.head or size < self.pos:
+                # the event-log we read last time was rotated (see LogSegments) or replaced
+                changed = True
+                if not self._finish_rotated(elog):
+                    logging.info("event-log was replaced, rebuilding event-log aggregates")
+                    self._reset()
+                self.pos, self.head = 0, b''
+            for segment in elog.segments.list():
+                if segment.name not in self.done_segments:
+                    # rotated before we could read it (or we are rebuilding)
+                    changed = True
+                    self._read_segment(elog, segment, 0)
+            if head != self.head:
+                changed = True
+                self.head = head
+            if f is not None:
+                f.seek(self.pos)
+                count = self._read_events(elog, f)
+                if count:
+                    changed = True
+                    self.pos += count
+        finally:
+            if f is not None:
+                f.close()
+        return changed
+
+    def _finish_rotated(self, elog):
+        """ Find the segment that the event-log we read last time was moved to
+            and read the rest of it.
+
+        @rtype: bool
+        @return: True if we found the segment
+        """
+        if not self.head:
+            return not self.pos
+        for segment in reversed(elog.segments.list()):
+            if segment.name in self.done_segments:
+                break
+            f = segment.open()
+            try:
+                head = f.read(len(self.head))
+            finally:
+                f.close()
+            if head == self.head and segment.size >= self.pos:
+                self._read_segment(elog, segment, self.pos)
+                return True
+        return False
+
+    def _read_segment(self, elog, segment, pos):
+        f = segment.open()
+        try:
+            f.seek(pos)
+            self._read_events(elog, f)
+        finally:
+            f.close()
+        self.done_segments.add(segment.name)
+
+    def _read_events(self, elog, f):
+        """ Add the events from the complete lines in file f (from the current
+            position on), return the number of bytes read.
+        """
+        count = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # still being written
+            count += len(line)
+            event = elog.parser(str(line, config.charset))
+            if event is not None and event[1] in COUNTED_EVENTS:
+                self._add_event(*event)
+        return count
+
+    def _add_event(self, time_usecs, eventtype, values):
+        """ Add a single event to the counters """
+        day = tuple(time.gmtime(wikiutil.version2timestamp(time_usecs))[0:3])  # must be UTC
+        counter = 0 if eventtype == 'VIEWPAGE' else 1
+        pagename = values.get('pagename', '')
+        for name in pagename and (None, pagename) or (None, ):
+            counts = self.days.setdefault(name, {}).setdefault(day, [0, 0])
+            counts[counter] += 1
+        if eventtype == 'VIEWPAGE' and pagename:
+            self.hits[pagename] = self.hits.get(pagename, 0) + 1
+        ua = values.get('HTTP_USER_AGENT')
+        if ua:
+            ua = user_agent_name(ua)
+            self.agents[ua] = self.agents.get(ua, 0) + 1
+
+    def update(self):
+        """ Add the events that are new in the event-log """
+        self._load()
+        if self._add_new_events() and (self.saved_pos is None or
+                                       self.pos - self.saved_pos > SAVE_LAG):
+            self._save()
+
+    def day_counts(self, pagename=None):
+        """ Return the views and edits per day
+
+        @param pagename: only count events for this page (default: all pages)
+        @rtype: tuple
+        @return: (days, views, edits) lists, days without any events between
+                 the first and the last day are included (with 0 counts)
+        """
+        counts = self.days.get(pagename)
+        days, views, edits = [], [], []
+        if not counts:
+            return days, views, edits
+        counts = dict(counts)
+        day = datetime.date(*min(counts))
+        last = datetime.date(*max(counts))
+        while day <= last:
+            key = (day.year, day.month, day.day)
+            v, e = counts.get(key, (0, 0))
+            days.append(DATE_FMT % key)
+            views.append(v)
+            edits.append(e)
+            day += datetime.timedelta(days=1)
+        return days, views, edits
+
+    def page_hits(self):
+        """ Return dict {pagename: views} """
+        return dict(self.hits)
+
+    def user_agents(self):
+        """ Return list of (count, user agent), highest count first """
+        return sorted([(cnt, ua) for ua, cnt in list(self.agents.items())], reverse=True)
+
+
+_stats_lock = threading.Lock()
+
+
+def get_stats(request, func, *args):
+    """ Bring the event-log aggregates up to date and return func(stats, *args)
+
+    e.g. get_stats(request, EventStats.page_hits)
+
+    @param request: the request object
+    @param func: EventStats method returning the data we need
+    """
+    with _stats_lock:
+        stats = getattr(request.cfg.cache, 'event_stats', None)
+        if stats is None:
+            stats = request.cfg.cache.event_stats = EventStats(request)
+        stats.request = request
+        try:
+            stats.update()
+            return func(stats, *args)
+        finally:
+            stats.request = None
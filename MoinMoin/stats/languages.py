@@ -17,17 +17,20 @@ def get_data(request):
     _ = request.getText
     data = {}
 
-    users = user.getUserList(request)
-    for userID in users:
-        current_user = user.User(request, userID)
-        if current_user.language == u'':
+    profiles = request.cfg.cache.user_store.values(['language'])
+    for userID, values in list(profiles.items()):
+        language = values.get('language', u'')
+        if language and language not in i18n.wikiLanguages():
+            language = 'en'  # like User does
+        if language == u'':
             # User is using <Browser setting>, attempting to look up if we've managed to store the real language...
+            current_user = user.User(request, userID)
             try:
                 data[current_user.real_language] = data.get(current_user.real_language, 0) + 1
             except AttributeError:  # Couldn't find the used language at all...
                 data[u''] = data.get(u'', 0) + 1
         else:
-            data[current_user.language] = data.get(current_user.language, 0) + 1
+            data[language] = data.get(language, 0) + 1
     if u'' in data:
         data[u'browser'] = data.pop(u'')  # In case we have users whose languages aren't detectable.
     data = [(cnt, current_user_language) for current_user_language, cnt in list(data.items())]
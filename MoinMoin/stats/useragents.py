@@ -11,9 +11,9 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import wikiutil, caching, logfile
+from MoinMoin import wikiutil
 from MoinMoin.Page import Page
-from MoinMoin.logfile import eventlog
+from MoinMoin.stats import aggregate
 
 _debug = 0
 
@@ -44,43 +44,8 @@ def linkto(pagename, request, params=''):
 
 
 def get_data(request):
-    # get results from cache
-    cache = caching.CacheEntry(request, 'charts', 'useragents', scope='wiki', use_pickle=True)
-    cache_date, data = 0, {}
-    if cache.exists():
-        try:
-            cache_date, data = cache.content()
-        except:
-            cache.remove()  # cache gone bad
-
-    log = eventlog.EventLog(request)
-    try:
-        new_date = log.date()
-    except logfile.LogMissing:
-        new_date = None
-
-    if new_date is not None:
-        log.set_filter(['VIEWPAGE', 'SAVEPAGE'])
-        for event in log.reverse():
-            if event[0] <= cache_date:
-                break
-            ua = event[2].get('HTTP_USER_AGENT')
-            if ua:
-                try:
-                    pos = ua.index(" (compatible; ")
-                    ua = ua[pos:].split(';')[1].strip()
-                except ValueError:
-                    ua = ua.split()[0]
-                # ua = ua.replace(';', '\n')
-                data[ua] = data.get(ua, 0) + 1
-
-        # write results to cache
-        cache.update((new_date, data))
-
-    data = [(cnt, ua) for ua, cnt in list(data.items())]
-    data.sort()
-    data.reverse()
-    return data
+    """ Return list of (count, user agent), highest count first """
+    return aggregate.get_stats(request, aggregate.EventStats.user_agents)
 
 
 def text(pagename, request):
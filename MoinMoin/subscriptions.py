@@ -0,0 +1,195 @@
+"""
+    MoinMoin - page subscription index
+
+    Page.getSubscribers has to find the users subscribed to a page (or to
+    one of its categories) whenever a page is saved. Instead of checking
+    the subscription patterns of every user, it asks the SubscriptionIndex:
+
+    exact - {page name: set of user ids} for all subscriptions; a
+            subscription to a category is just the name of the category
+            page, so it is found by looking up the categories of the page
+    regex - {pattern: set of user ids} for the subscriptions that contain
+            regular expression characters. One MultiMatcher searches for all
+            of them (only the patterns whose required literal occurs in the
+            page names are actually searched).
+
+    So finding the subscribers costs a few dict lookups, one scan of the
+    page names and the regular expression searches of some patterns.
+
+    The index is pickled to the userdir cache arena 'users' (key
+    'pagesubscriptions') and kept in memory in
+    request.cfg.cache.page_subscriptions. Saving or removing a user updates
+    the entry of this user, see update_user.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import re
+import threading
+
+from MoinMoin import caching
+from MoinMoin import log
+from MoinMoin.util.multimatch import MultiMatcher
+
+logging = log.getLogger(__name__)
+
+# increment this if the format of the index changes
+INDEX_VERSION = 1
+
+# subscriptions without these characters only match the page name itself
+REGEX_CHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+_index_lock = threading.Lock()
+
+
+def _discard(mapping, key, uid):
+    uids = mapping.get(key)
+    if uids is not None:
+        uids.discard(uid)
+        if not uids:
+            del mapping[key]
+
+
+class SubscriptionIndex:
+    """ Index of the page subscriptions of all users, see module docstring """
+
+    def __init__(self):
+        self.version = INDEX_VERSION
+        self.users = {}  # {user id: (email, subscribed pages)}
+        self.exact = {}
+        self.regex = {}
+        self._matcher = None
+
+    def set_user(self, uid, email, subscribed_pages):
+        """ Set (or replace) the subscriptions of user id uid """
+        self.remove_user(uid)
+        if not subscribed_pages:
+            return  # we only store users with some page subscriptions
+        self.users[uid] = (email, list(subscribed_pages))
+        for pattern in subscribed_pages:
+            self.exact.setdefault(pattern, set()).add(uid)
+            if REGEX_CHARS.search(pattern):
+                if pattern not in self.regex:
+                    self._matcher = None
+                self.regex.setdefault(pattern, set()).add(uid)
+
+    def remove_user(self, uid):
+        """ Remove the subscriptions of user id uid """
+        email, subscribed_pages = self.users.pop(uid, (None, []))
+        for pattern in subscribed_pages:
+            _discard(self.exact, pattern, uid)
+            if pattern in self.regex:
+                _discard(self.regex, pattern, uid)
+                if pattern not in self.regex:
+                    self._matcher = None
+
+    def email(self, uid):
+        """ Return the email address of user id uid as stored in the index """
+        return self.users[uid][0]
+
+    def subscribers(self, pages):
+        """ Return the ids of the users subscribed to any of pages
+
+        Like User.isSubscribedTo, a subscription matches if it is one of
+        the page names or if it is a regular expression matching a whole
+        page name.
+
+        @param pages: list of page names (with interwiki names, if used)
+        @rtype: set
+        @return: user ids
+        """
+        uids = set()
+        for pagename in pages:
+            uids.update(self.exact.get(pagename, ()))
+        if self.regex:
+            if self._matcher is None:
+                # invalid patterns are skipped by the matcher
+                self._matcher = MultiMatcher([r'^%s$' % pattern for pattern in sorted(self.regex)], re.M)
+            text = '\n'.join(pages)
+            for pattern, match in self._matcher.matches(text):
+                uids.update(self.regex[pattern[1:-1]])
+        return uids
+
+
+def _cache_entry(request):
+    return caching.CacheEntry(request, 'users', 'pagesubscriptions', scope='userdir',
+                              use_pickle=True, do_locking=False)
+
+
+def _load(cache):
+    try:
+        index = cache.content()
+    except caching.CacheError:
+        return None
+    if not isinstance(index, SubscriptionIndex) or getattr(index, 'version', None) != INDEX_VERSION:
+        return None
+    return index
+
+
+def build_index(request):
+    """ Build the index from all user profiles
+
+    @rtype: SubscriptionIndex
+    """
+    index = SubscriptionIndex()
+    profiles = request.cfg.cache.user_store.values(['email', 'subscribed_pages'])
+    for uid, values in list(profiles.items()):
+        index.set_user(uid, values.get('email', u''), values.get('subscribed_pages'))
+    return index
+
+
+def get_index(request):
+    """ Return the up to date subscription index
+
+    @rtype: SubscriptionIndex
+    """
+    cache = _cache_entry(request)
+    uid = cache.uid()
+    memory = getattr(request.cfg.cache, 'page_subscriptions', None)
+    if uid is not None and memory is not None and memory[0] == uid:
+        return memory[1]
+    with _index_lock:
+        index = _load(cache)
+        if index is None:
+            cache.lock('w')
+            try:
+                uid = cache.uid()
+                index = _load(cache)  # maybe another process just built it
+                if index is None:
+                    logging.debug("building page subscription index")
+                    index = build_index(request)
+                    cache.update(index)
+                    uid = cache.uid()
+            finally:
+                cache.unlock()
+        request.cfg.cache.page_subscriptions = (uid, index)
+    return index
+
+
+def update_user(request, uid, email, subscribed_pages):
+    """ Update the subscriptions of a saved or removed user in the index
+
+    @param request: the request object
+    @param uid: user id
+    @param email: email address of the user
+    @param subscribed_pages: list of subscriptions, empty for removed (or
+                             invalid) users
+    """
+    cache = _cache_entry(request)
+    if not cache.exists():
+        return  # if no index exists, just don't do anything
+    with _index_lock:
+        cache.lock('w')
+        try:
+            index = _load(cache)
+            if index is None:
+                # get_index will build a new one
+                cache.remove()
+                request.cfg.cache.page_subscriptions = None
+                return
+            index.set_user(uid, email, subscribed_pages)
+            cache.update(index)
+            request.cfg.cache.page_subscriptions = (cache.uid(), index)
+        finally:
+            cache.unlock()
@@ -20,16 +20,14 @@
 """
 
 import base64
-import codecs
 import hashlib
 import hmac
-import os
 import time
 from copy import deepcopy
 
 from passlib.hash import des_crypt
 
-from MoinMoin import config, caching, wikiutil, i18n, events
+from MoinMoin import config, caching, wikiutil, i18n, events, subscriptions
 from MoinMoin import log
 from MoinMoin.support import md5crypt
 from MoinMoin.util import timefuncs, random_string
@@ -40,6 +38,9 @@ logging = log.getLogger(__name__)
 # the attribute names in here should be uniquely identifying a user.
 CACHED_USER_ATTRS = ['name', 'email', 'jid', 'openids', ]
 
+# max. number of lookup misses we remember (see _getUserIdByKey)
+MAX_LOOKUP_MISSES = 10000
+
 
 def getUserList(request):
     """ Get a list of all (numerical) user IDs.
@@ -48,19 +49,24 @@ def getUserList(request):
     @rtype: list
     @return: all user IDs
     """
-    import re
-    user_re = re.compile(r'^\d+\.\d+(\.\d+)?$')
-    files = os.listdir(request.cfg.user_dir)
-    userlist = [f for f in files if user_re.match(f)]
-    return userlist
+    return request.cfg.cache.user_store.uids()
 
 
-def get_by_filter(request, filter_func):
+def get_by_filter(request, filter_func, **attrs):
     """ Searches for a user with a given filter function
 
     Be careful: SLOW for big wikis, rather use _getUserIdByKey & related.
+    If you give profile values as keyword arguments (e.g. email=u'...'),
+    only the users with these values are checked (this is an index lookup
+    if the user profile store has an index for them, see MoinMoin.userstore).
     """
-    for uid in getUserList(request):
+    uids = None
+    for attr, value in list(attrs.items()):
+        found = request.cfg.cache.user_store.find(attr, value)
+        uids = found if uids is None else [uid for uid in uids if uid in found]
+    if uids is None:
+        uids = getUserList(request)
+    for uid in uids:
         theuser = User(request, uid)
         if filter_func(theuser):
             return theuser
@@ -99,63 +105,93 @@ def _getUserIdByKey(request, key, search, case=True):
     if not case:
         cfg_cache_attr += "_lower"
         search = search.lower()
-    cfg = request.cfg
-    try:
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = False
-    except AttributeError:
+    users = request.cfg.cache.users
+    if not users.get(None, 'loaded'):
         # no in-memory cache there - initialize it / load it from disk
         loadLookupCaches(request)
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = True  # we just loaded the stuff from disk
-    uid = attr2id.get(search, None)
-    if uid is None and not from_disk:
-        # we do not have the entry we searched for.
-        # we didn't find it in some in-memory cache, try refreshing these from disk
+    uid = users.get(cfg_cache_attr, search)
+    if uid is not None:
+        return uid
+
+    if lookupCacheChanged(request):
+        # the on-disk cache was updated, e.g. by another process saving
+        # a profile - reloading it also forgets the remembered misses
         loadLookupCaches(request)
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = True  # we just loaded the stuff from disk
-        uid = attr2id.get(search, None)
-    if uid is None:
-        # we do not have the entry we searched for.
-        # we don't have it in the on-disk cache, cache MISS.
-        # could be because:
-        # a) ok: we have no such search value in the profiles
-        # b) fault: the cache is incoherent with the profiles
-        # c) fault: reading the cache from disk failed, due to an error
-        # d) ok: same as c), but just because no ondisk cache has been built yet
+        uid = users.get(cfg_cache_attr, search)
+        if uid is not None:
+            return uid
+
+    # we do not have the entry we searched for. As this happens for every
+    # login attempt with a wrong name (e.g. from bots), this must be cheap:
+    # we remember misses for a while (until the on-disk cache changes).
+    now = time.time()
+    miss_key = (cfg_cache_attr, search)
+    expires = users.get('misses', miss_key)
+    if expires is not None and expires > now:
+        return None
+    # we don't have it in the on-disk cache, cache MISS.
+    # could be because:
+    # a) ok: we have no such search value in the profiles
+    # b) fault: the cache is incoherent with the profiles
+    # c) fault: reading the cache from disk failed, due to an error
+    # d) ok: same as c), but just because no ondisk cache has been built yet
+    # We rebuild for b) - d), but not more often than once per
+    # user_lookup_rebuild_interval, because it reads all profiles.
+    last_rebuild = users.get(None, 'rebuilt')
+    if last_rebuild is None or last_rebuild + request.cfg.user_lookup_rebuild_interval <= now:
         rebuildLookupCaches(request)  # XXX expensive
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        uid = attr2id.get(search, None)
+        users.put(None, 'rebuilt', now)
+        uid = users.get(cfg_cache_attr, search)
+    if uid is None:
+        misses = users.get(None, 'misses') or 0
+        if misses >= MAX_LOOKUP_MISSES:
+            users.delete('misses')
+            misses = 0
+        users.put(None, 'misses', misses + 1)
+        users.put('misses', miss_key, now + request.cfg.user_lookup_negative_ttl)
     return uid
 
 
+def lookupCacheChanged(request):
+    """ Did the on-disk lookup cache change since we loaded it into memory? """
+    scope, arena, key = 'userdir', 'users', 'lookup'
+    diskcache = caching.CacheEntry(request, arena, key, scope=scope)
+    return diskcache.uid() != request.cfg.cache.users.get(None, 'uid')
+
+
 def setMemoryLookupCaches(request, cache):
     """set the in-memory cache from the given cache contents
 
+    The in-memory cache is the cfg.cache.users store, it has a dict
+    XXX2id and XXX2id_lower for every attribute in CACHED_USER_ATTRS.
+
     @param request: the request object
     @param cache: either a dict of attrname -> attrcache to set the in-memory cache,
                   or None to delete the in-memory cache.
     """
-    for attrname in CACHED_USER_ATTRS:
-        if cache is None:
-            try:
-                delattr(request.cfg.cache, attrname + "2id")
-            except:
-                pass
-            try:
-                delattr(request.cfg.cache, attrname + "2id_lower")
-            except:
-                pass
-        else:
-            setattr(request.cfg.cache, attrname + "2id", cache[attrname])
-            setattr(request.cfg.cache, attrname + "2id_lower", cache[attrname + "_lower"])
+    users = request.cfg.cache.users
+    if cache is None:
+        users.clear()
+    else:
+        for attrname in CACHED_USER_ATTRS:
+            users.put_all(attrname + "2id", cache[attrname])
+            users.put_all(attrname + "2id_lower", cache[attrname + "_lower"])
+        forgetLookupMisses(request)
+        users.put(None, 'loaded', True)
+
+
+def forgetLookupMisses(request):
+    """ forget the remembered lookup misses (see _getUserIdByKey) """
+    users = request.cfg.cache.users
+    users.delete('misses')
+    users.put(None, 'misses', 0)
 
 
 def loadLookupCaches(request):
-    """load lookup cache contents into memory: cfg.cache.XXX2id"""
+    """load lookup cache contents into memory: cfg.cache.users"""
     scope, arena, cachekey = 'userdir', 'users', 'lookup'
     diskcache = caching.CacheEntry(request, arena, cachekey, scope=scope, use_pickle=True)
+    uid = diskcache.uid()
     try:
         cache = diskcache.content()
     except caching.CacheError:
@@ -164,6 +200,7 @@ def loadLookupCaches(request):
             cache[attrname] = {}
     cache_with_lowercase = addLowerCaseKeys(cache)
     setMemoryLookupCaches(request, cache_with_lowercase)
+    request.cfg.cache.users.put(None, 'uid', uid)
 
 
 def rebuildLookupCaches(request):
@@ -178,13 +215,13 @@ def rebuildLookupCaches(request):
     cache = {}
     for attrname in CACHED_USER_ATTRS:
         cache[attrname] = {}
-    for userid in getUserList(request):
-        u = User(request, id=userid)
-        if u.valid:
+    profiles = request.cfg.cache.user_store.values(CACHED_USER_ATTRS + ['disabled'])
+    for userid, values in list(profiles.items()):
+        if not int(values.get('disabled') or 0):
             for attrname in CACHED_USER_ATTRS:
-                if hasattr(u, attrname):
+                if attrname in values:
                     attr2id = cache[attrname]
-                    value = getattr(u, attrname)
+                    value = values[attrname]
                     if isinstance(value, list):
                         for val in value:
                             attr2id[val] = userid
@@ -195,6 +232,7 @@ def rebuildLookupCaches(request):
     setMemoryLookupCaches(request, cache_with_lowercase)
     diskcache.update(cache)
     diskcache.unlock()
+    request.cfg.cache.users.put(None, 'uid', diskcache.uid())
     return cache
 
 
@@ -564,25 +602,20 @@ class User:
         if not self.valid and not self.disabled or changed:  # do we need to save/update?
             self.save()  # yes, create/update user profile
 
-    def __filename(self):
-        """ Get filename of the user's file on disk
-
-        @rtype: string
-        @return: full path and filename of user account file
-        """
-        return os.path.join(self._cfg.user_dir, self.id or "...NONE...")
-
     def exists(self):
         """ Do we have a user account for this user?
 
         @rtype: bool
         @return: true, if we have a user account
         """
-        return os.path.exists(self.__filename())
+        return self._cfg.cache.user_store.exists(self.id)
 
     def remove(self):
         """ Remove user profile from disk """
-        os.remove(self.__filename())
+        self._cfg.cache.user_store.remove(self.id)
+        self.valid = 0
+        self.updateLookupCaches()
+        self.updatePageSubCache()
 
     def load_from_id(self, password=None):
         """ Load user account data from disk.
@@ -595,33 +628,14 @@ class User:
         @param password: If not None, then the given password must match the
                          password in the user account file.
         """
-        if not self.exists():
+        data = self._cfg.cache.user_store.load(self.id)
+        if data is None:
             return
 
-        data = codecs.open(self.__filename(), "r", config.charset).readlines()
         user_data = {'enc_password': ''}
-        for line in data:
-            if line[0] == '#':
-                continue
-
-            try:
-                key, val = line.strip().split('=', 1)
-                if key not in self._cfg.user_transient_fields and key[0] != '_':
-                    # Decode list values
-                    if key.endswith('[]'):
-                        key = key[:-2]
-                        val = decodeList(val)
-                    # Decode dict values
-                    elif key.endswith('{}'):
-                        key = key[:-2]
-                        val = decodeDict(val)
-                    # for compatibility reading old files, keep these explicit
-                    # we will store them with [] appended
-                    elif key in ['quicklinks', 'subscribed_pages', 'subscribed_events']:
-                        val = decodeList(val)
-                    user_data[key] = val
-            except ValueError:
-                pass
+        for key, val in list(data.items()):
+            if key not in self._cfg.user_transient_fields and key[0] != '_':
+                user_data[key] = val
 
         # Validate data from user file. In case we need to change some
         # values, we set 'changed' flag, and later save the user data.
@@ -773,7 +787,7 @@ class User:
                 if key not in self._cfg.user_transient_fields and key[0] != '_']
 
     def save(self):
-        """ Save user account data to user account file on disk.
+        """ Save user account data to the user profile store.
 
         This saves all member variables, except "id" and "valid" and
         those starting with an underscore.
@@ -781,34 +795,8 @@ class User:
         if not self.id:
             return
 
-        user_dir = self._cfg.user_dir
-        if not os.path.exists(user_dir):
-            os.makedirs(user_dir)
-
         self.last_saved = str(time.time())
-
-        # !!! should write to a temp file here to avoid race conditions,
-        # or even better, use locking
-
-        data = codecs.open(self.__filename(), "w", config.charset)
-        data.write("# Data saved '%s' for id '%s'\n" % (
-            time.strftime(self._cfg.datetime_fmt, time.localtime(time.time())),
-            self.id))
-        attrs = self.persistent_items()
-        attrs.sort()
-        for key, value in attrs:
-            # Encode list values
-            if isinstance(value, list):
-                key += '[]'
-                value = encodeList(value)
-            # Encode dict values
-            elif isinstance(value, dict):
-                key += '{}'
-                value = encodeDict(value)
-            line = u"%s=%s" % (key, str(value))
-            line = line.replace('\n', ' ').replace('\r', ' ')  # no lineseps
-            data.write(line + '\n')
-        data.close()
+        self._cfg.cache.user_store.save(self.id, dict(self.persistent_items()))
 
         if not self.disabled:
             self.valid = 1
@@ -1006,41 +994,31 @@ class User:
         return not self.isSubscribedTo([pagename])
 
     def updatePageSubCache(self):
-        """ When a user profile is saved, we update the page subscriber's cache """
-
-        scope, arena, key = 'userdir', 'users', 'pagesubscriptions'
-
-        cache = caching.CacheEntry(self._request, arena=arena, key=key, scope=scope, use_pickle=True, do_locking=False)
-        if not cache.exists():
-            return  # if no cache file exists, just don't do anything
-
-        cache.lock('w')
-        page_sub = cache.content()
-
+        """ When a user profile is saved or removed, we update the page subscription index """
         # we only store entries for valid users with some page subscriptions
-        if self.valid and self.subscribed_pages:
-            page_sub[self.id] = {
-                'name': self.name,
-                'email': self.email,
-                'subscribed_pages': self.subscribed_pages,
-            }
-        elif page_sub.get(self.id):
-            del page_sub[self.id]
-
-        cache.update(page_sub)
-        cache.unlock()
+        subscribed_pages = self.valid and self.subscribed_pages or []
+        subscriptions.update_user(self._request, self.id, self.email, subscribed_pages)
 
     def updateLookupCaches(self):
-        """ When a user profile is saved, we update the userid lookup caches """
+        """ When a user profile is saved or removed, we update the userid lookup caches
+
+        Only the entries of this user are changed, in the on-disk cache as
+        well as in the in-memory cache.
+        """
 
         scope, arena, key = 'userdir', 'users', 'lookup'
+        request = self._request
+        users = request.cfg.cache.users
+        # a new name / email / ... could be one we remembered as a miss
+        forgetLookupMisses(request)
 
-        diskcache = caching.CacheEntry(self._request, arena=arena, key=key, scope=scope, use_pickle=True,
+        diskcache = caching.CacheEntry(request, arena=arena, key=key, scope=scope, use_pickle=True,
                                        do_locking=False)
         if not diskcache.exists():
             return  # if no cache file exists, just don't do anything
 
         diskcache.lock('w')
+        uptodate = not lookupCacheChanged(request)
         cache = diskcache.content()
         userid = self.id
 
@@ -1050,6 +1028,10 @@ class User:
             for key, value in list(attr2id.items()):
                 if value == userid:
                     del attr2id[key]
+                    if uptodate:
+                        users.put(attrname + "2id", key, None)
+                        if users.get(attrname + "2id_lower", key.lower()) == userid:
+                            users.put(attrname + "2id_lower", key.lower(), None)
 
         # then, if user is valid, update with the current attr values:
         if self.valid:
@@ -1059,16 +1041,21 @@ class User:
                     if value:
                         # we do not store empty values, likely not unique
                         attr2id = cache[attrname]
-                        if isinstance(value, list):
-                            for val in value:
-                                attr2id[val] = userid
-                        else:
-                            attr2id[value] = userid
-
-        cache_with_lowercase = addLowerCaseKeys(cache)
-        setMemoryLookupCaches(self._request, cache_with_lowercase)
+                        if not isinstance(value, list):
+                            value = [value]
+                        for val in value:
+                            attr2id[val] = userid
+                            if uptodate:
+                                users.put(attrname + "2id", val, userid)
+                                users.put(attrname + "2id_lower", val.lower(), userid)
+
         diskcache.update(cache)
         diskcache.unlock()
+        if uptodate:
+            # our in-memory cache has the same changes as the on-disk cache
+            users.put(None, 'uid', diskcache.uid())
+        else:
+            loadLookupCaches(request)
 
     # -----------------------------------------------------------------
     # Quicklinks
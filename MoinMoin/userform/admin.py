@@ -39,12 +39,13 @@ def do_user_browser(request):
             return "<UserAccount %r>" % self.__dict__
 
     accounts = []
-    for uid in user.getUserList(request):
+    profiles = request.cfg.cache.user_store.values(['name', 'email', 'jid', 'disabled'])
+    for uid, values in list(profiles.items()):
         # be careful and just create a list of what we really need,
         # not sure if we can keep lots of User objects instantiated
         # in parallel (open files? too big?)
-        u = user.User(request, uid)
-        accounts.append(UserAccount(name=u.name, email=u.email, jid=u.jid, disabled=u.disabled))
+        accounts.append(UserAccount(name=values.get('name', u''), email=values.get('email', u''),
+                                    jid=values.get('jid', u''), disabled=int(values.get('disabled') or 0)))
 
     def sortkey(account):
         # enabled accounts at top, sorted by name
@@ -77,12 +77,11 @@ space between words. Group page name is not allowed.""", wiki=True) % wikiutil.e
 
     def _user_select(self):
         options = []
-        users = user.getUserList(self.request)
+        profiles = self.request.cfg.cache.user_store.values(['name'])
         current_uid = self.request.user.id
-        for uid in users:
+        for uid, values in list(profiles.items()):
             if uid != current_uid:
-                name = user.User(self.request, id=uid).name
-                options.append((uid, name))
+                options.append((uid, values.get('name', u'')))
         options.sort(key=lambda y: y[1].lower())
 
         if not options:
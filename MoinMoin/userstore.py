@@ -0,0 +1,328 @@
+"""
+    MoinMoin - user profile storage
+
+    User.load_from_id, User.save and User.remove don't access the user
+    profiles directly, but through the store selected by the user_storage
+    configuration setting (the store is kept in cfg.cache.user_store):
+
+    FileStore - one text file per profile in user_dir (default, this is the
+                traditional format, see encode_profile).
+    SQLiteStore - all profiles in one SQLite database (user_dir/profiles.db).
+                  It also keeps an index of the INDEXED_ATTRS values of
+                  all profiles, so find() and values() (for these
+                  attributes) don't need to read all profiles.
+
+    Use e.g.:
+
+        from MoinMoin import userstore
+        user_storage = userstore.sqlite_store
+
+    and run "moin account convert --to=sqlite" to move the existing profiles
+    into the database.
+
+    A store gives and takes profiles as dicts {key: value}, values are
+    unicode strings or (for some keys) lists or dicts of unicode strings,
+    like they are stored in the profile files. Converting them to the
+    attributes of a User object is done by the User class.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import codecs
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from MoinMoin import config
+from MoinMoin import log
+from MoinMoin.user import encodeList, decodeList, encodeDict, decodeDict
+
+logging = log.getLogger(__name__)
+
+# attributes the SQLiteStore keeps an index for: name -> list valued?
+INDEXED_ATTRS = {
+    'name': False,
+    'email': False,
+    'jid': False,
+    'openids': True,
+    'subscribed_pages': True,
+    'language': False,
+    'disabled': False,
+}
+
+# keys that are decoded as lists, even without [] (old profile files)
+OLD_LIST_KEYS = ['quicklinks', 'subscribed_pages', 'subscribed_events']
+
+USER_ID_RE = re.compile(r'^\d+\.\d+(\.\d+)?$')
+
+
+def decode_profile(lines):
+    """ Decode the lines of a profile file
+
+    @param lines: list of unicode lines
+    @rtype: dict
+    @return: profile {key: value}
+    """
+    data = {}
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        try:
+            key, val = line.strip().split('=', 1)
+        except ValueError:
+            continue
+        if key.endswith('[]'):
+            key = key[:-2]
+            val = decodeList(val)
+        elif key.endswith('{}'):
+            key = key[:-2]
+            val = decodeDict(val)
+        elif key in OLD_LIST_KEYS:
+            # for compatibility reading old files, keep these explicit
+            # we will store them with [] appended
+            val = decodeList(val)
+        data[key] = val
+    return data
+
+
+def encode_profile(items, header=None):
+    """ Encode a profile to the profile file format
+
+    @param items: profile {key: value}
+    @param header: comment for the first line
+    @rtype: unicode
+    @return: profile text
+    """
+    lines = []
+    if header:
+        lines.append(u"# %s\n" % header)
+    for key, value in sorted(items.items()):
+        # Encode list values
+        if isinstance(value, list):
+            key += '[]'
+            value = encodeList(value)
+        # Encode dict values
+        elif isinstance(value, dict):
+            key += '{}'
+            value = encodeDict(value)
+        line = u"%s=%s" % (key, str(value))
+        line = line.replace('\n', ' ').replace('\r', ' ')  # no lineseps
+        lines.append(line + '\n')
+    return u''.join(lines)
+
+
+def _matches(value, search, case):
+    if isinstance(value, list):
+        return any(_matches(val, search, case) for val in value)
+    if not case:
+        return value.lower() == search.lower()
+    return value == search
+
+
+class ProfileStore:
+    """ Base class of the profile stores """
+
+    def uids(self):
+        """ Return a list of all user ids """
+        raise NotImplementedError
+
+    def exists(self, uid):
+        """ Return True if there is a profile for user id uid """
+        raise NotImplementedError
+
+    def load(self, uid):
+        """ Return the profile of user id uid or None """
+        raise NotImplementedError
+
+    def save(self, uid, items):
+        """ Store profile items for user id uid """
+        raise NotImplementedError
+
+    def remove(self, uid):
+        """ Remove the profile of user id uid """
+        raise NotImplementedError
+
+    def find(self, attr, search, case=True):
+        """ Return the ids of the users whose profile value attr is (or,
+            for list values, contains) search.
+
+        @param attr: profile key, e.g. 'email'
+        @param search: value to search for
+        @param case: if False, compare case insensitively
+        @rtype: list
+        """
+        return [uid for uid, values in list(self.values([attr]).items())
+                if attr in values and _matches(values[attr], search, case)]
+
+    def values(self, attrs):
+        """ Return some values of all profiles
+
+        @param attrs: list of profile keys
+        @rtype: dict
+        @return: {uid: {attr: value}}, missing values are not included
+        """
+        result = {}
+        for uid in self.uids():
+            data = self.load(uid)
+            if data is not None:
+                result[uid] = dict([(attr, data[attr]) for attr in attrs if attr in data])
+        return result
+
+
+class FileStore(ProfileStore):
+    """ One profile file per user in user_dir """
+
+    def __init__(self, user_dir, datetime_fmt='%Y-%m-%d %H:%M:%S'):
+        self.user_dir = user_dir
+        self.datetime_fmt = datetime_fmt
+
+    def _filename(self, uid):
+        return os.path.join(self.user_dir, uid or "...NONE...")
+
+    def uids(self):
+        try:
+            files = os.listdir(self.user_dir)
+        except OSError:
+            return []
+        return [f for f in files if USER_ID_RE.match(f)]
+
+    def exists(self, uid):
+        return os.path.exists(self._filename(uid))
+
+    def load(self, uid):
+        try:
+            f = codecs.open(self._filename(uid), "r", config.charset)
+        except IOError:
+            return None
+        try:
+            return decode_profile(f.readlines())
+        finally:
+            f.close()
+
+    def save(self, uid, items):
+        if not os.path.exists(self.user_dir):
+            os.makedirs(self.user_dir)
+        # !!! should write to a temp file here to avoid race conditions,
+        # or even better, use locking
+        header = "Data saved '%s' for id '%s'" % (
+            time.strftime(self.datetime_fmt, time.localtime(time.time())), uid)
+        f = codecs.open(self._filename(uid), "w", config.charset)
+        try:
+            f.write(encode_profile(items, header))
+        finally:
+            f.close()
+
+    def remove(self, uid):
+        os.remove(self._filename(uid))
+
+
+class SQLiteStore(ProfileStore):
+    """ All profiles in one SQLite database, with an index of INDEXED_ATTRS
+
+        profiles - uid, data (profile in the profile file format)
+        attrs - uid, attr, value, lvalue (lower case value), one row for
+                every INDEXED_ATTRS value (and list item) of a profile
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._local = threading.local()
+
+    def _connect(self):
+        """ Return the connection of this thread (and process) """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            dirname = os.path.dirname(self.filename)
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+            conn = sqlite3.connect(self.filename, timeout=30.0)
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS profiles "
+                             "(uid TEXT PRIMARY KEY, data TEXT NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS attrs "
+                             "(uid TEXT NOT NULL, attr TEXT NOT NULL, value TEXT NOT NULL, lvalue TEXT NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS attrs_lvalue ON attrs (attr, lvalue)")
+                conn.execute("CREATE INDEX IF NOT EXISTS attrs_uid ON attrs (uid)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def uids(self):
+        return [row[0] for row in self._connect().execute("SELECT uid FROM profiles")]
+
+    def exists(self, uid):
+        row = self._connect().execute("SELECT 1 FROM profiles WHERE uid = ?", (uid, )).fetchone()
+        return row is not None
+
+    def load(self, uid):
+        row = self._connect().execute("SELECT data FROM profiles WHERE uid = ?", (uid, )).fetchone()
+        if row is None:
+            return None
+        return decode_profile(row[0].splitlines())
+
+    def save(self, uid, items):
+        rows = []
+        for attr in INDEXED_ATTRS:
+            value = items.get(attr)
+            if not isinstance(value, list):
+                value = [value]
+            for val in value:
+                if val is not None and str(val) != '':
+                    val = str(val)
+                    rows.append((uid, attr, val, val.lower()))
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO profiles (uid, data) VALUES (?, ?)",
+                         (uid, encode_profile(items)))
+            conn.execute("DELETE FROM attrs WHERE uid = ?", (uid, ))
+            conn.executemany("INSERT INTO attrs (uid, attr, value, lvalue) VALUES (?, ?, ?, ?)", rows)
+
+    def remove(self, uid):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM profiles WHERE uid = ?", (uid, ))
+            conn.execute("DELETE FROM attrs WHERE uid = ?", (uid, ))
+
+    def find(self, attr, search, case=True):
+        if attr not in INDEXED_ATTRS:
+            return ProfileStore.find(self, attr, search, case)
+        rows = self._connect().execute("SELECT uid, value FROM attrs WHERE attr = ? AND lvalue = ?",
+                                       (attr, search.lower()))
+        uids = []
+        for uid, value in rows:
+            if (not case or value == search) and uid not in uids:
+                uids.append(uid)
+        return uids
+
+    def values(self, attrs):
+        if [attr for attr in attrs if attr not in INDEXED_ATTRS]:
+            return ProfileStore.values(self, attrs)
+        result = dict([(uid, {}) for uid in self.uids()])
+        if not attrs:
+            return result
+        query = "SELECT uid, attr, value FROM attrs WHERE attr IN (%s) ORDER BY rowid" % ', '.join(['?'] * len(attrs))
+        for uid, attr, value in self._connect().execute(query, list(attrs)):
+            values = result.setdefault(uid, {})
+            if INDEXED_ATTRS[attr]:
+                values.setdefault(attr, []).append(value)
+            else:
+                values[attr] = value
+        for values in list(result.values()):
+            # profiles with empty lists have no rows for them
+            for attr in attrs:
+                if INDEXED_ATTRS[attr]:
+                    values.setdefault(attr, [])
+        return result
+
+
+def file_store(cfg):
+    """ user_storage setting for the FileStore (default) """
+    return FileStore(cfg.user_dir, cfg.datetime_fmt)
+
+
+def sqlite_store(cfg):
+    """ user_storage setting for the SQLiteStore """
+    return SQLiteStore(os.path.join(cfg.user_dir, 'profiles.db'))
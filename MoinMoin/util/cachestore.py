@@ -0,0 +1,305 @@
+"""
+    MoinMoin - stores for the in-memory caches in cfg.cache
+
+    The page meta data and page list caches (see Page.ItemCache) and the
+    user lookup caches (see user.py) keep their data in a store. A store is
+    a two-level mapping: name -> key -> value (for the ItemCaches, name is
+    a page name).
+
+    MemoryStore - a dict in the current process (default). Every worker
+                  process has its own copy and has to warm it up itself.
+    SocketStore - a client for a CacheServer listening on a local socket.
+                  All worker processes using the same server share one copy
+                  of the cached data (and also the edit-log position that
+                  tells which cached data is still valid).
+
+    Use the cache_store configuration setting to select the store, e.g.:
+
+        from MoinMoin.util import cachestore
+        cache_store = cachestore.socket_store('/var/run/moin/cache.sock')
+
+    and start the server with "moin server cache --socket=...".
+
+    Values are pickled by the client, the server only keeps the pickles.
+    Use get_many / put_many to get / put many values with a single round
+    trip to the server, compare_and_put to update values only if no other
+    process changed them since they were read.
+
+    As the values are pickles, everybody who can talk to the server could
+    run code in the wiki processes (and the other way round). Thus client
+    and server authenticate each other with a shared secret: if no authkey
+    is given, the server writes a random one to the file <socket path>.key
+    (readable by its owner only) and the clients read it from there. The
+    socket itself is also only accessible by the owner of the server.
+    If the server can't be reached, a SocketStore behaves like an empty
+    cache (it logs a warning), so the wiki keeps working, just slower.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from MoinMoin import log
+from MoinMoin.util import pickle, PICKLE_PROTOCOL
+
+logging = log.getLogger(__name__)
+
+
+class MemoryStore:
+    """ Per-process store, values are kept as they are (not copied) """
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, name, key):
+        """ Return the value stored for name / key or None """
+        try:
+            return self._data[name][key]
+        except KeyError:
+            return None
+
+    def put(self, name, key, value):
+        """ Store value for name / key """
+        self._data.setdefault(name, {})[key] = value
+
+    def get_many(self, names_keys):
+        """ Return the list of the values stored for the (name, key) pairs
+            in list names_keys (None for the missing ones)
+        """
+        data = self._data
+        return [data.get(name, {}).get(key) for name, key in names_keys]
+
+    def put_many(self, items):
+        """ Store the values of the (name, key, value) tuples in list items """
+        data = self._data
+        for name, key, value in items:
+            data.setdefault(name, {})[key] = value
+
+    def compare_and_put(self, name, key, expected, items):
+        """ Store the values of the (name, key, value) tuples in list items
+            if the value stored for name / key is still expected
+
+        @rtype: bool
+        @return: whether the values were stored
+        """
+        if self.get(name, key) != expected:
+            return False
+        self.put_many(items)
+        return True
+
+    def get_all(self, name):
+        """ Return dict {key: value} for name or None """
+        return self._data.get(name)
+
+    def put_all(self, name, values):
+        """ Replace everything stored for name by dict values """
+        self._data[name] = values
+
+    def delete(self, name):
+        """ Remove everything stored for name """
+        self._data.pop(name, None)
+
+    def names(self):
+        """ Return a list of the names we have data for """
+        return list(self._data.keys())
+
+    def clear(self):
+        """ Remove everything """
+        self._data = {}
+
+
+class SocketStore:
+    """ Store kept by a CacheServer, see module docstring """
+
+    def __init__(self, address, namespace, authkey=None):
+        """
+        @param address: path of the unix socket the CacheServer listens on
+        @param namespace: keeps the data of different caches (and wikis) apart
+        @param authkey: shared secret (bytes) or None (read the one the
+                        server wrote, see read_authkey)
+        """
+        self.address = address
+        self.namespace = namespace
+        self.authkey = authkey
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            # never use a connection inherited from our parent process
+            authkey = self.authkey or read_authkey(self.address)
+            self._conn = Client(self.address, authkey=authkey)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _call(self, *args):
+        with self._lock:
+            for retry in (True, False):
+                try:
+                    conn = self._connect()
+                    conn.send((args[0], self.namespace) + args[1:])
+                    return conn.recv()
+                except (OSError, EOFError, AuthenticationError) as err:
+                    self._conn = None
+                    if not retry:
+                        logging.warning("cache server %r not usable: %s" % (self.address, err))
+                        return None
+
+    def get(self, name, key):
+        data = self._call('get', name, key)
+        if data is not None:
+            return pickle.loads(data)
+
+    def put(self, name, key, value):
+        self._call('put', name, key, pickle.dumps(value, PICKLE_PROTOCOL))
+
+    def get_many(self, names_keys):
+        data = self._call('get_many', list(names_keys))
+        if data is None:
+            return [None] * len(names_keys)
+        return [None if value is None else pickle.loads(value) for value in data]
+
+    def put_many(self, items):
+        data = [(name, key, pickle.dumps(value, PICKLE_PROTOCOL)) for name, key, value in items]
+        self._call('put_many', data)
+
+    def compare_and_put(self, name, key, expected, items):
+        data = [(name_, key_, pickle.dumps(value, PICKLE_PROTOCOL)) for name_, key_, value in items]
+        return bool(self._call('compare_and_put', name, key, pickle.dumps(expected, PICKLE_PROTOCOL), data))
+
+    def get_all(self, name):
+        data = self._call('get_all', name)
+        if data is not None:
+            return dict((key, pickle.loads(value)) for key, value in data.items())
+
+    def put_all(self, name, values):
+        data = dict((key, pickle.dumps(value, PICKLE_PROTOCOL)) for key, value in values.items())
+        self._call('put_all', name, data)
+
+    def delete(self, name):
+        self._call('delete', name)
+
+    def names(self):
+        return self._call('names') or []
+
+    def clear(self):
+        self._call('clear')
+
+
+def authkey_filename(address):
+    """ Return the name of the file with the authkey of the server at address """
+    return address + '.key'
+
+
+def read_authkey(address):
+    """ Return the authkey the server at address wrote (raises OSError if there is none) """
+    with open(authkey_filename(address), 'rb') as f:
+        return f.read().strip()
+
+
+def write_authkey(address):
+    """ Write a new random authkey for the server at address, return it """
+    filename = authkey_filename(address)
+    if os.path.exists(filename):
+        os.remove(filename)
+    authkey = os.urandom(32).hex().encode('ascii')
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+
+def memory_store(cfg, name):
+    """ cache_store function creating a per-process store (default) """
+    return MemoryStore()
+
+
+def socket_store(address, authkey=None):
+    """ Return a cache_store function creating SocketStores
+
+    @param address: path of the unix socket the CacheServer listens on
+    @param authkey: shared secret (bytes) or None (use the one the server
+                    wrote to <address>.key)
+    """
+    def cache_store(cfg, name):
+        return SocketStore(address, '%s:%s' % (cfg.siteid, name), authkey)
+    return cache_store
+
+
+class CacheServer:
+    """ Keeps the data of SocketStores, one thread per client connection """
+
+    def __init__(self, address, authkey=None):
+        """
+        @param address: path of the unix socket to listen on
+        @param authkey: shared secret (bytes) or None (write a random one
+                        to <address>.key when the server starts)
+        """
+        self.address = address
+        self.authkey = authkey
+        self._data = {}  # namespace -> MemoryStore (with pickled values)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def handle(self, op, namespace, *args):
+        """ Execute a single store operation, returns its result """
+        with self._lock:
+            store = self._data.get(namespace)
+            if store is None:
+                store = self._data[namespace] = MemoryStore()
+            result = getattr(store, op)(*args)
+            if op == 'get_all' and result is not None:
+                result = dict(result)
+            return result
+
+    def _serve_client(self, conn):
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+                op = request[0]
+                if op not in ('get', 'put', 'get_many', 'put_many', 'compare_and_put',
+                              'get_all', 'put_all', 'delete', 'names', 'clear', ):
+                    logging.warning("cache server: invalid operation %r" % (op, ))
+                    break
+                conn.send(self.handle(*request))
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        """ Accept clients until close() is called """
+        if self.authkey is None:
+            self.authkey = write_authkey(self.address)
+        # only the owner of the server may connect to the socket
+        umask = os.umask(0o077)
+        try:
+            self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        logging.info("cache server listening on %r" % self.address)
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except (OSError, AuthenticationError):
+                    if self._listener is None:
+                        break  # closed
+                    logging.exception("cache server: accept failed")
+                    continue
+                thread = threading.Thread(target=self._serve_client, args=(conn, ))
+                thread.daemon = True
+                thread.start()
+        finally:
+            self.close()
+
+    def close(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
@@ -0,0 +1,188 @@
+"""
+    MoinMoin - search a text for many regular expressions at once
+
+    Searching a text with thousands of regular expressions (like the
+    antispam BadContent patterns) one after the other takes time
+    proportional to the number of patterns. MultiMatcher extracts a literal
+    from every pattern that every match has to contain (e.g. "casino" from
+    r"online-?casino\\.example"), and scans the text for all these literals
+    in one pass, using a regular expression built from a trie of the
+    literals. Only the patterns whose literal was found (and the few
+    patterns without such a literal) are searched with their full regular
+    expression.
+
+    The literals are searched case insensitively, so this works for case
+    sensitive patterns as well as for patterns searched with re.I.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# shorter literals are not selective enough to be worth it
+MIN_LITERAL = 3
+
+# non-ASCII characters that re.I matches to ASCII letters
+_IGNORECASE_ASCII = {
+    0x130: u'i',  # LATIN CAPITAL LETTER I WITH DOT ABOVE
+    0x131: u'i',  # LATIN SMALL LETTER DOTLESS I
+    0x17f: u's',  # LATIN SMALL LETTER LONG S
+    0x212a: u'k',  # KELVIN SIGN
+}
+
+# maps text to the form the literals are searched in
+_FOLD = dict([(ord(c), c.lower()) for c in u'ABCDEFGHIJKLMNOPQRSTUVWXYZ'])
+_FOLD.update(_IGNORECASE_ASCII)
+
+
+def fold(text):
+    """ Return text as it is searched for the literals (ASCII lower case) """
+    return text.translate(_FOLD)
+
+
+def required_literal(pattern, flags=re.I):
+    """ Return the longest string (ASCII, lower case) that every match of
+        pattern (compiled with flags) contains or None if there is no such
+        string of at least MIN_LITERAL characters.
+
+        Only the top level sequence of the pattern is looked at: e.g. for
+        "a(b|c)d" there is no required literal, for "abc(d|e)" it is "abc".
+
+    @raise re.error: if pattern is invalid
+    """
+    best = u''
+    run = []
+    for op, av in list(sre_parse.parse(pattern, flags)) + [(None, None)]:
+        if op is sre_parse.LITERAL and av < 128:
+            run.append(chr(av).lower())
+        else:
+            if len(run) > len(best):
+                best = u''.join(run)
+            run = []
+    if len(best) < MIN_LITERAL:
+        return None
+    return best
+
+
+def trie_regex(literals):
+    """ Return a regular expression (string) matching any of literals,
+        built as a trie. Where several literals match at the same
+        position, the longest one matches.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = None  # end of a literal
+
+    def build(node):
+        alternatives = [re.escape(char) + build(node[char]) for char in sorted(node) if char]
+        if not alternatives:
+            return u''
+        if len(alternatives) == 1:
+            result = alternatives[0]
+            if '' in node:
+                result = u'(?:%s)?' % result
+        else:
+            result = u'(?:%s)' % u'|'.join(alternatives)
+            if '' in node:
+                result += u'?'
+        return result
+
+    return build(trie)
+
+
+class MultiMatcher:
+    """ Search a text for a list of regular expressions, see module docstring
+
+        The patterns are compiled when they are needed first. Invalid
+        patterns are ignored, they are listed in self.errors.
+    """
+
+    def __init__(self, patterns, flags=re.I):
+        """
+        @param patterns: list of regular expressions (unicode)
+        @param flags: flags for compiling the patterns
+        """
+        self.flags = flags
+        self.patterns = []  # [(pattern, literal or None)]
+        self.errors = []  # [(pattern, error message)]
+        for pattern in patterns:
+            try:
+                literal = required_literal(pattern, flags)
+            except (re.error, RecursionError) as err:
+                self.errors.append((pattern, str(err)))
+                continue
+            self.patterns.append((pattern, literal))
+        self._setup()
+
+    def _setup(self):
+        self._compiled = {}
+        literals = set([literal for pattern, literal in self.patterns if literal])
+        self._trie = {}
+        for literal in literals:
+            node = self._trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[''] = literal
+        if literals:
+            self._scanner = re.compile(u'(?=(%s))' % trie_regex(literals))
+        else:
+            self._scanner = None
+
+    def __getstate__(self):
+        # only keep what is expensive to compute, see _setup
+        return {'patterns': self.patterns, 'errors': self.errors, 'flags': self.flags}
+
+    def __setstate__(self, state):
+        self.flags = re.I
+        self.__dict__.update(state)
+        self._setup()
+
+    def _compile(self, pattern):
+        regex = self._compiled.get(pattern)
+        if regex is None:
+            regex = self._compiled[pattern] = re.compile(pattern, self.flags)
+        return regex
+
+    def found_literals(self, text):
+        """ Return the set of literals that text contains """
+        found = set()
+        if self._scanner is None:
+            return found
+        longest = set([m.group(1) for m in self._scanner.finditer(fold(text))])
+        # the scanner gives the longest literal starting at every position,
+        # literals which are prefixes of them start there, too
+        for literal in longest:
+            node = self._trie
+            for char in literal:
+                node = node[char]
+                if '' in node:
+                    found.add(node[''])
+        return found
+
+    def matches(self, text):
+        """ Yield (pattern, match) for all patterns (in the order of the
+            list) that match text.
+        """
+        found = self.found_literals(text)
+        for pattern, literal in self.patterns:
+            if literal is None or literal in found:
+                match = self._compile(pattern).search(text)
+                if match:
+                    yield pattern, match
+
+    def search(self, text):
+        """ Return the match of the first pattern (in the order of the list)
+            that matches text or None.
+        """
+        for pattern, match in self.matches(text):
+            return match
+        return None
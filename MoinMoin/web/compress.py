@@ -0,0 +1,64 @@
+"""
+    MoinMoin - gzip compression of responses
+
+    With compress_responses enabled, the wsgi application compresses the
+    responses of the mimetypes in compress_mimetypes for browsers accepting
+    gzip. Responses written completely (like rendered pages) are compressed
+    if they are at least compress_min_size bytes long, streamed responses
+    are compressed while they are sent. Files sent with send_file (they
+    may be partial responses) and responses that have a content coding
+    already are sent as they are.
+
+    The ETag of a compressed response is made weak, as the compressed
+    bytes are not the same as the uncompressed ones.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import gzip
+import zlib
+
+from MoinMoin.web.http import parse_accept_header
+
+COMPRESS_LEVEL = 6
+
+
+def _gzip_stream(chunks):
+    """ Yield the gzip compressed chunks """
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(request, response, cfg):
+    """ gzip compress response if the configuration and the client allow it
+
+    @param request: the request object
+    @param response: the response object
+    @param cfg: the wiki configuration
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304, ) or
+            response.direct_passthrough or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in cfg.compress_mimetypes):
+        return
+    response.vary.add('Accept-Encoding')
+    if not parse_accept_header(request.environ.get('HTTP_ACCEPT_ENCODING'))['gzip']:
+        return
+
+    if isinstance(response.response, (list, tuple)):
+        data = b''.join(response.iter_encoded())
+        if len(data) < cfg.compress_min_size:
+            return
+        response.set_data(gzip.compress(data, COMPRESS_LEVEL))
+    else:
+        response.response = _gzip_stream(response.iter_encoded())
+        response.headers.pop('Content-Length', None)
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
@@ -278,21 +278,21 @@ class HTTPContext(BaseContext):
         else:
             self.write = self.writestack.pop()
 
-    def send_file(self, fileobj, bufsize=8192, do_flush=None):
+    def send_file(self, fileobj, bufsize=8192, do_flush=None, size=None, etag=None, last_modified=None):
         """ Send a file to the output stream.
 
+        Conditional and range requests are answered if the size of the file
+        is known, see MoinMoin.web.sendfile.
+
         @param fileobj: a file-like object (supporting read, close)
         @param bufsize: size of chunks to read/write
         @param do_flush: call flush after writing?
+        @param size: size of the file content (default: from the file)
+        @param etag: ETag value (default: from the file)
+        @param last_modified: modification time (default: from the file)
         """
-
-        def simple_wrapper(fileobj, bufsize):
-            return iter(lambda: fileobj.read(bufsize), '')
-
-        file_wrapper = self.environ.get('wsgi.file_wrapper', simple_wrapper)
-        self.response.direct_passthrough = True
-        self.response.response = file_wrapper(fileobj, bufsize)
-        raise MoinMoinFinish('sent file')
+        from MoinMoin.web import sendfile
+        sendfile.send_file(self, fileobj, bufsize, size, etag, last_modified)
 
     # fully deprecated functions, with warnings
     def getScriptname(self):
@@ -347,6 +347,7 @@ class AuxilaryMixin:
     _login_multistage_name = EnvironProxy('_login_multistage_name', None)
     _setuid_real_user = EnvironProxy('_setuid_real_user', None)
     pages = EnvironProxy('pages', lambda o: {})
+    _item_cache_checks = EnvironProxy('_item_cache_checks', lambda o: {})
 
     def uid_generator(self):
         pagename = None
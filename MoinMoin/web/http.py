@@ -30,12 +30,13 @@ from werkzeug.exceptions import (
     abort,
 )
 from werkzeug.formparser import parse_form_data
-from werkzeug.http import http_date
+from werkzeug.http import http_date, parse_accept_header
 from werkzeug.middleware.shared_data import SharedDataMiddleware
 from werkzeug.serving import WSGIRequestHandler, run_simple
 from werkzeug.test import Client, EnvironBuilder, create_environ
 from werkzeug.utils import cached_property, redirect
 from werkzeug.wrappers import ResponseStream
+from werkzeug.wsgi import get_path_info
 
 
 def url_quote(value, charset="utf-8", errors="strict", safe="/:"):
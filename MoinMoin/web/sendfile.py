@@ -0,0 +1,216 @@
+"""
+    MoinMoin - send files as the response body
+
+    send_file answers conditional requests (If-None-Match, If-Modified-Since)
+    of unchanged files with 304 Not Modified and range requests (Range,
+    If-Range) with 206 Partial Content - with a single range as is, with
+    several ranges as multipart/byteranges. The file content is sent from
+    the file by the WSGI server's wsgi.file_wrapper (servers like mod_wsgi,
+    gunicorn or uWSGI use sendfile for that) where it can be used, and in
+    chunks read by the application otherwise.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import calendar
+import io
+import os
+import stat
+import uuid
+
+from MoinMoin.web.request import MoinMoinFinish
+
+# requests asking for more ranges get the whole file
+MAX_RANGES = 20
+
+
+def file_etag(st):
+    """ Return a strong ETag value (without the quotes) for a file
+
+    @param st: os.stat result of the file
+    @rtype: str
+    """
+    return '%x-%x-%x' % (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _timestamp(date):
+    return calendar.timegm(date.utctimetuple())
+
+
+def _not_modified(request, etag, last_modified):
+    """ Does the client have this version of the file? """
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains_weak(etag)
+    if request.if_modified_since is not None and last_modified is not None:
+        return int(last_modified) <= _timestamp(request.if_modified_since)
+    return False
+
+
+def requested_ranges(request, size, etag=None, last_modified=None):
+    """ Return the byte ranges the client asks for
+
+    @param request: the request object (with werkzeug's range properties)
+    @param size: size of the file
+    @param etag: ETag value of the file
+    @param last_modified: modification time of the file (seconds since the epoch)
+    @rtype: list or None
+    @return: list of (start, stop) byte offsets (empty list if no range can
+             be satisfied) or None if the whole file is to be sent
+    """
+    if request.method != 'GET':
+        return None
+    requested = request.range  # None if there is no (valid) Range header
+    if requested is None or requested.units != 'bytes':
+        return None
+    if_range = request.if_range
+    if if_range.etag is not None:
+        # the ranges are only meant for this version of the file
+        if etag is None or if_range.etag != etag:
+            return None
+    elif if_range.date is not None:
+        if last_modified is None or int(last_modified) != _timestamp(if_range.date):
+            return None
+    if len(requested.ranges) > MAX_RANGES:
+        return None
+    ranges = []
+    for start, stop in requested.ranges:
+        if start < 0:  # suffix range, the last -start bytes
+            start, stop = max(size + start, 0), size
+        elif stop is None or stop > size:
+            stop = size
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _iter_file(fileobj, start=None, stop=None, bufsize=8192, close=True):
+    """ Yield the bytes of fileobj from start (default: the current position)
+        to stop (default: the end)
+    """
+    try:
+        if start is not None:
+            fileobj.seek(start)
+        remaining = None
+        if stop is not None:
+            remaining = stop - (start or 0)
+        while remaining is None or remaining > 0:
+            data = fileobj.read(remaining is None and bufsize or min(bufsize, remaining))
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+    finally:
+        if close:
+            fileobj.close()
+
+
+def _multipart_parts(ranges, size, content_type, boundary):
+    """ Return the list of (part header, start, stop) and the trailer of a
+        multipart/byteranges body
+    """
+    parts = []
+    for start, stop in ranges:
+        header = ('--%s\r\nContent-Type: %s\r\nContent-Range: bytes %d-%d/%d\r\n\r\n' % (
+            boundary, content_type, start, stop - 1, size)).encode('ascii')
+        parts.append((header, start, stop))
+    return parts, ('--%s--\r\n' % boundary).encode('ascii')
+
+
+def _iter_multipart(fileobj, parts, trailer, bufsize):
+    try:
+        for header, start, stop in parts:
+            yield header
+            for data in _iter_file(fileobj, start, stop, bufsize, close=False):
+                yield data
+            yield b'\r\n'
+        yield trailer
+    finally:
+        fileobj.close()
+
+
+def _file_body(context, fileobj, start, stop, size, bufsize):
+    """ Return the response iterable sending fileobj from start to stop """
+    file_wrapper = context.environ.get('wsgi.file_wrapper')
+    if stop == size and file_wrapper is not None and hasattr(fileobj, 'fileno'):
+        # the file wrapper sends everything from the current position
+        fileobj.seek(start)
+        return file_wrapper(fileobj, bufsize)
+    return _iter_file(fileobj, start, stop, bufsize)
+
+
+def send_file(context, fileobj, bufsize=8192, size=None, etag=None, last_modified=None):
+    """ Send fileobj as the response body and finish the request
+
+    The size, ETag and modification time of regular files are taken from
+    the file if they are not given. If the size is known, conditional and
+    range requests are answered (see module docstring), otherwise the
+    whole file is sent.
+
+    @param context: the context object (the response headers, e.g. the
+                    Content-Type, are already set)
+    @param fileobj: a file-like object (supporting read, close and, if
+                    size is given, seek)
+    @param bufsize: size of chunks to read/write
+    @param size: size of the file content
+    @param etag: ETag value (without the quotes)
+    @param last_modified: modification time (seconds since the epoch)
+    """
+    request, response = context.request, context.response
+    if size is None:
+        try:
+            st = os.fstat(fileobj.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            st = None
+        if st is not None and stat.S_ISREG(st.st_mode):
+            size = st.st_size
+            if etag is None:
+                etag = file_etag(st)
+            if last_modified is None:
+                last_modified = st.st_mtime
+
+    response.direct_passthrough = True
+    if size is None or response.status_code != 200:
+        response.response = _iter_file(fileobj, bufsize=bufsize)
+        raise MoinMoinFinish('sent file')
+
+    if etag is not None:
+        response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = int(last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+
+    if _not_modified(request, etag, last_modified):
+        fileobj.close()
+        response.status_code = 304
+        response.response = []
+        response.headers.pop('Content-Length', None)
+        raise MoinMoinFinish('file not modified')
+
+    ranges = requested_ranges(request, size, etag, last_modified)
+    if ranges is None:
+        response.headers['Content-Length'] = str(size)
+        response.response = _file_body(context, fileobj, 0, size, size, bufsize)
+    elif not ranges:
+        fileobj.close()
+        response.status_code = 416
+        response.headers['Content-Range'] = 'bytes */%d' % size
+        response.headers['Content-Length'] = '0'
+        response.response = []
+    elif len(ranges) == 1:
+        start, stop = ranges[0]
+        response.status_code = 206
+        response.headers['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, size)
+        response.headers['Content-Length'] = str(stop - start)
+        response.response = _file_body(context, fileobj, start, stop, size, bufsize)
+    else:
+        boundary = uuid.uuid4().hex
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        parts, trailer = _multipart_parts(ranges, size, content_type, boundary)
+        length = len(trailer) + sum([len(header) + stop - start + 2 for header, start, stop in parts])
+        response.status_code = 206
+        response.headers['Content-Type'] = 'multipart/byteranges; boundary=%s' % boundary
+        response.headers['Content-Length'] = str(length)
+        response.response = _iter_multipart(fileobj, parts, trailer, bufsize)
+    raise MoinMoinFinish('sent file')
@@ -42,17 +42,142 @@
       configure apache to serve the url_prefix_static URL with the files from the
       static files path.
 
+    Compressed static files
+    -----------------------
+    "moin maint compressstatic" writes compressed copies (foo.css.gz and, if the
+    brotli module is installed, foo.css.br) next to the text files (css, js,
+    ...) of the static files path. When moin serves the static files, it sends
+    such a copy instead of the file to browsers accepting its encoding (unless
+    the file was changed after the copy was made). As url_prefix_static
+    contains the moin version, the URLs of the static files change with every
+    release, so the browsers may keep them for a long time (STATIC_CACHE_TIMEOUT).
+
     @copyright: 2009 MoinMoin:ThomasWaldmann
     @license: GNU GPL, see COPYING for details.
 """
 
+import gzip
+import os
 from os.path import join, abspath, dirname, isdir
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 from MoinMoin import config
-from MoinMoin.web.http import SharedDataMiddleware
+from MoinMoin.web.http import SharedDataMiddleware, get_path_info, parse_accept_header
 
 STATIC_FILES_PATH = join(abspath(dirname(__file__)), 'htdocs')
 
+# max-age of the files below url_prefix_static (its URLs change with each release)
+STATIC_CACHE_TIMEOUT = 365 * 24 * 3600
+
+# extensions of the files worth compressing (images etc. are compressed already)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.html', '.htm', '.txt', '.xml', '.svg', '.json', '.ico', )
+
+# (content coding, suffix of the compressed file), in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz'), ]
+
+
+def _compress_gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_brotli(data):
+    return brotli.compress(data)
+
+
+def compress_static_files(path):
+    """ Write the compressed copies of the text files below path (see
+        module docstring), unless they are up to date already
+
+    @param path: directory of the static files
+    @rtype: int
+    @return: number of the files written
+    """
+    compressors = [('.gz', _compress_gzip)]
+    if brotli is not None:
+        compressors.insert(0, ('.br', _compress_brotli))
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            if not filename.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            filepath = join(dirpath, filename)
+            mtime = os.path.getmtime(filepath)
+            data = None
+            for suffix, compress in compressors:
+                target = filepath + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                if data is None:
+                    f = open(filepath, 'rb')
+                    try:
+                        data = f.read()
+                    finally:
+                        f.close()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue  # no gain
+                f = open(target, 'wb')
+                try:
+                    f.write(compressed)
+                finally:
+                    f.close()
+                count += 1
+    return count
+
+
+class StaticFilesMiddleware(SharedDataMiddleware):
+    """ SharedDataMiddleware sending the compressed copies of the files to
+        the browsers accepting their encoding
+    """
+
+    def _find(self, path):
+        """ Return (file name, mtime) of the file served for path or None """
+        for search_path, loader in self.exports:
+            file_loader = None
+            if search_path == path:
+                real_filename, file_loader = loader(None)
+            if file_loader is None:
+                if not search_path.endswith('/'):
+                    search_path += '/'
+                if path.startswith(search_path):
+                    real_filename, file_loader = loader(path[len(search_path):])
+            if file_loader is not None:
+                f, mtime, size = file_loader()
+                f.close()
+                return real_filename, mtime
+        return None
+
+    def __call__(self, environ, start_response):
+        path = get_path_info(environ)
+        found = self._find(path)
+        if found is None or not found[0].lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            return SharedDataMiddleware.__call__(self, environ, start_response)
+
+        content_coding = None
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        for coding, suffix in ENCODINGS:
+            if not accepted[coding]:
+                continue
+            compressed = self._find(path + suffix)
+            if compressed is not None and compressed[1] >= found[1]:
+                content_coding = coding
+                environ = dict(environ)
+                environ['PATH_INFO'] = environ.get('PATH_INFO', '') + suffix
+                break
+
+        def _start_response(status, headers, exc_info=None):
+            headers = list(headers)
+            if content_coding is not None:
+                headers.append(('Content-Encoding', content_coding))
+            headers.append(('Vary', 'Accept-Encoding'))
+            return start_response(status, headers, exc_info)
+
+        return SharedDataMiddleware.__call__(self, environ, _start_response)
+
 
 def make_static_serving_app(application, shared):
     """
@@ -69,10 +194,13 @@ def make_static_serving_app(application, shared):
         if shared is True:
             shared = STATIC_FILES_PATH
         if isdir(shared):
-            shared = {config.url_prefix_static: shared,
-                      # XXX only works / makes sense for root-mounted wikis:
+            # the URLs below url_prefix_static change with each release
+            application = StaticFilesMiddleware(application,
+                                                {config.url_prefix_static: shared},
+                                                cache_timeout=STATIC_CACHE_TIMEOUT)
+            shared = {# XXX only works / makes sense for root-mounted wikis:
                       '/favicon.ico': join(shared, 'favicon.ico'),
                       '/robots.txt': join(shared, 'robots.txt')}
         else:
             raise ValueError("Invalid path given for shared parameter")
-    return SharedDataMiddleware(application, shared)
+    return StaticFilesMiddleware(application, shared)
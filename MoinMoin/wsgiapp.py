@@ -6,6 +6,8 @@
     @license: GNU GPL, see COPYING for details.
 """
 from MoinMoin.web.contexts import AllContext
+from MoinMoin.web import compress
+from MoinMoin.web.http import Response
 from MoinMoin.web.request import Request
 from MoinMoin.web.exceptions import HTTPException
 from MoinMoin.web.utils import fatal_response
@@ -26,6 +28,8 @@ class Application:
             request = Request(environ, given_config=self.app_config)
             context = AllContext(request)
             response = context.run()
+            if context.cfg.compress_responses and isinstance(response, Response):
+                compress.compress_response(request, response, context.cfg)
         except HTTPException as e:
             response = e
         except error.ConfigurationError as e:
@@ -22,6 +22,7 @@
     @license: GNU GPL, see COPYING for details
 """
 
+import calendar
 import os
 import sys
 import time
@@ -346,15 +347,12 @@ class XmlRpcBase:
         return_items = []
 
         edit_log = editlog.EditLog(self.request)
-        for log in edit_log.reverse():
+        since = wikiutil.timestamp2version(calendar.timegm(date.timetuple()))
+        for log in edit_log.since(since, newest_first=True):
             # get last-modified UTC (DateTime) from log
             gmtuple = tuple(time.gmtime(wikiutil.version2timestamp(log.ed_time_usecs)))
             lastModified_date = xmlrpc.client.DateTime(gmtuple)
 
-            # skip if older than "date"
-            if lastModified_date < date:
-                break
-
             # skip if knowledge not permitted
             if not self.request.user.may.read(log.pagename):
                 continue
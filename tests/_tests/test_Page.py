@@ -12,8 +12,12 @@ import io
 import marshal
 import sys
 
+import pytest
+
 from MoinMoin import caching
-from MoinMoin.Page import Page, _PAGE_CODE_CACHE_HEADER
+from MoinMoin.Page import ItemCache, Page, PageCodeCache, _PAGE_CODE_CACHE_HEADER
+from MoinMoin.logfile import editlog
+from tests._tests import become_trusted, create_page, nuke_page
 
 
 class TestPage:
@@ -109,6 +113,89 @@ class TestPage:
         assert cache.content().startswith(_PAGE_CODE_CACHE_HEADER)
 
 
+class TestItemCache:
+    def testStartsAtEditLogEnd(self, req):
+        cache = ItemCache('meta', req.rootpage.getPagePath('edit-log', isfile=1))
+        assert cache.log_pos == editlog.EditLog(req).size()
+
+    def testRefreshOncePerRequest(self, req, monkeypatch):
+        cache = ItemCache('meta')
+        calls = []
+        monkeypatch.setattr(cache, '_refresh', calls.append)
+        cache.getItem(req, u'FrontPage', 'layer_auto')
+        cache.getItem(req, u'FrontPage', 'layer_auto')
+        assert len(calls) == 1
+        # a local edit-log write forces the next lookup to check again
+        monkeypatch.setattr(editlog.EditLog, 'local_writes', editlog.EditLog.local_writes + 1)
+        cache.getItem(req, u'FrontPage', 'layer_auto')
+        assert len(calls) == 2
+
+
+class TestPageCodeCache:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageCode'
+
+    def testBudget(self, req):
+        cache = PageCodeCache(100)
+        cache.refresh(req)
+        cache.put(('A', 'text_html'), (1, 'uid'), 'code A', 40)
+        cache.put(('B', 'text_html'), (1, 'uid'), 'code B', 40)
+        assert cache.get(req, ('A', 'text_html'), (1, 'uid')) == 'code A'
+        # B is the least recently used entry
+        cache.put(('C', 'text_html'), (1, 'uid'), 'code C', 40)
+        assert cache.get(req, ('B', 'text_html'), (1, 'uid')) is None
+        assert cache.get(req, ('A', 'text_html'), (1, 'uid')) == 'code A'
+        assert cache.get(req, ('A', 'text_html'), (2, 'uid')) is None  # other revision
+        assert cache.get(req, ('A', 'text_html'), (1, 'other')) is None  # other cache file
+        cache.put(('D', 'text_html'), (1, 'uid'), 'too big', 200)
+        cache.put(('E', 'text_html'), (1, None), 'no cache file', 10)
+        assert cache.stats() == {'hits': 2, 'misses': 3, 'entries': 2, 'size': 80, 'max_size': 100}
+
+    def make_code(self, req, page):
+        from MoinMoin.formatter.text_html import Formatter
+        from MoinMoin.parser.text_moin_wiki import Parser
+        # like the loadCache call before makeCache in send_page
+        req.cfg.cache.page_code.refresh(req)
+        page.formatter = Formatter(req)
+        page.formatter.setPage(page)
+        return page.makeCache(req, Parser(page.get_raw_body(), req))
+
+    def testEditLog(self, req):
+        become_trusted(req)
+        create_page(req, self.pagename, u'Some text.\n')
+        try:
+            cache = req.cfg.cache.page_code
+            page = Page(req, self.pagename)
+            key = (self.pagename, page.getFormatterName())
+            code = self.make_code(req, page)
+            # the page code comes from memory, not from the cache file
+            assert page.loadCache(req) is code
+            assert cache.stats()['hits'] == 1
+
+            # any change of the page (also attaching a file) removes it
+            create_page(req, self.pagename, u'Other text.\n')
+            cache.refresh(req)
+            assert key not in cache._entries
+        finally:
+            nuke_page(req, self.pagename)
+
+    def testRemovedCacheFile(self, req):
+        become_trusted(req)
+        create_page(req, self.pagename, u'Some text.\n')
+        try:
+            page = Page(req, self.pagename)
+            code = self.make_code(req, page)
+            # like the refresh action does
+            caching.CacheEntry(req, page, page.getFormatterName(), scope='item').remove()
+            with pytest.raises(Exception) as excinfo:
+                page.loadCache(req)
+            assert excinfo.value.args == ('CacheNeedsUpdate', )
+            new_code = self.make_code(req, page)
+            assert new_code is not code
+            assert page.loadCache(req) is new_code
+        finally:
+            nuke_page(req, self.pagename)
+
+
 class TestRootPage:
     def testPageList(self, req):
         rootpage = req.rootpage
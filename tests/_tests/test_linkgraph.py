@@ -0,0 +1,76 @@
+"""
+    MoinMoin - MoinMoin.linkgraph Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pytest
+
+from MoinMoin import linkgraph
+from MoinMoin.Page import Page
+from MoinMoin.PageEditor import PageEditor
+from tests._tests import become_trusted, create_page, make_macro, nuke_page
+
+
+class TestLinkGraph:
+    source = u'AutoCreatedMoinMoinTemporaryTestLinkSource'
+    target = u'AutoCreatedMoinMoinTemporaryTestLinkTarget'
+    renamed = u'AutoCreatedMoinMoinTemporaryTestLinkRenamed'
+
+    @pytest.fixture(autouse=True)
+    def setup_pages(self, req):
+        become_trusted(req)
+        yield
+        for pagename in [self.source, self.target, self.renamed]:
+            nuke_page(req, pagename)
+
+    def test_set_links(self):
+        graph = linkgraph.LinkGraph()
+        graph._set_links(u'A', [u'B', u'C'])
+        graph._set_links(u'B', [u'C'])
+        assert graph.backlinks(u'C') == set([u'A', u'B'])
+        graph._set_links(u'A', [u'B'])
+        assert graph.backlinks(u'C') == set([u'B'])
+        graph._set_links(u'B', None)
+        assert not graph.exists(u'B')
+        assert graph.backlinks(u'C') == set()
+        assert graph.links(u'A') == (u'B', )
+
+    def test_follows_editlog(self, req):
+        create_page(req, self.target, u'no links\n')
+        create_page(req, self.source, u'see %s\n' % self.target)
+        graph = linkgraph.get_graph(req)
+        assert graph.links(self.source) == (self.target, )
+        assert Page(req, self.target).getBacklinks(req) == [self.source]
+
+        PageEditor(req, self.source).renamePage(self.renamed)
+        graph = linkgraph.get_graph(req)
+        assert not graph.exists(self.source)
+        assert graph.backlinks(self.target) == set([self.renamed])
+
+        PageEditor(req, self.renamed).deletePage()
+        assert Page(req, self.target).getBacklinks(req) == []
+
+    def test_persisted(self, req):
+        create_page(req, self.source, u'see %s\n' % self.target)
+        linkgraph.get_graph(req)
+        graph = linkgraph.LinkGraph()
+        graph._load(req)
+        assert graph.links(self.source) == (self.target, )
+        assert graph.log_pos is not None
+
+    def test_macros(self, req):
+        page = create_page(req, self.source, u'see %s\n' % self.target)
+        macro = make_macro(req, page)
+        wanted = macro.execute('WantedPages', u'')
+        assert self.target in wanted
+        orphaned = macro.execute('OrphanedPages', u'')
+        assert self.source in orphaned
+        create_page(req, self.target, u'back to %s\n' % self.source)
+        macro = make_macro(req, page)
+        assert self.target not in macro.execute('WantedPages', u'')
+        assert self.source not in macro.execute('OrphanedPages', u'')
+
+
+coverage_modules = ['MoinMoin.linkgraph']
@@ -0,0 +1,85 @@
+"""
+    MoinMoin - MoinMoin.pageindex Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pytest
+
+from MoinMoin import caching
+from MoinMoin.logfile import editlog
+from MoinMoin.pageindex import PageIndex, probe_page
+from tests._tests import become_trusted, create_page, nuke_page
+
+
+class TestPageIndex:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageIndex'
+
+    @pytest.fixture(autouse=True)
+    def setup_page(self, req):
+        become_trusted(req)
+        yield
+        nuke_page(req, self.pagename)
+
+    def test_probe_page(self, req):
+        assert probe_page(req, self.pagename) is None
+        create_page(req, self.pagename, u'some text\n')
+        underlay, exists, rev, mtime = probe_page(req, self.pagename)
+        assert (underlay, exists, rev) == (0, True, 1)
+        assert mtime > 0
+
+    def test_load_follows_editlog(self, req):
+        PageIndex().rebuild(req)
+        create_page(req, self.pagename, u'some text\n')
+        pages = PageIndex().load(req)
+        assert pages[self.pagename][1]
+        create_page(req, self.pagename, u'some text\n').deletePage()
+        pages = PageIndex().load(req)
+        assert not pages[self.pagename][1]
+
+    def test_rebuild_when_missing(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        caching.CacheEntry(req, 'pagelists', 'index', scope='wiki').remove()
+        index = PageIndex()
+        pages = index.load(req)
+        assert self.pagename in pages
+        assert index.log_pos is not None
+
+    def test_getPageList_uses_index(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        assert self.pagename in req.rootpage.getPageList(user='')
+        count = req.rootpage.getPageCount(exists=1)
+        create_page(req, self.pagename, u'some text\n').deletePage()
+        assert self.pagename not in req.rootpage.getPageList(user='')
+        assert self.pagename in req.rootpage.getPageList(user='', exists=0)
+        assert req.rootpage.getPageCount(exists=1) == count - 1
+
+    def test_pagelists_cache_applies_changes(self, req):
+        req.rootpage.getPageList(user='')
+        index = req.cfg.cache.pagelists.getItem(req, 'all', None)
+        create_page(req, self.pagename, u'some text\n')
+        assert self.pagename in req.rootpage.getPageList(user='')
+        # still the same index object, it was updated and not thrown away
+        assert req.cfg.cache.pagelists.getItem(req, 'all', None) is index
+
+    def test_pagelists_cache_concurrent_update(self, req, monkeypatch):
+        cache = req.cfg.cache.pagelists
+        req.rootpage.getPageList(user='')
+        create_page(req, self.pagename, u'some text\n')
+        log_size = editlog.EditLog(req).size()
+        compare_and_put = cache.store.compare_and_put
+
+        def racing(name, key, expected, items):
+            # another process updates the cache before we do
+            cache.store.put(None, 'log_pos', 'other')
+            return compare_and_put(name, key, expected, items)
+        monkeypatch.setattr(cache.store, 'compare_and_put', racing)
+        cache.log_pos = 0
+        cache.refresh(req)
+        # its result is kept, ours is dropped
+        assert cache.log_pos == 'other'
+        cache.log_pos = log_size
+
+
+coverage_modules = ['MoinMoin.pageindex']
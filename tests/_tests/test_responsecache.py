@@ -0,0 +1,192 @@
+"""
+    MoinMoin - MoinMoin.responsecache Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pytest
+
+from MoinMoin import responsecache
+from MoinMoin.Page import Page
+from MoinMoin.util.cachestore import MemoryStore
+from MoinMoin.web.contexts import AllContext
+from MoinMoin.web.http import Client
+from MoinMoin.wsgiapp import Application
+from tests._tests import become_trusted, create_page, nuke_page, wikiconfig
+
+
+def test_dependencies(req):
+    responsecache.add_dependencies(req, ['time'])  # not recording, ignored
+    recorder = req._html_cache_recorder = responsecache.Recorder()
+    try:
+        responsecache.add_dependencies(req, [])
+        responsecache.add_page(req, u'Included')
+        assert recorder.cacheable and not recorder.any_page
+        responsecache.add_dependencies(req, ['namespace'])
+        assert recorder.cacheable and recorder.any_page
+        responsecache.add_dependencies(req, ['time24:00'])
+        assert not recorder.cacheable
+        assert recorder.pages == set([u'Included'])
+    finally:
+        req._html_cache_recorder = None
+
+
+class PageViewTest:
+    """ views of a page and a page linking to it (the tests get the views
+        by running the wsgi application with their Config)
+    """
+    target = u'AutoCreatedMoinMoinTemporaryTestHtmlTarget'
+    source = u'AutoCreatedMoinMoinTemporaryTestHtmlSource'
+
+    @pytest.fixture(autouse=True)
+    def setup_pages(self, req):
+        become_trusted(req)
+        create_page(req, self.target, u'The target.\n')
+        create_page(req, self.source, u'Link to %s.\n' % self.target)
+        yield
+        for pagename in [self.source, self.target]:
+            nuke_page(req, pagename)
+
+    def get(self, pagename, **params):
+        response = self.get_response(pagename, **params)
+        return response.status, response.get_data(as_text=True)
+
+    def get_response(self, pagename, **params):
+        client = Client(Application(self.Config))
+        return client.get('/' + pagename, **params)
+
+
+class TestResponseCache(PageViewTest):
+
+    class Config(wikiconfig.Config):
+        page_html_cache = True
+        surge_action_limits = None
+        # every request of the tests gets its own config object, the
+        # stores are shared like with a cache server
+        stores = {}
+
+        def cache_store(self, name):
+            return self.stores.setdefault(name, MemoryStore())
+
+    def test_content_language(self, req, monkeypatch):
+        create_page(req, self.target, u'#language de\nDas Ziel.\n')
+        # '#language de' may resolve to another language, depending on the
+        # languages loaded by earlier tests - use the one the page sets
+        langs = []
+        setContentLanguage = AllContext.setContentLanguage
+
+        def record(self, lang):
+            langs.append(lang)
+            setContentLanguage(self, lang)
+
+        monkeypatch.setattr(AllContext, 'setContentLanguage', record)
+        self.get(self.target)
+        lang = Page(req, self.target).pi['language']
+        assert langs[-1] == lang
+        entry = list(req.cfg.cache.html.store.get_all(self.target).values())[0]
+        assert entry[4] == lang
+        # a cache hit sets the content language of the page, too
+        langs[:] = []
+        status, output = self.get(self.target)
+        assert 'Das Ziel.' in output
+        assert langs == [lang]
+
+    def test_invalidate(self, req):
+        store = MemoryStore()
+        for name in [self.source, self.target, u'Other', u'Includer', u'PageList']:
+            store.put(name, 'key', ('text/html', u'', frozenset(), False))
+        store.put(u'Includer', 'key', ('text/html', u'', frozenset([self.target]), False))
+        store.put(u'PageList', 'key', ('text/html', u'', frozenset(), True))
+        responsecache.invalidate(req, store, [self.target])
+        # the target, the page linking to it, the page including it and
+        # the page depending on all pages are gone
+        assert sorted(store.names()) == [u'Other']
+
+    def test_cached(self, req):
+        cache = req.cfg.cache.html
+        status, output = self.get(self.target)
+        assert status[:3] == '200'
+        assert 'The target.' in output
+        assert cache.store.get_all(self.target)
+
+        # served from the cache
+        key = list(cache.store.get_all(self.target))[0]
+        entry = cache.store.get(self.target, key)
+        cache.store.put(self.target, key, (entry[0], entry[1].replace('The target.', 'Cached target.')) + entry[2:])
+        status, output = self.get(self.target)
+        assert status[:3] == '200'
+        assert 'Cached target.' in output
+
+        # requests with parameters are rendered
+        status, output = self.get(self.target, query_string='action=show&redirect=x')
+        assert 'The target.' in output
+
+        # changing the page removes it and the pages linking to it
+        self.get(self.source)
+        assert cache.store.get_all(self.source)
+        create_page(req, self.target, u'The new target.\n')
+        status, output = self.get(self.target)
+        assert 'The new target.' in output
+        assert cache.store.get_all(self.source) is None
+
+
+class TestETags(PageViewTest):
+
+    class Config(wikiconfig.Config):
+        page_etags = True
+        surge_action_limits = None
+        stores = {}
+
+        def cache_store(self, name):
+            return self.stores.setdefault(name, MemoryStore())
+
+    def test_not_modified(self, req):
+        response = self.get_response(self.target)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        assert etag and last_modified
+
+        response = self.get_response(self.target, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.get_data() == b''
+        assert response.headers['ETag'] == etag
+        response = self.get_response(self.target, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+        response = self.get_response(self.target, headers={'If-None-Match': '"other"'})
+        assert response.status_code == 200
+        assert response.headers['ETag'] == etag
+
+        # a change of a linked page changes the view of the page
+        response = self.get_response(self.source)
+        source_etag = response.headers['ETag']
+        nuke_page(req, self.target)
+        response = self.get_response(self.source, headers={'If-None-Match': source_etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != source_etag
+
+    def test_group_page_changed(self, req):
+        response = self.get_response(self.target)
+        assert req.cfg.cache.etags.store.get_all(self.target)
+        group = u'AutoCreatedMoinMoinTemporaryTestHtmlGroup'
+        create_page(req, group, u' * SomeUser\n')
+        nuke_page(req, group)
+        self.get_response(self.source)  # reads the edit-log
+        assert req.cfg.cache.etags.store.get_all(self.target) is None
+
+    def test_views_per_page(self, req, monkeypatch):
+        monkeypatch.setattr(responsecache, 'MAX_VIEWS_PER_PAGE', 3)
+        cache = req.cfg.cache.etags
+        for i in range(5):
+            responsecache._store(req, cache, 10, self.target, ('view', i), ('"etag"', 0, frozenset(), False))
+        assert list(cache.store.get_all(self.target).keys()) == [('view', 2), ('view', 3), ('view', 4)]
+        responsecache._store(req, cache, 10, self.target, ('view', 3), ('"new"', 0, frozenset(), False))
+        assert len(cache.store.get_all(self.target)) == 3
+
+    def test_dynamic(self, req):
+        create_page(req, self.target, u'<<DateTime>>\n')
+        response = self.get_response(self.target)
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+coverage_modules = ['MoinMoin.responsecache']
@@ -0,0 +1,73 @@
+"""
+    MoinMoin - MoinMoin.subscriptions Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pytest
+
+from MoinMoin import subscriptions, user
+from MoinMoin.Page import Page
+from tests._tests import nuke_user
+
+
+class TestSubscriptionIndex:
+    """ testing the index itself """
+
+    def test_subscribers(self):
+        index = subscriptions.SubscriptionIndex()
+        index.set_user('1', u'a@example.org', [u'FrontPage', u'CategoryHelp'])
+        index.set_user('2', u'b@example.org', [u'Help.*', u'C++', u'Front(Page'])
+        index.set_user('3', u'c@example.org', [u'Wiki:FrontPage|Other'])
+        assert index.subscribers([u'FrontPage']) == set(['1'])
+        assert index.subscribers([u'OtherPage', u'CategoryHelp']) == set(['1'])
+        assert index.subscribers([u'HelpContents']) == set(['2'])
+        assert index.subscribers([u'C++']) == set(['2'])  # exact match of an invalid regex
+        assert index.subscribers([u'Front(Page']) == set(['2'])
+        assert index.subscribers([u'FrontPage', u'Wiki:FrontPage']) == set(['1', '3'])
+        assert index.subscribers([u'NoOther']) == set(['3'])  # like isSubscribedTo, "$" only binds to Other
+        assert index.subscribers([u'NoSuchPage']) == set()
+
+    def test_update(self):
+        index = subscriptions.SubscriptionIndex()
+        index.set_user('1', u'a@example.org', [u'Help.*'])
+        index.set_user('2', u'b@example.org', [u'Help.*'])
+        assert index.subscribers([u'HelpContents']) == set(['1', '2'])
+        index.set_user('1', u'a@example.org', [u'FrontPage'])
+        assert index.subscribers([u'HelpContents']) == set(['2'])
+        index.remove_user('2')
+        assert index.subscribers([u'HelpContents']) == set()
+        assert index.regex == {}
+        index.set_user('1', u'a@example.org', [])
+        assert index.users == {} and index.exact == {}
+
+
+class TestGetSubscribers:
+    """ testing Page.getSubscribers with the persisted index """
+
+    name = u'SubscriptionIndexUser'
+
+    @pytest.fixture(autouse=True)
+    def cleanup(self, req):
+        subscriptions._cache_entry(req).remove()
+        yield
+        nuke_user(req, self.name)
+        subscriptions._cache_entry(req).remove()
+
+    def test_subscribers(self, req):
+        page = Page(req, u'FrontPage')
+        assert page.getSubscribers(req, include_self=1) == {}
+        assert subscriptions._cache_entry(req).exists()
+        u = user.User(req, name=self.name, password=self.name)
+        u.email = u'index@example.org'
+        u.save()
+        assert page.getSubscribers(req, include_self=1) == {}
+        u.subscribe(u'Front.*')
+        # the index was updated by saving the user
+        assert page.getSubscribers(req, include_self=1) == {req.cfg.language_default: [u'index@example.org']}
+        u.unsubscribe(u'Front.*')
+        assert page.getSubscribers(req, include_self=1) == {}
+
+
+coverage_modules = ['MoinMoin.subscriptions']
@@ -8,10 +8,10 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os
 import pytest
 
 from MoinMoin import user, caching
+from MoinMoin.util.cachestore import MemoryStore
 
 
 class TestEncodePassword:
@@ -72,8 +72,7 @@ class TestLoginWithPassword:
         # Remove user file and user
         if self.user is not None:
             try:
-                path = self.user._User__filename()
-                os.remove(path)
+                req.cfg.cache.user_store.remove(self.user.id)
             except OSError:
                 pass
             del self.user
@@ -304,6 +303,64 @@ class TestLoginWithPassword:
             pytest.skip("Can't create test user")
 
 
+class TestLookupCaches:
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, req, monkeypatch):
+        self.rebuilds = 0
+        rebuild = user.rebuildLookupCaches
+
+        def counting_rebuild(request):
+            self.rebuilds += 1
+            return rebuild(request)
+        monkeypatch.setattr(user, 'rebuildLookupCaches', counting_rebuild)
+        user.clearLookupCaches(req)
+        self.user = None
+
+        yield
+
+        if self.user is not None and self.user.exists():
+            self.user.remove()
+        user.clearLookupCaches(req)
+
+    def testMissIsRemembered(self, req):
+        """ user: lookup misses are cached and rebuilds are rate limited """
+        assert user.getUserId(req, u'__Non Existent User Name__') is None
+        assert user.getUserId(req, u'__Non Existent User Name__') is None
+        assert user.getUserId(req, u'__Other Non Existent User Name__') is None
+        assert self.rebuilds == 1
+
+    def testSaveAndRemove(self, req):
+        """ user: saving and removing a profile updates the lookup caches """
+        assert user.getUserId(req, u'__Lookup Test User__') is None
+        self.user = user.User(req)
+        self.user.name = u'__Lookup Test User__'
+        self.user.save()
+        assert user.getUserId(req, u'__Lookup Test User__') == self.user.id
+        assert user._getUserIdByKey(req, 'name', u'__lookup test user__', case=False) == self.user.id
+        self.user.name = u'__Renamed Lookup Test User__'
+        self.user.save()
+        assert user.getUserId(req, u'__Lookup Test User__') is None
+        assert user.getUserId(req, u'__Renamed Lookup Test User__') == self.user.id
+        self.user.remove()
+        assert user.getUserId(req, u'__Renamed Lookup Test User__') is None
+        assert self.rebuilds == 1
+
+    def testSavedByOtherProcess(self, req, monkeypatch):
+        """ user: a profile saved by another process is found despite a remembered miss """
+        assert user.getUserId(req, u'__Lookup Test User__') is None
+        users = req.cfg.cache.users
+        # the other process has its own in-memory cache
+        monkeypatch.setattr(req.cfg.cache, 'users', MemoryStore())
+        self.user = user.User(req)
+        self.user.name = u'__Lookup Test User__'
+        self.user.save()
+        monkeypatch.setattr(req.cfg.cache, 'users', users)
+        assert users.get('misses', ('name2id', u'__Lookup Test User__')) is not None
+        assert user.getUserId(req, u'__Lookup Test User__') == self.user.id
+        assert self.rebuilds == 1
+
+
 class TestGroupName:
 
     def testGroupNames(self, req):
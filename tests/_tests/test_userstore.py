@@ -0,0 +1,114 @@
+"""
+    MoinMoin - MoinMoin.userstore Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from MoinMoin import user, userstore
+
+
+PROFILE = {
+    'name': u'JoeDoe',
+    'email': u'Joe@Example.org',
+    'openids': [u'http://joe.example.org/', u'http://doe.example.org/'],
+    'subscribed_pages': [u'FrontPage'],
+    'bookmarks': {u'': u'1234567890'},
+    'disabled': 0,
+}
+
+
+class StoreTests:
+    """ tests for all stores, see subclasses """
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'userstore_')
+        self.store = self.make_store(self.test_dir)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def test_save_load(self):
+        assert self.store.load('1.2.3') is None
+        self.store.save('1.2.3', PROFILE)
+        assert self.store.exists('1.2.3')
+        assert self.store.uids() == ['1.2.3']
+        data = self.store.load('1.2.3')
+        assert data['name'] == u'JoeDoe'
+        assert data['openids'] == PROFILE['openids']
+        assert data['bookmarks'] == PROFILE['bookmarks']
+        assert data['disabled'] == u'0'
+        self.store.remove('1.2.3')
+        assert not self.store.exists('1.2.3')
+        assert self.store.uids() == []
+
+    def test_find(self):
+        self.store.save('1.2.3', PROFILE)
+        self.store.save('4.5.6', dict(PROFILE, name=u'Other', email=u'other@example.org', openids=[]))
+        assert self.store.find('email', u'joe@example.org') == []
+        assert self.store.find('email', u'joe@example.org', case=False) == ['1.2.3']
+        assert self.store.find('openids', u'http://doe.example.org/') == ['1.2.3']
+        assert sorted(self.store.find('subscribed_pages', u'FrontPage')) == ['1.2.3', '4.5.6']
+        self.store.save('1.2.3', dict(PROFILE, email=u''))
+        assert self.store.find('email', u'joe@example.org', case=False) == []
+
+    def test_values(self):
+        self.store.save('1.2.3', PROFILE)
+        self.store.save('4.5.6', dict(PROFILE, name=u'Other', subscribed_pages=[]))
+        values = self.store.values(['name', 'subscribed_pages'])
+        assert values == {
+            '1.2.3': {'name': u'JoeDoe', 'subscribed_pages': [u'FrontPage']},
+            '4.5.6': {'name': u'Other', 'subscribed_pages': []},
+        }
+        assert self.store.values(['bookmarks'])['1.2.3'] == {'bookmarks': PROFILE['bookmarks']}
+
+
+class TestFileStore(StoreTests):
+
+    def make_store(self, test_dir):
+        return userstore.FileStore(test_dir)
+
+    def test_old_format(self):
+        with open(os.path.join(self.test_dir, '1.2'), 'w') as f:
+            f.write("# comment\nname=JoeDoe\nsubscribed_pages=FrontPage\tHelpContents\n")
+        assert self.store.load('1.2') == {'name': u'JoeDoe', 'subscribed_pages': [u'FrontPage', u'HelpContents']}
+
+
+class TestSQLiteStore(StoreTests):
+
+    def make_store(self, test_dir):
+        return userstore.SQLiteStore(os.path.join(test_dir, 'profiles.db'))
+
+
+class TestUserWithSQLiteStore:
+
+    @pytest.fixture(autouse=True)
+    def sqlite_store(self, req, monkeypatch):
+        test_dir = tempfile.mkdtemp('', 'userstore_')
+        monkeypatch.setattr(req.cfg.cache, 'user_store', userstore.SQLiteStore(os.path.join(test_dir, 'profiles.db')))
+        user.clearLookupCaches(req)
+        yield
+        user.clearLookupCaches(req)
+        shutil.rmtree(test_dir)
+
+    def test_user(self, req):
+        u = user.User(req, name=u'SQLiteUser', password=u'12345')
+        u.email = u'sqlite@example.org'
+        u.save()
+        assert user.getUserList(req) == [u.id]
+        assert user.getUserId(req, u'SQLiteUser') == u.id
+        assert user.get_by_email_address(req, u'SQLite@example.org').id == u.id
+        theuser = user.get_by_filter(req, lambda u: u.valid, email=u'sqlite@example.org')
+        assert theuser.name == u'SQLiteUser'
+        assert user.User(req, name=u'SQLiteUser', password=u'12345').valid
+        u.remove()
+        assert user.getUserList(req) == []
+
+
+coverage_modules = ['MoinMoin.userstore']
@@ -27,9 +27,10 @@ def test_execute_preserves_request_context(
     class SearchCalled(Exception):
         pass
 
-    def record_search(search_context, query, sort, mtime, historysearch):
+    def record_search(search_context, query, sort, mtime, historysearch, limit=None):
         search_call['context'] = search_context
         search_call['sort'] = sort
+        search_call['limit'] = limit
         raise SearchCalled
 
     monkeypatch.setattr(search, 'searchPages', record_search)
@@ -39,6 +40,7 @@ def test_execute_preserves_request_context(
 
     assert search_call['context'] is context
     assert search_call['sort'] == expected_sort
+    assert search_call['limit'] == context.cfg.search_results_per_page
 
 
 def test_execute_passes_context_lines_to_result_renderer(req, monkeypatch):
@@ -66,7 +68,7 @@ def test_execute_passes_context_lines_to_result_renderer(req, monkeypatch):
             render_call['context_lines'] = kwargs['context']
             raise ResultsRendered
 
-    monkeypatch.setattr(search, 'searchPages', lambda *args: SearchResults())
+    monkeypatch.setattr(search, 'searchPages', lambda *args, **kw: SearchResults())
     monkeypatch.setattr(context, 'write', lambda *args: None)
     monkeypatch.setattr(context, 'setContentLanguage', lambda lang: None)
     monkeypatch.setattr(
@@ -181,6 +181,33 @@ class TestWikiGroupBackend(GroupsBackendTest):
         assert not has_rights_before, 'AnotherUser has no read rights because in the beginning he is not a member of a group page NewGroup'
         assert has_rights_after, 'AnotherUser must have read rights because after appendage he is member of NewGroup'
 
+    def test_groups_index(self, req):
+        """
+        Tests the membership index for nested groups and its reloading from the cache.
+        """
+        request = req
+        become_trusted(request)
+        pages = [(u'IndexAGroup', u" * IndexBGroup\n * UserA"),
+                 (u'IndexBGroup', u" * IndexCGroup\n * UserB"),
+                 (u'IndexCGroup', u" * IndexAGroup\n * UserC")]
+        for group_name, page_text in pages:
+            create_page(request, group_name, page_text)
+        try:
+            for i in range(2):
+                for group_name, page_text in pages:
+                    for member in (u'UserA', u'UserB', u'UserC', u'IndexAGroup'):
+                        assert member in request.groups[group_name]
+                assert set(request.groups.groups_with_member(u'UserC')) == set([group_name for group_name, page_text in pages])
+                # next time, use the pickled index
+                request.cfg.cache.wiki_groups = None
+                request._wiki_groups_checked = None
+            append_page(request, u'IndexCGroup', u" * UserD")
+            assert u'UserD' in request.groups[u'IndexAGroup']
+        finally:
+            for group_name, page_text in pages:
+                nuke_page(request, group_name)
+        assert not list(request.groups.groups_with_member(u'UserC'))
+
     def test_simple_group_page(self, req):
         """
         Tests if a simple group page is evaluated correctly.
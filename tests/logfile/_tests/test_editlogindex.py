@@ -0,0 +1,104 @@
+"""
+    MoinMoin - MoinMoin.logfile.editlogindex Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import time
+
+import pytest
+
+from MoinMoin import caching, wikiutil
+from MoinMoin.logfile import editlog
+from tests._tests import append_page, become_trusted, create_page, nuke_page
+
+
+class TestEditLogIndex:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestEditLogIndex'
+
+    @pytest.fixture(autouse=True)
+    def setup_page(self, req):
+        become_trusted(req)
+        yield
+        nuke_page(req, self.pagename)
+
+    def test_index_follows_editlog(self, req):
+        log = editlog.EditLog(req)
+        assert log.index is not None
+        assert log.index.update()
+        create_page(req, self.pagename, u'some text\n')
+        offsets = log.index.page_offsets(wikiutil.quoteWikinameFS(self.pagename))
+        assert offsets
+        assert log._line_at(offsets[0]).pagename == self.pagename
+
+    def test_since(self, req):
+        start = wikiutil.timestamp2version(time.time() - 1)
+        create_page(req, self.pagename, u'some text\n')
+        lines = list(editlog.EditLog(req).since(start))
+        assert self.pagename in [line.pagename for line in lines]
+        assert all(line.ed_time_usecs >= start for line in lines)
+        assert list(editlog.EditLog(req).since(wikiutil.timestamp2version(time.time() + 60))) == []
+
+    def test_since_newest_first(self, req, monkeypatch):
+        start = wikiutil.timestamp2version(time.time() - 1)
+        create_page(req, self.pagename, u'some text\n')
+        append_page(req, self.pagename, u'other text\n')
+        lines = list(editlog.EditLog(req).since(start, newest_first=True))
+        assert lines == sorted(lines, reverse=True)
+        assert [line.rev for line in lines if line.pagename == self.pagename][:2] == ['00000002', '00000001']
+        # without the index, we get the same
+        monkeypatch.setattr(req.cfg, 'edit_log_index', False)
+        log = editlog.EditLog(req)
+        assert log.index is None
+        assert [line.ed_time_usecs for line in log.since(start, newest_first=True)] == \
+            [line.ed_time_usecs for line in lines]
+
+    def test_recentchanges_bookmark(self, req, monkeypatch):
+        from MoinMoin.Page import Page
+        from tests._tests import make_macro
+        start = wikiutil.timestamp2version(time.time() - 1)
+        create_page(req, self.pagename, u'some text\n')
+        monkeypatch.setattr(req.user, 'getBookmark', lambda: start)
+
+        def reverse(self):
+            raise AssertionError("read the whole edit-log")
+        monkeypatch.setattr(editlog.EditLog, 'reverse', reverse)
+        result = make_macro(req, Page(req, self.pagename)).execute('RecentChanges', u'')
+        assert self.pagename in result
+
+    def test_page_history(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        append_page(req, self.pagename, u'other text\n')
+        lines = list(editlog.EditLog(req).page_history(self.pagename))
+        assert [line.rev for line in lines[:2]] == ['00000002', '00000001']
+        assert len(list(editlog.EditLog(req).page_history(self.pagename, 1))) == 1
+
+    def test_user_edits(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        lines = list(editlog.EditLog(req).user_edits(req.user.id, 1))
+        assert lines[0].pagename == self.pagename
+
+    def test_rebuild(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        caching.CacheEntry(req, 'editlog', 'index', scope='wiki').remove()
+        lines = list(editlog.EditLog(req).page_history(self.pagename))
+        assert lines[0].pagename == self.pagename
+
+    def test_without_index(self, req, monkeypatch):
+        monkeypatch.setattr(req.cfg, 'edit_log_index', False)
+        create_page(req, self.pagename, u'some text\n')
+        log = editlog.EditLog(req)
+        assert log.index is None
+        assert next(log.page_history(self.pagename)).pagename == self.pagename
+
+    def test_set_filter(self, req):
+        create_page(req, self.pagename, u'some text\n')
+        log = editlog.EditLog(req)
+        log.set_filter(pagename=self.pagename)
+        lines = list(log.reverse())
+        assert lines
+        assert all(line.pagename == self.pagename for line in lines)
+
+
+coverage_modules = ['MoinMoin.logfile.editlogindex']
@@ -0,0 +1,143 @@
+"""
+    MoinMoin - MoinMoin.logfile.eventlog Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from MoinMoin.logfile import eventlog
+from tests._tests import nuke_eventlog
+
+
+class TestBufferedWriter:
+    """ testing batched event-log writing """
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'eventlog_')
+        self.fname = os.path.join(self.test_dir, 'event-log')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def read_log(self):
+        with open(self.fname, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def test_flush(self):
+        writer = eventlog.BufferedWriter(self.fname, 100, 3600.0, 1000)
+        events = [(1292630945000000 + i, 'VIEWPAGE', {'pagename': u'Page%d' % i}) for i in range(3)]
+        for event in events:
+            writer.put(event)
+        assert not os.path.exists(self.fname)
+        writer.flush()
+        assert self.read_log() == u''.join([eventlog.format_event(*event) for event in events])
+
+    def test_flush_through_logfile(self, monkeypatch):
+        # the output path of LogFile (e.g. its file mode) is used
+        lines = []
+        monkeypatch.setattr(eventlog.LogFile, '_add', lambda self, line: lines.append(line))
+        writer = eventlog.BufferedWriter(self.fname, 100, 3600.0, 1000)
+        event = (1292630945000000, 'VIEWPAGE', {'pagename': u'FrontPage'})
+        writer.put(event)
+        writer.flush()
+        assert lines == [eventlog.format_event(*event)]
+
+    def test_drop(self):
+        writer = eventlog.BufferedWriter(self.fname, 100, 3600.0, 2)
+        for i in range(5):
+            writer.put((1292630945000000 + i, 'VIEWPAGE', {'pagename': u'FrontPage'}))
+        assert writer.dropped == 3
+        writer.flush()
+        assert len(self.read_log().splitlines()) == 2
+
+
+class TestSegments:
+    """ testing rotation and reading of archived segments """
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'eventlog_')
+        self.fname = os.path.join(self.test_dir, 'event-log')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def write_events(self, times):
+        with open(self.fname, 'ab') as f:
+            for usecs in times:
+                f.write(eventlog.format_event(usecs, 'VIEWPAGE', {'pagename': u'FrontPage'}).encode('utf-8'))
+
+    def test_rotate(self):
+        day = 86400 * 1000000
+        start = 1292630945000000
+        self.write_events([start, start + day])
+        elog = eventlog.EventLog(None, filename=self.fname)
+        segment = elog.segments.rotate()
+        assert segment.name == 'event-log.20101218-20101219'
+        assert (segment.first_usecs, segment.last_usecs, segment.lines) == (start, start + day, 2)
+        assert elog.segments.rotate() is None  # empty
+        self.write_events([start + 2 * day, start + 3 * day])
+        segment = elog.segments.rotate(compress=True)
+        assert segment.name.endswith('.gz')
+        self.write_events([start + 4 * day])
+
+        elog = eventlog.EventLog(None, filename=self.fname)
+        assert [event[0] for event in elog.reverse()] == [start + i * day for i in range(4, -1, -1)]
+        assert [event[0] for event in elog.reverse(since=start + 2 * day)] == [start + i * day for i in range(4, 1, -1)]
+        assert [event[0] for event in elog.events()] == [start + i * day for i in range(5)]
+        assert [event[0] for event in elog.events(since=start + day, until=start + 3 * day)] == [start + i * day for i in range(1, 4)]
+        assert len(elog.segments.list(since=start + 2 * day)) == 1
+        assert elog.lines() == 5
+        assert elog.total_size() > elog.size()
+
+    def test_rotate_waits_for_writers(self):
+        start = 1292630945000000
+        self.write_events([start])
+        elog = eventlog.EventLog(None, filename=self.fname)
+        wlock = elog.segments.write_lock()
+        assert wlock.acquire(1.0)
+        segments = []
+        rotation = threading.Thread(target=lambda: segments.append(elog.segments.rotate()))
+        rotation.start()
+        try:
+            time.sleep(0.2)
+            # a writer holding the lock still appends to the current log
+            assert os.path.exists(self.fname)
+            self.write_events([start + 1])
+        finally:
+            wlock.release()
+        rotation.join()
+        assert segments[0].lines == 2
+        assert not os.path.exists(self.fname)
+        # the writers of the module take the lock, too
+        assert wlock.acquire(1.0)
+        try:
+            writer = eventlog.BufferedWriter(self.fname, 100, 3600.0, 1000)
+            writer.put((start + 2, 'VIEWPAGE', {'pagename': u'FrontPage'}))
+            flush = threading.Thread(target=writer.flush)
+            flush.start()
+            time.sleep(0.2)
+            assert not os.path.exists(self.fname)
+        finally:
+            wlock.release()
+        flush.join()
+        assert [event[0] for event in eventlog.EventLog(None, filename=self.fname).events()] == [start, start + 1, start + 2]
+
+
+def test_buffered_add(req, monkeypatch):
+    monkeypatch.setattr(req.cfg, 'log_events_buffer', 100)
+    monkeypatch.setattr(req.cfg, 'log_events_flush_interval', 3600.0)
+    nuke_eventlog(req)
+    eventlog.EventLog(req).add(req, 'VIEWPAGE', {'pagename': u'FrontPage'})
+    eventlog.flush_writers()
+    events = list(eventlog.EventLog(req).reverse())
+    assert [(event[1], event[2]['pagename']) for event in events] == [('VIEWPAGE', u'FrontPage')]
+    nuke_eventlog(req)
+
+
+coverage_modules = ['MoinMoin.logfile.eventlog']
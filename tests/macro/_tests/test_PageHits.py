@@ -5,10 +5,13 @@
     @copyright: 2008 MoinMoin:ReimarBauer
     @license: GNU GPL, see COPYING for details.
 """
+import os
+
 import pytest
 
 from MoinMoin import caching
 from MoinMoin.logfile import eventlog
+from MoinMoin.stats import aggregate
 
 from tests._tests import become_trusted, create_page, make_macro, nuke_eventlog, nuke_page
 
@@ -24,8 +27,7 @@ class TestHits:
         # for that test eventlog needs to be empty
         nuke_eventlog(req)
         # hits is based on hitcounts which reads the cache
-        caching.CacheEntry(request, 'charts', 'pagehits', scope='wiki').remove()
-        caching.CacheEntry(request, 'charts', 'hitcounts', scope='wiki').remove()
+        caching.CacheEntry(request, 'charts', 'aggregates', scope='wiki').remove()
 
         yield
         nuke_page(req, self.pagename)
@@ -40,13 +42,34 @@ class TestHits:
         for counter in range(count):
             eventlog.EventLog(req).add(req, 'VIEWPAGE', {'pagename': 'PageHits'})
             result = self._test_macro(req, u'PageHits', u'') # XXX SENSE???
-        cache = caching.CacheEntry(req, 'charts', 'pagehits', scope='wiki', use_pickle=True)
-        date, hits = 0, {}
-        if cache.exists():
-            try:
-                date, hits = cache.content()
-            except caching.CacheError:
-                cache.remove()
+        hits = aggregate.get_stats(req, aggregate.EventStats.page_hits)
         assert hits['PageHits'] == count
 
+    def testAggregates(self, req):
+        """ event-log aggregates: counting per page and rebuilding for a new event-log """
+        for eventtype in ['VIEWPAGE', 'VIEWPAGE', 'SAVEPAGE']:
+            eventlog.EventLog(req).add(req, eventtype, {'pagename': self.pagename})
+        stats = aggregate.EventStats(req)
+        stats.update()
+        days, views, edits = stats.day_counts(self.pagename)
+        assert (sum(views), sum(edits)) == (2, 1)
+        assert stats.page_hits() == {self.pagename: 2}
+        elog = eventlog.EventLog(req)
+        try:
+            elog.segments.rotate()
+            eventlog.EventLog(req).add(req, 'VIEWPAGE', {'pagename': self.pagename})
+            stats.update()
+            assert stats.page_hits() == {self.pagename: 3}
+            # a new process reads the segment, too
+            stats = aggregate.EventStats(req)
+            stats.update()
+            assert stats.page_hits() == {self.pagename: 3}
+        finally:
+            for segment in elog.segments.list():
+                os.remove(segment.path)
+            os.remove(elog.segments.manifest)
+        nuke_eventlog(req)
+        stats.update()
+        assert stats.page_hits() == {}
+
 coverage_modules = ['MoinMoin.macro.PageHits']
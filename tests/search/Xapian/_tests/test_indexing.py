@@ -0,0 +1,141 @@
+"""
+    MoinMoin - MoinMoin.search.Xapian.indexing Tests
+
+    The worker processes parts of the indexing are tested with a fake pool
+    and fake connections, so they don't need python-xapian.
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import sys
+import types
+
+import pytest
+
+
+class FakeXapianError(Exception):
+    pass
+
+
+class FakeDatabaseModifiedError(FakeXapianError):
+    pass
+
+
+def fake_modules():
+    """ Return minimal xapian and xappy modules for importing the indexing module """
+    xapian = types.ModuleType('xapian')
+    xapian.Error = FakeXapianError
+    xapian.DatabaseModifiedError = FakeDatabaseModifiedError
+    xapian.InvalidArgumentError = type('InvalidArgumentError', (FakeXapianError, ), {})
+    xapian.Query = type('Query', (object, ), {})
+    xapian.Stem = type('Stem', (object, ), {})
+    xappy = types.ModuleType('xappy')
+    for name in ['SearchConnection', 'IndexerConnection', 'Field', 'UnprocessedDocument']:
+        setattr(xappy, name, type(name, (object, ), {}))
+    xappy.IndexerError = type('IndexerError', (Exception, ), {})
+    xappy.XapianDatabaseLockError = type('XapianDatabaseLockError', (Exception, ), {})
+    xappy.FieldActions = type('FieldActions', (object, ), dict(
+        SORTABLE=1, INDEX_EXACT=2, INDEX_FREETEXT=3, STORE_CONTENT=4))
+    return xapian, xappy
+
+
+@pytest.fixture
+def indexing(monkeypatch):
+    try:
+        import xapian, xappy
+        faked = False
+    except ImportError:
+        # import the search without xapian first, it must not see the fakes
+        import MoinMoin.search.builtin
+        xapian, xappy = fake_modules()
+        monkeypatch.setitem(sys.modules, 'xapian', xapian)
+        monkeypatch.setitem(sys.modules, 'xappy', xappy)
+        faked = True
+    from MoinMoin.search.Xapian import indexing
+    yield indexing
+    if faked:
+        # don't keep the modules importing the fake ones
+        for name in list(sys.modules):
+            if name.startswith('MoinMoin.search.Xapian'):
+                del sys.modules[name]
+        del sys.modules['MoinMoin.search'].Xapian
+
+
+class FakePool:
+    """ runs the tasks in this process """
+
+    def imap_unordered(self, func, iterable):
+        return map(func, iterable)
+
+
+class FakeConnection:
+    """ records the calls of the index changes """
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = fail
+
+    def replace(self, document):
+        if document in self.fail:
+            raise sys.modules['xapian'].Error('failed')
+        self.calls.append(('replace', document))
+
+    def delete(self, doc_id):
+        self.calls.append(('delete', doc_id))
+
+    def flush(self):
+        self.calls.append(('flush', None))
+
+
+class FakeSearchConnection:
+    """ raises DatabaseModifiedError until it was reopened """
+
+    def __init__(self):
+        self.reopened = 0
+
+    def get_document(self, doc_id):
+        if not self.reopened:
+            raise sys.modules['xapian'].DatabaseModifiedError('modified')
+        return doc_id.upper()
+
+    def reopen(self):
+        self.reopened += 1
+
+
+class TestWorkers:
+
+    def test_index_parallel(self, req, indexing, monkeypatch):
+        index = indexing.XapianIndex(req)
+
+        def index_entry(request, connection, entry, mode):
+            pagename = entry[0]
+            connection.replace(pagename)
+            if pagename == u'Deleted':
+                connection.delete(pagename)
+
+        monkeypatch.setattr(index, '_index_entry', index_entry)
+        indexing._init_worker(index, req, 'update')
+        entries = [(pagename, None, None) for pagename in [u'PageA', u'Failing', u'Deleted']]
+        connection = FakeConnection(fail=[u'Failing'])
+        assert index._index_parallel(FakePool(), connection, entries, batch_size=2) == 3
+        # the failing change is skipped, the index is committed after 2 changes
+        assert connection.calls == [('replace', u'PageA'), ('flush', None),
+                                    ('replace', u'Deleted'), ('delete', u'Deleted'), ('flush', None)]
+
+    def test_deferred_connection(self, req, indexing, monkeypatch):
+        index = indexing.XapianIndex(req)
+        search_connection = FakeSearchConnection()
+        monkeypatch.setattr(index, 'get_search_connection', lambda: search_connection)
+        connection = indexing.DeferredConnection(index)
+        # a reader behind the indexer commits reads the current revision
+        assert connection.get_document(u'doc') == u'DOC'
+        assert search_connection.reopened == 1
+        assert connection.get_document(u'other') == u'OTHER'
+        assert search_connection.reopened == 1
+        connection.replace(u'doc')
+        connection.delete(u'other')
+        assert connection.operations == [('replace', u'doc'), ('delete', u'other')]
+
+
+coverage_modules = ['MoinMoin.search.Xapian.indexing']
@@ -14,12 +14,19 @@
 
 
 import io
+import os
+import threading
+import time
 
 import pytest
 
 from MoinMoin.search import QueryError, _get_searcher
 from MoinMoin.search.queryparser import QueryParser
-from MoinMoin.search.builtin import MoinSearch
+from MoinMoin import caching, filter, wikiutil
+from MoinMoin.search import builtin
+from MoinMoin.search.builtin import BaseIndex, IndexerQueue, MoinSearch
+from MoinMoin.search.results import getSearchResults
+from MoinMoin.Page import Page
 from tests._tests import nuke_xapian_index, wikiconfig, become_trusted, create_page, nuke_page, append_page
 from MoinMoin.action import AttachFile
 
@@ -548,5 +555,193 @@ class TestGetSearcher:
     def test_get_searcher(self, req):
         assert isinstance(_get_searcher(req, ''), MoinSearch), 'Xapian index is not created, despite the configuration, MoinSearch must be used!'
 
+
+class TestIndexerQueue:
+    """ testing the journaled indexer queue """
+
+    @pytest.fixture(autouse=True)
+    def queue_dir(self, req, tmp_path, monkeypatch):
+        monkeypatch.setattr('MoinMoin.search.builtin.COMPACT_SIZE', 100)
+        self.queue = IndexerQueue(req, str(tmp_path), 'indexer-queue')
+
+    def test_put_get(self):
+        with pytest.raises(IndexError):
+            self.queue.get()
+        self.queue.put(u'FrontPage')
+        self.queue.mput([(u'HelpContents', u'file.txt', None), (None, u'/tmp/x', None), (u'FrontPage', None, 3)])
+        assert self.queue.get() == (u'FrontPage', None, None)
+        assert self.queue.mget(2) == [(u'HelpContents', u'file.txt', None), (None, u'/tmp/x', None)]
+        assert self.queue.mget(10) == [(u'FrontPage', None, 3)]
+        assert self.queue.mget(10) == []
+
+    def test_repeated_entries(self):
+        self.queue.mput([(u'FrontPage', None, None)] * 3 + [(u'HelpContents', None, None)])
+        assert self.queue.mget(10) == [(u'FrontPage', None, None), (u'HelpContents', None, None)]
+
+    def test_compact(self):
+        entries = [(u'Page%d' % i, None, None) for i in range(20)]
+        self.queue.mput(entries + entries[15:])
+        assert self.queue.mget(15) == entries[:15]
+        # compacting removed the consumed part and the repeated entries
+        with open(self.queue.journal) as f:
+            assert len(f.readlines()) == 5
+        assert self.queue.mget(100) == entries[15:]
+
+    def test_old_format(self):
+        self.queue.get_cache(locking=True).update([(u'FrontPage', None, None)])
+        self.queue.put(u'HelpContents')
+        assert self.queue.mget(10) == [(u'FrontPage', None, None), (u'HelpContents', None, None)]
+
+
+class TestFilterTextCache:
+    """ testing the cache of the text extracted by the filters """
+
+    def test_contentfilter(self, req, tmp_path):
+        class Index(BaseIndex):
+            def _main_dir(self):
+                return str(tmp_path / 'index')
+
+        for key in caching.get_cache_list(req, 'filtertext', 'wiki'):
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+        index = Index(req)
+        first = tmp_path / 'first.txt'
+        first.write_text(u'some text')
+        assert index.contentfilter(str(first)) == ('text/plain', u'some text')
+        keys = caching.get_cache_list(req, 'filtertext', 'wiki')
+        assert len(keys) == 1
+        # a file with the same content uses the same cache entry
+        caching.CacheEntry(req, 'filtertext', keys[0], scope='wiki', use_encode=True).update(u'cached text')
+        second = tmp_path / 'second.txt'
+        second.write_text(u'some text')
+        assert index.contentfilter(str(second)) == ('text/plain', u'cached text')
+        second.write_text(u'other text')
+        assert index.contentfilter(str(second)) == ('text/plain', u'other text')
+        for key in caching.get_cache_list(req, 'filtertext', 'wiki'):
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+
+    def test_failed_filter_not_cached(self, req, tmp_path, monkeypatch):
+        class Index(BaseIndex):
+            def _main_dir(self):
+                return str(tmp_path / 'index')
+
+        def execute(indexobj, filename):
+            return filter.execfilter("sometool %s", filename)
+
+        monkeypatch.setattr(wikiutil, 'importPlugin', lambda cfg, kind, name: execute)
+        monkeypatch.setattr(filter, 'exec_cmd', lambda cmd, timeout: (b'', b'sometool: not found', 127))
+        for key in caching.get_cache_list(req, 'filtertext', 'wiki'):
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+        doc = tmp_path / 'doc.txt'
+        doc.write_text(u'some text')
+        assert Index(req).contentfilter(str(doc)) == ('text/plain', u'')
+        assert caching.get_cache_list(req, 'filtertext', 'wiki') == []
+        # the tool works again
+        monkeypatch.setattr(filter, 'exec_cmd', lambda cmd, timeout: (b'tool text', b'', 0))
+        assert Index(req).contentfilter(str(doc)) == ('text/plain', u'tool text')
+        assert len(caching.get_cache_list(req, 'filtertext', 'wiki')) == 1
+        for key in caching.get_cache_list(req, 'filtertext', 'wiki'):
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+
+    def test_prune(self, req, tmp_path, monkeypatch):
+        class Index(BaseIndex):
+            def _main_dir(self):
+                return str(tmp_path / 'index')
+
+        monkeypatch.setattr(builtin, 'MAX_FILTERTEXT_ENTRIES', 10)
+        for key in caching.get_cache_list(req, 'filtertext', 'wiki'):
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+        index = Index(req)
+        arena_dir = caching.get_arena_dir(req, 'filtertext', 'wiki')
+        known = set()
+        for i in range(11):
+            doc = tmp_path / 'doc.txt'
+            doc.write_text(u'text %d' % i)
+            index.contentfilter(str(doc))
+            # give the new entry an mtime in the order of creation
+            for key in set(caching.get_cache_list(req, 'filtertext', 'wiki')) - known:
+                os.utime(os.path.join(arena_dir, key), (1000000 + i, 1000000 + i))
+                known.add(key)
+        # the oldest entries were removed down to 90% of the limit
+        keys = caching.get_cache_list(req, 'filtertext', 'wiki')
+        assert len(keys) == 9
+        texts = set([caching.CacheEntry(req, 'filtertext', key, scope='wiki', use_encode=True).content() for key in keys])
+        assert texts == set([u'text %d' % i for i in range(2, 11)])
+        for key in keys:
+            caching.CacheEntry(req, 'filtertext', key, scope='wiki').remove()
+
+class TestMoinSearchPrefilter:
+    """ search: test the built-in search with trigram index and worker processes """
+
+    class Config(wikiconfig.Config):
+        search_trigram_index = True
+        search_workers = 2
+        search_chunk_size = 2
+
+    pages = {u'SearchPrefilterNeedle': u'Find the NEEDLE in the haystack.',
+             u'SearchPrefilterHay': u'Only hay in here.',
+             u'SearchPrefilterLinks': u'See SearchPrefilterHay.',
+            }
+
+    @pytest.fixture(autouse=True)
+    def setup_pages(self, req):
+        become_trusted(req)
+        for page, text in list(self.pages.items()):
+            create_page(req, page, text)
+        yield
+        for page in self.pages:
+            nuke_page(req, page)
+
+    def candidates(self, req, query):
+        query = QueryParser().parse_query(query)
+        return set(MoinSearch(req, query)._getCandidates(sorted(self.pages)))
+
+    def test_candidates(self, req):
+        assert self.candidates(req, u'needle') == set([u'SearchPrefilterNeedle'])
+        assert self.candidates(req, u'haystack or title:Links') == set([u'SearchPrefilterNeedle', u'SearchPrefilterLinks'])
+        assert self.candidates(req, u'here -needle') == set([u'SearchPrefilterHay'])
+        assert self.candidates(req, u'linkto:SearchPrefilterHay') == set([u'SearchPrefilterLinks'])
+        # no literal, any page might match
+        assert self.candidates(req, u're:ne+d') == set(self.pages)
+
+    def test_search(self, req):
+        for query, expected in [(u'needle', [u'SearchPrefilterNeedle']),
+                                (u'title:SearchPrefilter', sorted(self.pages)),
+                                (u'hay -needle', [u'SearchPrefilterHay', u'SearchPrefilterLinks'])]:
+            result = MoinSearch(req, QueryParser().parse_query(query)).run()
+            assert sorted([hit.page_name for hit in result.hits if hit.page_name in self.pages]) == expected
+
+    def test_no_fork_with_threads(self, req):
+        search = MoinSearch(req, QueryParser().parse_query(u'needle'))
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            assert search._searchParallel(sorted(self.pages), 2, 1) is None
+        finally:
+            stop.set()
+            thread.join()
+        if threading.active_count() == 1:
+            hits = search._searchParallel(sorted(self.pages), 2, 1)
+            assert [hit[1].page_name for hit in hits] == [u'SearchPrefilterNeedle']
+
+
+class TestLimitedResults:
+    """ testing search results holding only the first hits of a search """
+
+    def _results(self, req, limited):
+        hits = [('Self', Page(req, pagename), None, [], 0) for pagename in [u'PageB', u'PageA', u'PageC']]
+        return getSearchResults(req, None, hits, time.time(), 'page_name', (u'about', 42), limited=limited)
+
+    def test_limited(self, req):
+        results = self._results(req, limited=True)
+        # kept in index order, paging uses the estimate
+        assert [hit.page_name for hit in results.hits] == [u'PageB', u'PageA', u'PageC']
+        assert results._hitsNum() == 42
+
+    def test_complete(self, req):
+        results = self._results(req, limited=False)
+        assert [hit.page_name for hit in results.hits] == [u'PageA', u'PageB', u'PageC']
+        assert results._hitsNum() == 3
+
 coverage_modules = ['MoinMoin.search']
 
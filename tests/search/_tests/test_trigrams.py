@@ -0,0 +1,81 @@
+"""
+    MoinMoin - MoinMoin.search.trigrams Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pytest
+
+from MoinMoin import caching
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin.search import trigrams
+from MoinMoin.util.multimatch import fold
+from tests._tests import become_trusted, create_page, nuke_page
+
+
+def test_trigram_codes():
+    assert trigrams.trigram_codes(fold(u'Abc-de ABCD')) == trigrams.trigram_codes(u'abcd')
+    assert len(trigrams.trigram_codes(u'abcd')) == 2
+    assert trigrams.trigram_codes(u'ab cd \xe4\xe4\xe4') == set()
+
+
+class TestTrigramIndex:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestTrigrams'
+    renamed = u'AutoCreatedMoinMoinTemporaryTestTrigramsRenamed'
+
+    @pytest.fixture(autouse=True)
+    def setup_pages(self, req):
+        become_trusted(req)
+        yield
+        for pagename in [self.pagename, self.renamed]:
+            nuke_page(req, pagename)
+
+    def test_set_page(self):
+        index = trigrams.TrigramIndex()
+        index._set_page(u'A', trigrams.trigram_codes(u'needle in a haystack'))
+        index._set_page(u'B', trigrams.trigram_codes(u'needles'))
+        assert index.pages(u'needle') == set([u'A', u'B'])
+        assert index.pages(u'haystack') == set([u'A'])
+        assert index.pages(u'?!') is None
+        index._set_page(u'A', trigrams.trigram_codes(u'nothing'))
+        assert index.pages(u'needle') == set([u'B'])
+        index._set_page(u'B', None)
+        assert index.pages(u'needle') == set()
+        # the free page id is used again
+        index._set_page(u'C', trigrams.trigram_codes(u'needle'))
+        assert index.names == [u'A', u'C']
+
+    def test_follows_editlog(self, req):
+        create_page(req, self.pagename, u'a Xylophonist\n')
+        assert self.pagename in trigrams.get_index(req).pages(u'xylophon')
+
+        PageEditor(req, self.pagename).renamePage(self.renamed)
+        found = trigrams.get_index(req).pages(u'xylophon')
+        assert self.renamed in found
+        assert self.pagename not in found
+
+        PageEditor(req, self.renamed).deletePage()
+        assert self.renamed not in trigrams.get_index(req).pages(u'xylophon')
+
+    def test_persisted(self, req):
+        create_page(req, self.pagename, u'a Xylophonist\n')
+        trigrams.get_index(req)._save(req)
+        index = trigrams.TrigramIndex()
+        index._load(req)
+        assert self.pagename in index.pages(u'xylophon')
+
+    def test_save_failed(self, req, monkeypatch):
+        class ReadOnlyEntry:
+            def update(self, content):
+                raise caching.CacheError('read-only')
+        index = trigrams.TrigramIndex()
+        monkeypatch.setattr(index, '_cache_entry', lambda request: ReadOnlyEntry())
+        monkeypatch.setattr(index, '_load', lambda request: None)
+        monkeypatch.setattr(trigrams, 'SAVE_LAG', 0)
+        index.refresh(req)
+        create_page(req, self.pagename, u'a Xylophonist\n')
+        index.refresh(req)
+        assert self.pagename in index.pages(u'xylophon')
+
+coverage_modules = ['MoinMoin.search.trigrams']
@@ -0,0 +1,28 @@
+"""
+    MoinMoin - MoinMoin.security.antispam Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching
+from MoinMoin.security import antispam
+
+
+def test_getmatcher(req):
+    cache = caching.CacheEntry(req, "antispam", "matcher", scope='wiki', use_pickle=True)
+    cache.remove()
+    blacklist = [r'casino', r'cheap-?pills', r'(']
+    matcher = antispam.getmatcher(req, blacklist)
+    assert [pattern for pattern, err in matcher.errors] == ['(']
+    assert matcher.search(u'CheapPills').group() == u'CheapPills'
+    # the other processes get it from the cache file
+    assert cache.exists()
+    assert antispam.getmatcher(req, blacklist).patterns == matcher.patterns
+    # a changed blacklist gets a new matcher
+    matcher = antispam.getmatcher(req, blacklist + [r'kitten'])
+    assert matcher.search(u'kitten').group() == u'kitten'
+    cache.remove()
+
+
+coverage_modules = ['MoinMoin.security.antispam']
@@ -390,4 +390,79 @@ class TestPageAcls:
             for right in mayNot:
                 yield _not_have_right, u, right, pagename, hierarchic
 
+class TestACLDecisionCache:
+    """ security: remembered ACL decisions and may_read_many """
+    mainpage_name = u'AclCacheTestMainPage'
+    subpage_name = u'AclCacheTestMainPage/SubPage'
+    otherpage_name = u'AclCacheTestOtherPage'
+
+    class Config(wikiconfig.Config):
+        acl_rights_before = u"WikiAdmin:admin,read,write,delete,revert"
+        acl_rights_default = u"All:read,write"
+        acl_rights_after = u""
+        acl_hierarchic = True
+
+    @pytest.fixture(autouse=True)
+    def setup_pages(self, req):
+        saved_user = req.user
+        req.user = User(req, auth_username=u'WikiAdmin')
+        req.user.valid = True
+        create_page(req, self.mainpage_name, u"#acl JoeDoe:read\nFoo!")
+        create_page(req, self.subpage_name, u"FooFoo!")
+        create_page(req, self.otherpage_name, u"Bar!")
+        yield
+        for pagename in (self.mainpage_name, self.subpage_name, self.otherpage_name):
+            nuke_page(req, pagename)
+        req.user = saved_user
+
+    def test_may_read_many(self, req):
+        pagenames = [self.mainpage_name, self.subpage_name, self.otherpage_name]
+        joe = User(req, auth_username=u'JoeDoe')
+        jane = User(req, auth_username=u'JaneDoe')
+        assert joe.may.may_read_many(pagenames) == pagenames
+        assert jane.may.may_read_many(pagenames) == [self.otherpage_name]
+        for pagename in pagenames:
+            assert jane.may.read(pagename) == (pagename == self.otherpage_name)
+            assert joe.may.write(pagename) == (pagename == self.otherpage_name)
+
+    def test_invalidation(self, req):
+        jane = User(req, auth_username=u'JaneDoe')
+        assert not jane.may.read(self.subpage_name)
+        key = security._decision_key(req, u'JaneDoe', 'read')
+        assert req.cfg.cache.acl.store.get(self.subpage_name, key) is False
+        # changing the ACL of the parent page changes the decision for the subpage
+        create_page(req, self.mainpage_name, u"#acl JaneDoe:read\nFoo!")
+        assert jane.may.read(self.subpage_name)
+        assert jane.may.may_read_many([self.subpage_name]) == [self.subpage_name]
+
+    def test_batched_store_access(self, req, monkeypatch):
+        # one store round trip for all pages, not one per page
+        req.cfg.cache.acl.refresh(req)
+        store = req.cfg.cache.acl.store
+        calls = []
+
+        def counting(op):
+            method = getattr(store, op)
+
+            def counted(*args):
+                calls.append(op)
+                return method(*args)
+            return counted
+        for op in ('get', 'put', 'get_many', 'put_many'):
+            monkeypatch.setattr(store, op, counting(op))
+        pagenames = [self.mainpage_name, self.subpage_name, self.otherpage_name]
+        jane = User(req, auth_username=u'JaneDoe')
+        assert jane.may.may_read_many(pagenames) == [self.otherpage_name]
+        assert calls == ['get_many', 'get', 'put_many']
+        del calls[:]
+        assert jane.may.may_read_many(pagenames) == [self.otherpage_name]
+        assert calls == ['get_many']
+
+    def test_without_cache(self, req, monkeypatch):
+        monkeypatch.setattr(req.cfg.cache, 'acl', None)
+        jane = User(req, auth_username=u'JaneDoe')
+        assert not jane.may.read(self.subpage_name)
+        assert jane.may.may_read_many([self.mainpage_name, self.otherpage_name]) == [self.otherpage_name]
+
+
 coverage_modules = ['MoinMoin.security']
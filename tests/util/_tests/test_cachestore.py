@@ -0,0 +1,117 @@
+"""
+    MoinMoin - MoinMoin.util.cachestore Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+from MoinMoin.Page import ItemCache
+from MoinMoin.util.cachestore import CacheServer, MemoryStore, SocketStore, authkey_filename
+
+
+class TestMemoryStore:
+
+    def make_store(self):
+        return MemoryStore()
+
+    def test_get_put(self):
+        store = self.make_store()
+        assert store.get(u'FrontPage', 'key') is None
+        store.put(u'FrontPage', 'key', (1, 2))
+        assert store.get(u'FrontPage', 'key') == (1, 2)
+        assert store.get(u'FrontPage', 'other') is None
+
+    def test_get_put_many(self):
+        store = self.make_store()
+        store.put_many([(u'FrontPage', 'a', 1), (u'FrontPage', 'b', False), (None, 'count', 2)])
+        assert store.get_many([(u'FrontPage', 'a'), (u'FrontPage', 'b'), (u'FrontPage', 'c'), (None, 'count')]) == \
+            [1, False, None, 2]
+        assert store.get_many([]) == []
+
+    def test_compare_and_put(self):
+        store = self.make_store()
+        store.put(None, 'log_pos', 10)
+        assert not store.compare_and_put(None, 'log_pos', 5, [(u'FrontPage', 'a', 1), (None, 'log_pos', 20)])
+        assert store.get(u'FrontPage', 'a') is None
+        assert store.compare_and_put(None, 'log_pos', 10, [(u'FrontPage', 'a', 1), (None, 'log_pos', 20)])
+        assert store.get_many([(u'FrontPage', 'a'), (None, 'log_pos')]) == [1, 20]
+
+    def test_all_names_delete(self):
+        store = self.make_store()
+        store.put_all(u'FrontPage', {'a': 1, 'b': 2})
+        store.put(None, 'log_pos', 42)
+        assert store.get_all(u'FrontPage') == {'a': 1, 'b': 2}
+        assert set(store.names()) == set([None, u'FrontPage'])
+        store.delete(u'FrontPage')
+        assert store.get_all(u'FrontPage') is None
+        store.clear()
+        assert store.names() == []
+
+
+class TestSocketStore(TestMemoryStore):
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'cachestore_')
+        self.address = os.path.join(self.test_dir, 'cache.sock')
+        self.server = CacheServer(self.address, b'secret')
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        while not os.path.exists(self.address):
+            time.sleep(0.01)
+
+    def teardown_method(self, method):
+        self.server.close()
+        shutil.rmtree(self.test_dir)
+
+    def make_store(self, namespace='test'):
+        return SocketStore(self.address, namespace, b'secret')
+
+    def test_shared_between_clients(self):
+        store1, store2 = self.make_store(), self.make_store()
+        store1.put(u'FrontPage', 'key', [1, 2, 3])
+        assert store2.get(u'FrontPage', 'key') == [1, 2, 3]
+        assert self.make_store('other').get(u'FrontPage', 'key') is None
+
+    def test_item_caches_share_log_pos(self, req):
+        edit_log = req.rootpage.getPagePath('edit-log', isfile=1)
+        cache1 = ItemCache('meta', edit_log, self.make_store())
+        cache1.log_pos = 0
+        cache2 = ItemCache('meta', edit_log, self.make_store())
+        assert cache2.log_pos == 0
+
+    def test_generated_authkey(self):
+        address = os.path.join(self.test_dir, 'keyed.sock')
+        server = CacheServer(address)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        while not os.path.exists(address):
+            time.sleep(0.01)
+        try:
+            assert stat.S_IMODE(os.stat(address).st_mode) & 0o077 == 0
+            assert stat.S_IMODE(os.stat(authkey_filename(address)).st_mode) == 0o600
+            store = SocketStore(address, 'test')  # reads the key file
+            store.put(u'FrontPage', 'key', 1)
+            assert store.get(u'FrontPage', 'key') == 1
+            # clients without the secret are not served
+            assert SocketStore(address, 'test', b'wrong').get(u'FrontPage', 'key') is None
+        finally:
+            server.close()
+
+    def test_server_unreachable(self):
+        store = SocketStore(os.path.join(self.test_dir, 'nonexisting'), 'test')
+        store.put(u'FrontPage', 'key', 1)
+        assert store.get(u'FrontPage', 'key') is None
+        assert store.get_many([(u'FrontPage', 'key'), (u'FrontPage', 'other')]) == [None, None]
+        assert store.names() == []
+
+
+coverage_modules = ['MoinMoin.util.cachestore']
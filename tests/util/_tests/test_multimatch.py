@@ -0,0 +1,87 @@
+"""
+    MoinMoin - MoinMoin.util.multimatch Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import pickle
+import re
+
+from MoinMoin.util import multimatch
+
+
+def test_required_literal():
+    tests = [
+        (r'online-?casino\.example', 'casino.example'),
+        (r'ABC(d|e)', 'abc'),
+        (r'a(b|c)d', None),
+        (r'ab+', None),
+        (r'viagra|cialis', None),
+        (r'\bBuy-Pills\b', 'buy-pills'),
+        (u'sp\xe4mmer', 'mmer'),
+        (r'abcx|abcy', 'abc'),
+    ]
+    for pattern, expected in tests:
+        assert multimatch.required_literal(pattern) == expected
+
+
+def test_trie_regex():
+    literals = ['abc', 'abcdef', 'abd', 'xyz']
+    regex = re.compile(multimatch.trie_regex(literals))
+    for literal in literals:
+        assert regex.fullmatch(literal)
+    assert regex.match('abcdefg').group() == 'abcdef'
+    assert not regex.fullmatch('ab')
+
+
+def test_search():
+    patterns = [
+        r'casino',
+        r'casinoroyal',
+        r'(',  # invalid
+        r'cheap-?pills',
+        r'a(b|c)d',
+        r'\bkitten\b',
+    ]
+    matcher = multimatch.MultiMatcher(patterns)
+    assert [pattern for pattern, err in matcher.errors] == ['(']
+    assert matcher.search(u'nothing to see here') is None
+    assert matcher.search(u'visit CasinoRoyal!').group() == u'Casino'
+    assert matcher.search(u'buy CHEAPPILLS now').group() == u'CHEAPPILLS'
+    assert matcher.search(u'xacdx').group() == u'acd'
+    # characters which re.I matches to ASCII letters
+    assert matcher.search(u'Kitten').group() == u'Kitten'
+    assert matcher.search(u'caſıno').group() == u'caſıno'
+    # literals which are prefixes of other literals
+    assert matcher.found_literals(u'casinoroyal') == set(['casino', 'casinoroyal'])
+
+
+def test_search_same_as_loop():
+    patterns = [r'foo\d+', r'bar(baz)?', r'.*qux', r'oba']
+    regexes = [re.compile(pattern, re.I) for pattern in patterns]
+    matcher = multimatch.MultiMatcher(patterns)
+    for text in [u'foo', u'foo12', u'fobar', u'FOOBAR', u'xxqux', u'barbaz foo1', u'nothing']:
+        expected = None
+        for regex in regexes:
+            expected = regex.search(text)
+            if expected:
+                break
+        match = matcher.search(text)
+        assert (match and match.group()) == (expected and expected.group())
+
+
+def test_matches():
+    matcher = multimatch.MultiMatcher([r'^Help.*$', r'^Front.*$', r'^Wiki:.*$', r'^HelpContents$'], re.M)
+    text = u'FrontPage\nHelpContents'
+    assert [pattern for pattern, match in matcher.matches(text)] == [r'^Help.*$', r'^Front.*$', r'^HelpContents$']
+    assert list(matcher.matches(u'helpcontents')) == []  # case sensitive
+
+
+def test_pickle():
+    matcher = pickle.loads(pickle.dumps(multimatch.MultiMatcher([r'casino', r'a(b|c)d'])))
+    assert matcher.search(u'xCASINOx').group() == u'CASINO'
+    assert matcher.search(u'acd').group() == u'acd'
+
+
+coverage_modules = ['MoinMoin.util.multimatch']
@@ -0,0 +1,99 @@
+"""
+    MoinMoin - MoinMoin.web.compress and compressed static files Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import gzip
+import os
+from types import SimpleNamespace
+
+from MoinMoin.web import compress
+from MoinMoin.web.http import Client, Response
+from MoinMoin.web.request import ResponseBase, TestRequest
+from MoinMoin.web.static import compress_static_files, make_static_serving_app
+
+HTML = u'<html><body>%s</body></html>' % (u'Some text. ' * 200)
+
+cfg = SimpleNamespace(compress_min_size=1024, compress_mimetypes=['text/html'])
+
+
+def make_response(body=None, accept_encoding='gzip, deflate', mimetype='text/html'):
+    request = TestRequest(environ_overrides={'HTTP_ACCEPT_ENCODING': accept_encoding})
+    response = ResponseBase(body is None and [HTML] or body, mimetype=mimetype)
+    return request, response
+
+
+def test_compress():
+    request, response = make_response()
+    response.set_etag('abc')
+    compress.compress_response(request, response, cfg)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == HTML.encode('utf-8')
+    assert int(response.headers['Content-Length']) == len(response.get_data())
+    assert response.get_etag() == ('abc', True)
+
+
+def test_not_compressed():
+    # client does not accept gzip
+    request, response = make_response(accept_encoding='identity')
+    compress.compress_response(request, response, cfg)
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    # too small
+    request, response = make_response([u'<p>small</p>'])
+    compress.compress_response(request, response, cfg)
+    assert 'Content-Encoding' not in response.headers
+    # other mimetype
+    request, response = make_response(mimetype='image/png')
+    compress.compress_response(request, response, cfg)
+    assert 'Content-Encoding' not in response.headers
+    # files sent by send_file
+    request, response = make_response()
+    response.direct_passthrough = True
+    compress.compress_response(request, response, cfg)
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed():
+    request, response = make_response(iter([HTML[:100], HTML[100:]]))
+    compress.compress_response(request, response, cfg)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(b''.join(response.response)) == HTML.encode('utf-8')
+
+
+def test_static_files(tmp_path):
+    css = b'body { color: black; }\n' * 100
+    (tmp_path / 'style.css').write_bytes(css)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG' * 100)
+    assert compress_static_files(str(tmp_path)) >= 1
+    assert os.path.exists(str(tmp_path / 'style.css.gz'))
+    assert not os.path.exists(str(tmp_path / 'logo.png.gz'))
+    # up to date, nothing to do
+    assert compress_static_files(str(tmp_path)) == 0
+
+    def fallback(environ, start_response):
+        return Response('fallback', status=404)(environ, start_response)
+
+    client = Client(make_static_serving_app(fallback, {'/static': str(tmp_path)}), Response)
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Type'].startswith('text/css')
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == css
+
+    response = client.get('/static/style.css')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == css
+
+    # the compressed copy is outdated
+    st = os.stat(str(tmp_path / 'style.css.gz'))
+    os.utime(str(tmp_path / 'style.css'), (st.st_atime, st.st_mtime + 10))
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == css
+
+coverage_modules = ['MoinMoin.web.compress', 'MoinMoin.web.static']
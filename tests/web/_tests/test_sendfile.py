@@ -0,0 +1,162 @@
+"""
+    MoinMoin - MoinMoin.web.sendfile Tests
+
+    @copyright: 2026 MoinMoin project
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from MoinMoin.web import sendfile
+from MoinMoin.web.http import Client
+from MoinMoin.web.request import MoinMoinFinish, ResponseBase, TestRequest
+from MoinMoin.wsgiapp import Application
+from tests._tests import become_trusted, create_page, nuke_page, wikiconfig
+
+DATA = b'0123456789abcdefghij'
+ETAG = 'some-etag'
+
+
+def send(headers=None, data=DATA, file_wrapper=None, **kw):
+    environ = dict([('HTTP_' + key.upper().replace('-', '_'), value)
+                    for key, value in (headers or {}).items()])
+    if file_wrapper is not None:
+        environ['wsgi.file_wrapper'] = file_wrapper
+    request = TestRequest(environ_overrides=environ)
+    response = ResponseBase()
+    response.headers['Content-Type'] = 'text/plain'
+    context = SimpleNamespace(request=request, response=response, environ=request.environ)
+    if isinstance(data, bytes):
+        fileobj = io.BytesIO(data)
+        kw.setdefault('size', len(data))
+        kw.setdefault('etag', ETAG)
+        kw.setdefault('last_modified', 1000000000)
+    else:
+        fileobj = data
+    with pytest.raises(MoinMoinFinish):
+        sendfile.send_file(context, fileobj, **kw)
+    return response, b''.join(response.response)
+
+
+def test_whole_file():
+    response, body = send()
+    assert response.status_code == 200
+    assert body == DATA
+    assert response.headers['Content-Length'] == str(len(DATA))
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag'] == '"%s"' % ETAG
+
+
+def test_single_range():
+    response, body = send({'Range': 'bytes=2-5'})
+    assert response.status_code == 206
+    assert body == b'2345'
+    assert response.headers['Content-Range'] == 'bytes 2-5/20'
+    assert response.headers['Content-Length'] == '4'
+
+    response, body = send({'Range': 'bytes=-3'})
+    assert body == b'hij'
+    response, body = send({'Range': 'bytes=15-100'})
+    assert body == b'fghij'
+    assert response.headers['Content-Range'] == 'bytes 15-19/20'
+
+
+def test_multiple_ranges():
+    response, body = send({'Range': 'bytes=0-1,10-12'})
+    assert response.status_code == 206
+    content_type = response.headers['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    boundary = content_type.split('=', 1)[1].encode('ascii')
+    assert response.headers['Content-Length'] == str(len(body))
+    assert body == (b'--' + boundary + b'\r\nContent-Type: text/plain\r\nContent-Range: bytes 0-1/20\r\n\r\n01\r\n' +
+                    b'--' + boundary + b'\r\nContent-Type: text/plain\r\nContent-Range: bytes 10-12/20\r\n\r\nabc\r\n' +
+                    b'--' + boundary + b'--\r\n')
+
+
+def test_unsatisfiable_range():
+    response, body = send({'Range': 'bytes=50-60'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */20'
+    assert body == b''
+
+
+def test_if_range():
+    response, body = send({'Range': 'bytes=2-5', 'If-Range': '"%s"' % ETAG})
+    assert response.status_code == 206
+    # the client has another version of the file, it gets the whole new one
+    response, body = send({'Range': 'bytes=2-5', 'If-Range': '"other"'})
+    assert response.status_code == 200
+    assert body == DATA
+
+
+def test_not_modified():
+    response, body = send({'If-None-Match': '"%s"' % ETAG})
+    assert response.status_code == 304
+    assert body == b''
+    response, body = send({'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    response, body = send({'If-Modified-Since': 'Sun, 09 Sep 2001 01:46:40 GMT'})
+    assert response.status_code == 304
+
+
+def test_real_file(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(DATA)
+    st = os.stat(str(path))
+
+    response, body = send(data=open(str(path), 'rb'))
+    assert body == DATA
+    assert response.headers['ETag'] == '"%s"' % sendfile.file_etag(st)
+
+    # the file wrapper sends the file from the start of a range to its end
+    wrapped = []
+
+    def file_wrapper(fileobj, bufsize):
+        wrapped.append(fileobj.tell())
+        return iter(lambda: fileobj.read(bufsize), b'')
+
+    response, body = send({'Range': 'bytes=10-'}, data=open(str(path), 'rb'), file_wrapper=file_wrapper)
+    assert body == DATA[10:]
+    assert wrapped == [10]
+    # other ranges are read by us
+    response, body = send({'Range': 'bytes=10-11'}, data=open(str(path), 'rb'), file_wrapper=file_wrapper)
+    assert body == DATA[10:12]
+    assert wrapped == [10]
+
+
+def test_unknown_size():
+    class Stream:
+        def __init__(self):
+            self.data = io.BytesIO(DATA)
+            self.read = self.data.read
+            self.close = self.data.close
+
+    response, body = send({'Range': 'bytes=2-5'}, data=Stream())
+    assert response.status_code == 200
+    assert body == DATA
+    assert 'Accept-Ranges' not in response.headers
+
+
+def test_raw_page_range(req):
+    pagename = u'AutoCreatedMoinMoinTemporaryTestSendFile'
+    become_trusted(req)
+    create_page(req, pagename, u'Some text of the page.\n')
+    try:
+        client = Client(Application(wikiconfig.Config))
+        url = '/' + pagename
+        response = client.get(url, query_string='action=raw')
+        assert response.get_data() == b'Some text of the page.\r\n'
+        etag = response.headers['ETag']
+        response = client.get(url, query_string='action=raw', headers={'Range': 'bytes=5-8'})
+        assert response.status_code == 206
+        assert response.get_data() == b'text'
+        response = client.get(url, query_string='action=raw', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    finally:
+        nuke_page(req, pagename)
+
+coverage_modules = ['MoinMoin.web.sendfile']